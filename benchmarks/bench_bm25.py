@@ -0,0 +1,89 @@
+"""
+Per-query BM25 latency: rebuilding the retriever per call vs. a persisted index.
+
+Runs fully offline (no embeddings, no LLM) over the bundled corpus:
+
+    python benchmarks/bench_bm25.py
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.storage.docstore import SimpleDocumentStore
+
+from src.corpus import load_beatles_lyrics_corpus
+from src.sparse_index import (
+    BM25Retriever,
+    bm25_retrieve_many,
+    build_bm25,
+    docstore_fingerprint,
+    load_bm25,
+    persist_bm25,
+)
+
+CORPUS = "data/corpus/beatles_lyrics.txt"
+CANDIDATE_K = 48  # max(30, k * 6) for the researcher's k=8
+
+QUERIES = [
+    "Find lyrics about loneliness",
+    "Find lyrics about memory and the past",
+    "Find lyrics about money",
+    "Yes I'm lonely wanna die",
+    "Wearing a face that she keeps in a jar by the door",
+    "Because the world is round",
+]
+
+
+def _ms(samples):
+    return f"median={median(samples) * 1000:8.2f} ms  max={max(samples) * 1000:8.2f} ms"
+
+
+def main() -> None:
+    docs = load_beatles_lyrics_corpus(CORPUS)
+    nodes = SentenceSplitter(chunk_size=800, chunk_overlap=150).get_nodes_from_documents(docs)
+    docstore = SimpleDocumentStore()
+    docstore.add_documents(nodes)
+    print(f"nodes: {len(nodes)}  queries: {len(QUERIES)}")
+
+    # Before: a fresh BM25Retriever per query (old _retrieve_nodes behaviour).
+    before = []
+    for q in QUERIES:
+        t0 = time.perf_counter()
+        r = BM25Retriever.from_defaults(docstore=docstore, similarity_top_k=CANDIDATE_K)
+        r.retrieve(q)
+        before.append(time.perf_counter() - t0)
+
+    with tempfile.TemporaryDirectory() as persist_dir:
+        persist_bm25(build_bm25(docstore), persist_dir, docstore_fingerprint(docstore))
+
+        t0 = time.perf_counter()
+        retriever = load_bm25(persist_dir, docstore)
+        load_s = time.perf_counter() - t0
+
+        # After: load once per process, then only score the query.
+        after = []
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            bm25_retrieve_many(retriever, [q], CANDIDATE_K)
+            after.append(time.perf_counter() - t0)
+
+        # Batched: every query in one bm25s call (researcher path).
+        t0 = time.perf_counter()
+        bm25_retrieve_many(retriever, QUERIES, CANDIDATE_K)
+        batched_s = time.perf_counter() - t0
+
+    print(f"before (rebuild per query): {_ms(before)}")
+    print(f"after  (persisted index):   {_ms(after)}")
+    print(f"batched, per query:         {batched_s / len(QUERIES) * 1000:8.2f} ms")
+    print(f"one-off load of persisted index: {load_s * 1000:.2f} ms")
+    print(f"speed-up (median): {median(before) / median(after):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Peak Python memory of the list loader vs the streaming loader as the corpus grows.
+
+Synthesizes corpora by repeating the bundled lyrics file (runs offline):
+
+    python benchmarks/bench_corpus_memory.py --copies 1 4 16
+
+Then writes each corpus as one file per copy and reads it with
+iter_corpus_documents and a process pool (--workers). Workers return whole
+parsed files, so this process's peak should stay near (workers + 1) files'
+worth of documents however many files there are.
+"""
+
+import argparse
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.corpus import (
+    iter_beatles_lyrics_corpus,
+    iter_corpus_documents,
+    iter_document_batches,
+    load_beatles_lyrics_corpus,
+)
+
+CORPUS = Path("data/corpus/beatles_lyrics.txt")
+BATCH_SIZE = 256
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, peak / 1e6, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    text = CORPUS.read_text(encoding="utf-8")
+    print(f"{'copies':>6} {'file MB':>8} {'docs':>7} {'list peak MB':>13} {'stream peak MB':>15} {'list s':>7} {'stream s':>9}")
+    for copies in args.copies:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", encoding="utf-8") as f:
+            for _ in range(copies):
+                f.write(text)
+                f.write("\n")
+            f.flush()
+            size_mb = Path(f.name).stat().st_size / 1e6
+
+            docs, list_peak, list_s = _measure(lambda: len(load_beatles_lyrics_corpus(f.name)))
+            # Consume in bounded batches, as src.index_build does.
+            _, stream_peak, stream_s = _measure(
+                lambda: sum(len(b) for b in iter_document_batches(iter_beatles_lyrics_corpus(f.name), BATCH_SIZE))
+            )
+        print(f"{copies:6} {size_mb:8.1f} {docs:7} {list_peak:13.1f} {stream_peak:15.1f} {list_s:7.2f} {stream_s:9.2f}")
+
+    print(f"\n{'files':>6} {'total MB':>9} {'docs':>7} {'pool peak MB':>13} {'pool s':>7}   (workers={args.workers})")
+    for files in args.copies:
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(files):
+                # Rename every song per copy, so cross-file dedup keeps them all.
+                copy = re.sub(r"^(lyrics/[^/\n]+/[^/\n]+)\.txt$", rf"\1_{i}.txt", text, flags=re.M)
+                (Path(tmp) / f"part{i:03d}.txt").write_text(copy, encoding="utf-8")
+            size_mb = sum(p.stat().st_size for p in Path(tmp).iterdir()) / 1e6
+
+            docs, pool_peak, pool_s = _measure(
+                lambda: sum(
+                    len(b)
+                    for b in iter_document_batches(iter_corpus_documents(tmp, workers=args.workers), BATCH_SIZE)
+                )
+            )
+        print(f"{files:6} {size_mb:9.1f} {docs:7} {pool_peak:13.1f} {pool_s:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
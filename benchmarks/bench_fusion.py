@@ -0,0 +1,119 @@
+"""
+Per-query fusion latency: QueryFusionRetriever vs. the in-project fusion stage.
+
+Fuses precomputed dense + BM25 candidate lists (48 each, partially
+overlapping, over the bundled corpus) so only the fusion step is timed.
+Runs fully offline:
+
+    python benchmarks/bench_fusion.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+from statistics import median
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from llama_index.core.llms import MockLLM
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.retrievers import BaseRetriever, QueryFusionRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from src.corpus import load_beatles_lyrics_corpus
+from src.tools import _fuse
+
+CORPUS = "data/corpus/beatles_lyrics.txt"
+CANDIDATE_K = 48  # max(30, k * 6) for the researcher's k=8
+QUERIES = 200
+REPEATS = 5
+
+
+# num_queries=1 never calls the LLM, but the constructor resolves one. The
+# original path resolved the OpenAI LLM from Settings here, so this baseline
+# is, if anything, flattering to QueryFusionRetriever.
+_LLM = MockLLM()
+
+
+class _Fixed(BaseRetriever):
+    """Retriever that returns a precomputed list (stands in for dense / BM25)."""
+
+    def __init__(self, results: List[NodeWithScore]) -> None:
+        super().__init__()
+        self.results = results
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self.results
+
+
+def _previous_fuse(result_lists, top_k):
+    # The dict-based max-score fusion this stage replaced.
+    all_nodes: Dict[str, NodeWithScore] = {}
+    for nodes in result_lists:
+        for nw in nodes:
+            key = nw.node.hash
+            if key in all_nodes:
+                all_nodes[key].score = max(nw.score or 0.0, all_nodes[key].score or 0.0)
+            else:
+                all_nodes[key] = NodeWithScore(node=nw.node, score=nw.score)
+    return sorted(all_nodes.values(), key=lambda nw: nw.score or 0.0, reverse=True)[:top_k]
+
+
+def _query_fusion_retriever(dense, sparse, top_k):
+    # Original _retrieve_nodes path: a fresh QueryFusionRetriever per query.
+    fusion = QueryFusionRetriever(
+        retrievers=[_Fixed(dense), _Fixed(sparse)],
+        similarity_top_k=top_k,
+        num_queries=1,
+        use_async=False,
+        llm=_LLM,
+    )
+    return fusion.retrieve("query")
+
+
+def _ms(samples):
+    return f"median={median(samples) * 1e6:8.1f} us  max={max(samples) * 1e6:8.1f} us"
+
+
+def main() -> None:
+    docs = load_beatles_lyrics_corpus(CORPUS)
+    nodes = SentenceSplitter(chunk_size=800, chunk_overlap=150).get_nodes_from_documents(docs)
+    rng = random.Random(0)
+
+    workload = []
+    for _ in range(QUERIES):
+        picked = rng.sample(nodes, CANDIDATE_K * 2 - CANDIDATE_K // 3)  # ~1/3 overlap
+        dense_nodes = picked[:CANDIDATE_K]
+        sparse_nodes = picked[-CANDIDATE_K:]
+        dense = [NodeWithScore(node=n, score=s) for n, s in zip(dense_nodes, sorted((rng.random() for _ in dense_nodes), reverse=True))]
+        sparse = [NodeWithScore(node=n, score=s) for n, s in zip(sparse_nodes, sorted((rng.uniform(0, 20) for _ in sparse_nodes), reverse=True))]
+        workload.append((dense, sparse))
+    print(f"nodes: {len(nodes)}  queries: {QUERIES}  candidates per list: {CANDIDATE_K}")
+
+    paths = {
+        "QueryFusionRetriever (original)": lambda d, s: _query_fusion_retriever(d, s, CANDIDATE_K),
+        "dict max-score (previous)": lambda d, s: _previous_fuse([d, s], CANDIDATE_K),
+        "numpy simple": lambda d, s: _fuse([d, s], CANDIDATE_K, mode="simple"),
+        "numpy rrf": lambda d, s: _fuse([d, s], CANDIDATE_K, mode="rrf", weights=(1.0, 1.0)),
+        "numpy relative_score": lambda d, s: _fuse([d, s], CANDIDATE_K, mode="relative_score", weights=(1.0, 1.0)),
+    }
+
+    medians = {}
+    for name, fn in paths.items():
+        samples = []
+        for _ in range(REPEATS):
+            for dense, sparse in workload:
+                t0 = time.perf_counter()
+                fn(dense, sparse)
+                samples.append(time.perf_counter() - t0)
+        medians[name] = median(samples)
+        print(f"{name:32s} {_ms(samples)}")
+
+    baseline = medians["QueryFusionRetriever (original)"]
+    print(f"speed-up of numpy rrf vs original (median): {baseline / medians['numpy rrf']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
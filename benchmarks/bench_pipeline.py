@@ -0,0 +1,263 @@
+"""
+Offline end-to-end benchmark: retrieval layer and full agent pipeline.
+
+Runs over the bundled corpus with the deterministic stand-ins from
+benchmarks/offline.py (hashed embeddings, overlap reranker, templated LLM),
+so it needs no API key or network and is stable enough for CI.
+
+For each stage it reports p50/p95 latency, throughput and peak traced
+memory. Retrieval is broken down into embed/sparse/dense/fuse/rerank, and
+the pipeline into its agent nodes (from the run's trace). Results are
+written as JSON; pass --compare to diff against an earlier run:
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --llm-latency-ms 300 --out after.json --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+from benchmarks.offline import CORPUS, ROOT, install_offline_stack
+
+QUESTIONS = [
+    "What themes and lyrical motifs recur across The Beatles' songs?",
+    "How do the lyrics talk about loneliness?",
+    "Which songs are about love, and how is it described?",
+    "How is the passing of time portrayed in the lyrics?",
+    "What do the songs say about money and fame?",
+    "Which lyrics describe home or a sense of place?",
+    "How do the songs ask for or offer help?",
+    "What images of the sun and weather appear in the lyrics?",
+]
+
+QUERIES = [
+    "all the lonely people",
+    "lyrics about love",
+    "here comes the sun",
+    "money can't buy me love",
+    "songs about going home",
+    "help me if you can",
+    "yesterday all my troubles",
+    "the long and winding road",
+    "living is easy with eyes closed",
+    "lyrics about dreams and sleep",
+    "friends getting by",
+    "a day in the life",
+]
+
+RETRIEVAL_K = 8  # the researcher's k
+BATCH = 4
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def _summary(samples_s: List[float], items_per_sample: int = 0) -> Dict[str, Any]:
+    # items_per_sample > 0 adds throughput (items per second of summed latency).
+    ms = np.asarray(samples_s) * 1e3
+    row: Dict[str, Any] = {
+        "n": len(samples_s),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "mean_ms": round(float(np.mean(ms)), 3),
+    }
+    total = float(np.sum(samples_s))
+    if items_per_sample and total > 0:
+        row["throughput_per_s"] = round(len(samples_s) * items_per_sample / total, 2)
+    return row
+
+
+def _fmt(value: Any, spec: str) -> str:
+    return format(value, spec) if value is not None else ""
+
+
+def _peak_kib(fn: Callable[[], Any]) -> float:
+    # Peak Python allocations while fn runs (tracemalloc, so run outside timing).
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_retrieval(repeats: int) -> Dict[str, Dict[str, Any]]:
+    import src.tools as tools
+
+    single: List[float] = []
+    batched: List[float] = []
+    stages: Dict[str, List[float]] = {s: [] for s in ("embed", "sparse", "dense", "fuse", "rerank")}
+
+    # Warm code paths (and the search pool) before timing.
+    tools.rag_retrieve(QUERIES[0], k=RETRIEVAL_K, use_cache=False)
+    tools.rag_retrieve_many(QUERIES[:BATCH], k=RETRIEVAL_K, use_cache=False)
+    for _ in range(repeats):
+        for q in QUERIES:
+            stats = tools.RetrievalStats()
+            t0 = time.perf_counter()
+            tools.rag_retrieve(q, k=RETRIEVAL_K, stats=stats, use_cache=False)
+            single.append(time.perf_counter() - t0)
+            for s in stages:
+                stages[s].append(getattr(stats, f"{s}_s"))
+        for i in range(0, len(QUERIES), BATCH):
+            t0 = time.perf_counter()
+            tools.rag_retrieve_many(QUERIES[i : i + BATCH], k=RETRIEVAL_K, use_cache=False)
+            batched.append(time.perf_counter() - t0)
+
+    out = {
+        "retrieval": _summary(single, items_per_sample=1),
+        "retrieval_batch": _summary(batched, items_per_sample=BATCH),
+    }
+    for s, samples in stages.items():
+        out[f"retrieval.{s}"] = _summary(samples)
+
+    out["retrieval"]["peak_mem_kib"] = _peak_kib(lambda: tools.rag_retrieve(QUERIES[1], k=RETRIEVAL_K, use_cache=False))
+    out["retrieval_batch"]["peak_mem_kib"] = _peak_kib(
+        lambda: tools.rag_retrieve_many(QUERIES[:BATCH], k=RETRIEVAL_K, use_cache=False)
+    )
+    return out
+
+
+def bench_pipeline(repeats: int) -> Dict[str, Dict[str, Any]]:
+    from src.graph import run_pipeline
+    from src.nodes.analyst import analyst_node
+    from src.nodes.planner import planner_node
+    from src.nodes.researcher import researcher_node
+    from src.nodes.reviewer_editor import reviewer_editor_node
+    from src.nodes.reviewer_validator import reviewer_validator_node
+    from src.nodes.writer import writer_node
+
+    wall: List[float] = []
+    per_node: Dict[str, List[float]] = {}
+    for _ in range(repeats):
+        for question in QUESTIONS:
+            t0 = time.perf_counter()
+            state = run_pipeline(question)
+            wall.append(time.perf_counter() - t0)
+            for span in state["trace"]:
+                if span["kind"] == "node":
+                    per_node.setdefault(span["name"], []).append(span["duration_s"])
+
+    out = {"pipeline": _summary(wall, items_per_sample=1)}
+    for name, samples in per_node.items():
+        out[f"pipeline.{name}"] = _summary(samples)
+
+    # Peak memory per agent, chaining the nodes by hand (the graph's
+    # research_* map/reduce nodes are measured together as researcher_node).
+    state: Dict[str, Any] = {"question": QUESTIONS[0], "logs": []}
+    mem: Dict[str, float] = {}
+    for node in (planner_node, researcher_node, analyst_node, writer_node, reviewer_validator_node, reviewer_editor_node):
+        mem[node.__name__[: -len("_node")]] = _peak_kib(lambda: node(state))
+    out["pipeline"]["peak_mem_kib"] = _peak_kib(lambda: run_pipeline(QUESTIONS[0]))
+    for name, kib in mem.items():
+        out.setdefault(f"pipeline.{name}", {})["peak_mem_kib"] = kib
+    return out
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta']['timestamp']})")
+    print(f"{'stage':28s} {'p50 ms':>19s} {'p95 ms':>19s}")
+    for stage, row in current["stages"].items():
+        old = baseline["stages"].get(stage)
+        if not old or "p50_ms" not in row or "p50_ms" not in old:
+            continue
+        cols = []
+        for key in ("p50_ms", "p95_ms"):
+            ratio = row[key] / old[key] if old[key] else float("nan")
+            cols.append(f"{old[key]:7.2f}->{row[key]:7.2f} {ratio:4.2f}x")
+        print(f"{stage:28s} {cols[0]:>19s} {cols[1]:>19s}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--embed-dim", type=int, default=256)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated latency per LLM request")
+    parser.add_argument("--llm-token-latency-ms", type=float, default=0.0, help="simulated latency per output token")
+    parser.add_argument("--out", help=f"JSON output path (default: {RESULTS_DIR.relative_to(ROOT)}/pipeline-<time>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    stack = install_offline_stack(
+        args.corpus,
+        embed_dim=args.embed_dim,
+        llm_latency_s=args.llm_latency_ms / 1e3,
+        llm_token_latency_s=args.llm_token_latency_ms / 1e3,
+    )
+    print(f"offline index: {stack.nodes} nodes built in {stack.build_s:.2f}s")
+
+    stages = {"index_build": {"n": 1, "p50_ms": round(stack.build_s * 1e3, 3), "p95_ms": round(stack.build_s * 1e3, 3)}}
+    stages.update(bench_retrieval(args.repeats))
+    stages.update(bench_pipeline(args.repeats))
+
+    from src import config
+
+    now = datetime.now(timezone.utc)
+    results = {
+        "meta": {
+            "timestamp": now.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": args.corpus,
+            "nodes": stack.nodes,
+            "repeats": args.repeats,
+            "embed_dim": args.embed_dim,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_token_latency_ms": args.llm_token_latency_ms,
+            "llm_requests": stack.llm.requests,
+            "fusion_mode": config.FUSION_MODE,
+            "retrieval_adaptive": config.RETRIEVAL_ADAPTIVE,
+            "researcher_max_workers": config.RESEARCHER_MAX_WORKERS,
+            # ru_maxrss is KiB on Linux, bytes on macOS.
+            "max_rss_mib": round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024), 1
+            ),
+        },
+        "stages": stages,
+    }
+
+    print(f"\n{'stage':28s} {'p50 ms':>9s} {'p95 ms':>9s} {'per s':>9s} {'peak KiB':>9s}")
+    for stage, row in stages.items():
+        cols = [
+            _fmt(row.get("p50_ms"), ".2f"),
+            _fmt(row.get("p95_ms"), ".2f"),
+            _fmt(row.get("throughput_per_s"), ".1f"),
+            _fmt(row.get("peak_mem_kib"), ".1f"),
+        ]
+        print(f"{stage:28s} " + " ".join(f"{c:>9s}" for c in cols))
+    print(f"max RSS: {results['meta']['max_rss_mib']} MiB")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"pipeline-{now.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"wrote {out}")
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+CLI startup cost: `python -X importtime` over the modules the CLI and the
+agent nodes import, plus the heavy dependencies that are now deferred to
+first use / warmup().
+
+Runs fully offline (imports only, no API key needed):
+
+    python benchmarks/bench_startup.py
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+RUNS = 5
+
+# What `python src/cli.py` and the nodes import before doing any work.
+TARGETS = ["src.config", "src.tools", "src.nodes.planner"]
+
+# Imported lazily now (first retrieval / generation, or warmup()).
+DEFERRED = ["llama_index.core", "llama_index.embeddings.openai", "openai", "bm25s", "numpy"]
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _importtime(statement: str) -> List[Tuple[int, int, int, str]]:
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    env["PYTHONPATH"] = str(ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)))
+    return rows
+
+
+def _cumulative_ms(module: str) -> float:
+    samples = []
+    for _ in range(RUNS):
+        rows = _importtime(f"import {module}")
+        samples.append(next(cum for _, cum, depth, name in rows if name == module and depth == 1) / 1000)
+    return median(samples)
+
+
+def main() -> None:
+    print(f"median of {RUNS} fresh interpreters, cumulative import time")
+    results: Dict[str, float] = {}
+    for module in TARGETS:
+        results[module] = _cumulative_ms(module)
+        print(f"  {module:32s} {results[module]:8.1f} ms")
+
+    # All deferred modules in one interpreter, so shared dependencies count once.
+    samples = []
+    for _ in range(RUNS):
+        rows = _importtime("import " + ", ".join(DEFERRED))
+        samples.append(sum(cum for _, cum, depth, _ in rows if depth == 1) / 1000)
+    deferred = median(samples)
+    print(f"deferred to first use / warmup(): {', '.join(DEFERRED)}")
+    print(f"  {'(together)':32s} {deferred:8.1f} ms")
+
+    rows = _importtime("import src.tools")
+    slowest = sorted(rows, key=lambda r: r[0], reverse=True)[:10]
+    print("slowest modules (self time) when importing src.tools:")
+    for self_us, _, _, name in slowest:
+        print(f"  {name:40s} {self_us / 1000:8.1f} ms")
+    print(f"src.tools import: {results['src.tools']:.0f} ms (was ~{results['src.tools'] + deferred:.0f} ms with eager imports)")
+
+
+if __name__ == "__main__":
+    main()
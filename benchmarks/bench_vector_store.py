@@ -0,0 +1,118 @@
+"""
+Load time, RSS and query latency: SimpleVectorStore (JSON) vs NumpyVectorStore (mmap .npy).
+
+Uses random embeddings, so it runs offline. Each load is measured in a fresh
+subprocess so RSS numbers are not polluted by the other backend:
+
+    python benchmarks/bench_vector_store.py --n 5000 --dim 1536
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.simple import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from src.vector_stores import NumpyVectorStore
+
+PERSIST_NAME = "default__vector_store.json"
+
+
+def _rss_mb() -> float:
+    # Resident set size from /proc (Linux); falls back to peak RSS elsewhere.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _child(backend: str, persist_dir: str, dim: int, queries: int, top_k: int) -> None:
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    if backend == "simple":
+        store = SimpleVectorStore.from_persist_path(os.path.join(persist_dir, PERSIST_NAME))
+    else:
+        store = NumpyVectorStore.from_persist_dir(persist_dir)
+    load_s = time.perf_counter() - t0
+    rss_loaded = _rss_mb()
+
+    rng = np.random.default_rng(1)
+    latencies = []
+    for _ in range(queries):
+        q = VectorStoreQuery(query_embedding=rng.normal(size=dim).tolist(), similarity_top_k=top_k)
+        t0 = time.perf_counter()
+        store.query(q)
+        latencies.append(time.perf_counter() - t0)
+
+    print(json.dumps({
+        "load_ms": load_s * 1000,
+        "rss_load_mb": rss_loaded - rss0,
+        "rss_after_queries_mb": _rss_mb() - rss0,
+        "query_p50_ms": median(latencies) * 1000,
+        "query_max_ms": max(latencies) * 1000,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=5000, help="number of vectors")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=48)
+    parser.add_argument("--child", choices=["simple", "numpy"], help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.dir, args.dim, args.queries, args.top_k)
+        return
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.n, args.dim)).astype(np.float32)
+    nodes = [TextNode(text="", id_=f"n{i}", embedding=v.tolist()) for i, v in enumerate(vectors)]
+
+    with tempfile.TemporaryDirectory() as d:
+        simple = SimpleVectorStore()
+        simple.add(nodes)
+        simple.persist(os.path.join(d, PERSIST_NAME))
+        fast = NumpyVectorStore()
+        fast.add(nodes)
+        fast.persist(os.path.join(d, PERSIST_NAME))
+        del simple, fast, nodes
+
+        sizes = {
+            "simple": os.path.getsize(os.path.join(d, PERSIST_NAME)) / 1e6,
+            "numpy": os.path.getsize(os.path.join(d, "default__vector_store.npy")) / 1e6,
+        }
+
+        print(f"vectors: {args.n} x {args.dim}  queries: {args.queries}  top_k: {args.top_k}")
+        print(f"{'backend':8} {'file MB':>8} {'load ms':>9} {'RSS load MB':>12} {'RSS +query MB':>14} {'p50 ms':>8} {'max ms':>8}")
+        for backend in ("simple", "numpy"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", backend, "--dir", d,
+                 "--dim", str(args.dim), "--queries", str(args.queries), "--top-k", str(args.top_k)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{backend:8} {sizes[backend]:8.1f} {r['load_ms']:9.1f} {r['rss_load_mb']:12.1f} "
+                f"{r['rss_after_queries_mb']:14.1f} {r['query_p50_ms']:8.2f} {r['query_max_ms']:8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Recall@k and latency of the HNSW (approximate) backend against exact search.
+
+By default uses synthetic clustered embeddings, so it runs offline. Point it at
+a built index to evaluate on real chunk embeddings instead (queries are
+perturbed copies of stored vectors):
+
+    python benchmarks/eval_ann.py --n 50000 --dim 1536
+    python benchmarks/eval_ann.py --persist-dir data/index_storage
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from statistics import median
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from src.vector_stores import HNSWVectorStore, NumpyVectorStore
+
+
+def _synthetic(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    # Clustered data is closer to real embeddings than isotropic noise.
+    centers = rng.normal(size=(clusters, dim))
+    assign = rng.integers(0, clusters, size=n)
+    return (centers[assign] + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def _store(cls, vectors: np.ndarray, **kwargs):
+    store = cls(**kwargs)
+    store.add([TextNode(text="", id_=f"n{i}", embedding=v.tolist()) for i, v in enumerate(vectors)])
+    return store
+
+
+def _run(store, queries: np.ndarray, k: int):
+    ids, latencies = [], []
+    for q in queries:
+        vq = VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=k)
+        t0 = time.perf_counter()
+        res = store.query(vq)
+        latencies.append(time.perf_counter() - t0)
+        ids.append(res.ids)
+    return ids, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=48, help="candidate depth (max(30, k*6) in tools)")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--persist-dir", help="evaluate on the vectors of a built numpy/hnsw index")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.persist_dir:
+        vectors = np.asarray(NumpyVectorStore.from_persist_dir(args.persist_dir).matrix)
+    else:
+        vectors = _synthetic(args.n, args.dim, args.clusters, rng)
+    picks = rng.integers(0, vectors.shape[0], size=args.queries)
+    queries = vectors[picks] + 0.1 * rng.normal(size=(args.queries, vectors.shape[1])).astype(np.float32)
+
+    exact = _store(NumpyVectorStore, vectors)
+    truth, exact_lat = _run(exact, queries, args.k)
+    print(f"vectors: {vectors.shape[0]} x {vectors.shape[1]}  queries: {args.queries}  k: {args.k}")
+    print(f"{'config':28} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'exact (numpy)':28} {'-':>8} {1.0:9.3f} {median(exact_lat) * 1000:8.3f} "
+          f"{np.percentile(exact_lat, 95) * 1000:8.3f}")
+
+    for m in args.m:
+        t0 = time.perf_counter()
+        ann = _store(HNSWVectorStore, vectors, m=m, ef_construction=args.ef_construction)
+        ann._graph()
+        build_s = time.perf_counter() - t0
+        for ef in args.ef_search:
+            ann.ef_search = ef
+            got, lat = _run(ann, queries, args.k)
+            recall = np.mean([len(set(g) & set(t)) / len(t) for g, t in zip(got, truth)])
+            label = f"hnsw M={m} ef_search={ef}"
+            print(f"{label:28} {build_s:8.2f} {recall:9.3f} {median(lat) * 1000:8.3f} "
+                  f"{np.percentile(lat, 95) * 1000:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Retrieval quality vs. speed for each retrieval configuration.
+
+Generates lyric-fragment queries from the corpus (a few consecutive words from
+one line of one song, unique to that song) and scores each configuration with
+the verbatim-hit check of src/test_metadata.py: a retrieved chunk is a hit
+if it contains the fragment, both normalized with src.evidence.normalize_quote.
+Reports hit@1, hit@k, MRR@k and per-query latency, then recommends the
+fastest configuration that meets --min-hit-rate:
+
+    python benchmarks/eval_retrieval.py --offline        # fake models, no API key
+    python benchmarks/eval_retrieval.py --queries 500    # persisted index (embeds queries via the API)
+
+Deploy the pick with RETRIEVAL_MODE (and RETRIEVAL_ADAPTIVE=1 for "+adaptive").
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+# (name, RETRIEVAL_MODE, adaptive)
+CONFIGS: List[Tuple[str, str, bool]] = [
+    ("dense", "dense", False),
+    ("bm25", "bm25", False),
+    ("fusion", "fusion", False),
+    ("fusion+rerank", "fusion_rerank", False),
+    ("fusion+rerank+adaptive", "fusion_rerank", True),
+]
+
+
+def generate_queries(docs: List[Any], n: int, min_words: int = 4, max_words: int = 8, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Up to `n` lyric fragments, each found verbatim in exactly one song.
+    """
+    from src.evidence import normalize_quote
+
+    rng = random.Random(seed)
+    songs = [(d.metadata.get("song", "Unknown"), normalize_quote(d.text)) for d in docs]
+    lines = [
+        (song, line.split())
+        for d, (song, _) in zip(docs, songs)
+        for line in d.text.splitlines()
+        if len(line.split()) >= min_words
+    ]
+    rng.shuffle(lines)
+
+    queries: List[Dict[str, str]] = []
+    seen = set()
+    for song, words in lines:
+        if len(queries) >= n:
+            break
+        width = rng.randint(min_words, min(max_words, len(words)))
+        start = rng.randint(0, len(words) - width)
+        fragment = " ".join(words[start : start + width])
+        key = normalize_quote(fragment)
+        if key in seen:
+            continue
+        seen.add(key)
+        # Ambiguous fragments (choruses shared across songs) have no single answer.
+        if sum(key in text for _, text in songs) != 1:
+            continue
+        queries.append({"query": fragment, "song": song})
+    return queries
+
+
+def evaluate(queries: List[Dict[str, str]], mode: str, adaptive: bool, k: int) -> Dict[str, Any]:
+    """
+    Hit rate, MRR and latency for one configuration, one query at a time.
+    """
+    from src.evidence import normalize_quote
+    from src.tools import _retrieve_nodes_many
+
+    _retrieve_nodes_many([queries[0]["query"]], k, mode=mode, adaptive=adaptive)  # warm
+
+    latencies: List[float] = []
+    hit1 = hitk = 0
+    reciprocal_ranks: List[float] = []
+    for q in queries:
+        wanted = normalize_quote(q["query"])
+        t0 = time.perf_counter()
+        nodes = _retrieve_nodes_many([q["query"]], k, mode=mode, adaptive=adaptive)[0]
+        latencies.append(time.perf_counter() - t0)
+
+        rank: Optional[int] = next(
+            (i for i, nw in enumerate(nodes, start=1) if wanted in normalize_quote(nw.node.get_content())), None
+        )
+        hit1 += rank == 1
+        hitk += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+    ms = np.asarray(latencies) * 1e3
+    return {
+        "hit@1": hit1 / len(queries),
+        f"hit@{k}": hitk / len(queries),
+        f"mrr@{k}": float(np.mean(reciprocal_ranks)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "qps": len(queries) / float(np.sum(latencies)),
+    }
+
+
+def recommend(results: Dict[str, Dict[str, Any]], k: int, min_hit_rate: float) -> Optional[str]:
+    """
+    Fastest configuration (by p50) whose hit@k meets the floor.
+    """
+    passing = [name for name, r in results.items() if r[f"hit@{k}"] >= min_hit_rate]
+    return min(passing, key=lambda name: results[name]["p50_ms"]) if passing else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-hit-rate", type=float, default=0.9, help="quality floor on hit@k")
+    parser.add_argument("--configs", nargs="+", choices=[name for name, _, _ in CONFIGS], help="subset to run")
+    parser.add_argument("--offline", action="store_true", help="use the fake models from benchmarks/offline.py")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    from src.config import CORPUS_PATH
+    from src.corpus import iter_corpus_documents
+
+    corpus = CORPUS_PATH
+    if args.offline:
+        from benchmarks.offline import CORPUS, install_offline_stack
+
+        install_offline_stack(CORPUS)
+        corpus = CORPUS
+
+    queries = generate_queries(list(iter_corpus_documents(corpus)), args.queries, seed=args.seed)
+    print(f"{len(queries)} lyric-fragment queries, k={args.k}{' (offline models)' if args.offline else ''}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, mode, adaptive in CONFIGS:
+        if args.configs and name not in args.configs:
+            continue
+        results[name] = evaluate(queries, mode, adaptive, args.k)
+
+    k = args.k
+    print(f"\n{'config':24s} {'hit@1':>6s} {f'hit@{k}':>6s} {f'mrr@{k}':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'qps':>7s}")
+    for name, r in results.items():
+        print(
+            f"{name:24s} {r['hit@1']:6.3f} {r[f'hit@{k}']:6.3f} {r[f'mrr@{k}']:6.3f} "
+            f"{r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['qps']:7.1f}"
+        )
+
+    pick = recommend(results, k, args.min_hit_rate)
+    if pick is None:
+        print(f"\nno configuration reaches hit@{k} >= {args.min_hit_rate}")
+    else:
+        print(f"\nfastest with hit@{k} >= {args.min_hit_rate}: {pick}")
+
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps({"queries": len(queries), "k": k, "min_hit_rate": args.min_hit_rate, "recommended": pick, "results": results}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    main()
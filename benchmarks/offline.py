@@ -0,0 +1,322 @@
+"""
+Deterministic local stand-ins for the remote models, for offline benchmarks.
+
+- HashedEmbedding: bag-of-words feature hashing in place of OpenAIEmbedding.
+  Texts that share words get similar vectors, so dense retrieval still ranks
+  sensibly.
+- OverlapCrossEncoder: query-word overlap in place of the sentence-transformers
+  reranker.
+- FakeLLMClient: a drop-in for src.llm_client.LLMClient that answers each agent
+  prompt from a template. Researcher quotes are copied verbatim from the
+  retrieved context. Latency can optionally be simulated.
+
+install_offline_stack() builds the index over the bundled corpus in memory and
+wires all of these into the retrieval layer. Nothing touches the network and
+no API key is needed:
+
+    from benchmarks.offline import install_offline_stack
+    stack = install_offline_stack()
+    ...  # rag_retrieve / run_pipeline as usual
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Measure real work: no response, embedding or retrieval caching. The key is a
+# placeholder in case anything builds an API client; nothing is ever sent.
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("EMBED_CACHE_ENABLED", "0")
+os.environ.setdefault("RETRIEVAL_CACHE_ENABLED", "0")
+
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.node_parser import SentenceSplitter
+
+from src.corpus import iter_corpus_documents
+from src.index_build import CHUNK_OVERLAP, CHUNK_SIZE, _assign_doc_ids
+from src.llm_client import estimate_tokens
+from src.metadata_index import MetadataIndex
+from src.sparse_index import build_bm25, docstore_fingerprint
+
+ROOT = Path(__file__).resolve().parents[1]
+CORPUS = str(ROOT / "data" / "corpus" / "beatles_lyrics.txt")
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+# -----------------------------------------------------------------------------
+# Embeddings and reranking
+# -----------------------------------------------------------------------------
+
+
+class HashedEmbedding(BaseEmbedding):
+    """
+    Signed feature hashing of lowercased words into `embed_dim` buckets, L2-normalized.
+    """
+
+    embed_dim: int = 256
+
+    def __init__(self, embed_dim: int = 256, **kwargs: Any) -> None:
+        super().__init__(embed_dim=embed_dim, model_name=f"hashed-{embed_dim}", **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashedEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.embed_dim
+        for word in _WORD_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.embed_dim] += -1.0 if h >> 63 else 1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+
+class OverlapCrossEncoder:
+    """
+    Scores (query, text) pairs by how many query words the text contains.
+
+    `calls` records the number of pairs in each predict() call.
+    """
+
+    def __init__(self) -> None:
+        self.calls: List[int] = []
+
+    def predict(self, pairs: List[Any], batch_size: int = 64, show_progress_bar: bool = False) -> List[float]:
+        self.calls.append(len(pairs))
+        scores = []
+        for query, text in pairs:
+            words = set(_WORD_RE.findall(text.lower()))
+            scores.append(float(sum(w in words for w in _WORD_RE.findall(query.lower()))))
+        return scores
+
+
+# -----------------------------------------------------------------------------
+# LLM
+# -----------------------------------------------------------------------------
+
+_TOPICS = ["love", "loneliness", "the sun", "money", "home", "time passing", "friendship", "dreams", "help", "the road"]
+
+
+def _between(text: str, start: str, end: str) -> str:
+    # Text after `start` and before `end` (to the end if `end` is missing).
+    if start in text:
+        text = text.split(start, 1)[1]
+    return text.split(end, 1)[0].strip()
+
+
+def _stable_index(text: str, n: int) -> int:
+    return int(hashlib.blake2b(text.encode("utf-8"), digest_size=4).hexdigest(), 16) % n
+
+
+class TemplateResponder:
+    """
+    Canned, prompt-dependent answers for each agent (keyed on its SYSTEM prompt).
+    """
+
+    def __init__(self) -> None:
+        from src.nodes import analyst, planner, researcher, reviewer_editor, reviewer_validator, writer
+
+        self.handlers: Dict[str, Callable[[str], str]] = {
+            planner.SYSTEM: self.plan,
+            researcher.SYSTEM: self.research,
+            analyst.SYSTEM: self.analyze,
+            writer.SYSTEM: self.write,
+            reviewer_validator.SYSTEM: lambda user: _between(user, "Draft report:\n", "\n\nEvidence"),
+            reviewer_editor.SYSTEM: lambda user: _between(user, "Validated report:\n", "\n\nEdit for clarity"),
+        }
+
+    def __call__(self, system_prompt: str, user_prompt: str) -> str:
+        handler = self.handlers.get(system_prompt)
+        if handler is None:
+            return f"Answer based on the context:\n{_between(user_prompt, 'Context:', '')[:400]}"
+        return handler(user_prompt)
+
+    def plan(self, user: str) -> str:
+        question = _between(user, "Research question:\n", "\n\n")
+        start = _stable_index(question, len(_TOPICS))
+        topics = [_TOPICS[(start + i) % len(_TOPICS)] for i in range(4)]
+        return "\n".join(f"{i}. Find lyrics about {topic}" for i, topic in enumerate(topics, 1))
+
+    def research(self, user: str) -> str:
+        task = _between(user, "Sub-task:\n", "\n\n")
+        context = _between(user, "Retrieved context:\n", "\0")
+        items = []
+        for chunk in context.split("\n\n---\n\n")[:3]:
+            header, _, body = chunk.partition("\n")
+            song = _between(header, "SONG=", " |") or "Unknown"
+            lines = [ln.strip() for ln in body.splitlines() if 3 <= len(ln.split()) <= 10]
+            for line in lines[:2]:
+                items.append({"task": task, "song": song, "quote": line, "theme": task.rsplit("about", 1)[-1].strip()})
+        return json.dumps(items, ensure_ascii=False)
+
+    def analyze(self, user: str) -> str:
+        evidence = _between(user, "Evidence:\n", "\n\nWrite the analysis")
+        # Compact evidence (src/evidence.py): "Song:" headers, then `E<n> [T..] "quote" (theme)` lines.
+        songs = sorted({ln[:-1] for ln in evidence.splitlines() if ln.endswith(":") and ln != "Tasks:"})[:6]
+        themes = sorted(set(re.findall(r"^E\d+ .*\(([^()]+)\)$", evidence, re.MULTILINE)))[:6]
+        return (
+            "## Themes\n"
+            + "".join(f"- {t}: recurs across the quoted lyrics\n" for t in themes)
+            + "\n## Songs\n"
+            + "".join(f"- {s}\n" for s in songs)
+        )
+
+    def write(self, user: str) -> str:
+        question = _between(user, "Question:\n", "\n\n")
+        analysis = _between(user, "Analysis:\n", "\n\nEvidence")
+        evidence = _between(user, "Evidence:\n", "\n\nWrite the report")
+        quotes = re.findall(r'^E\d+ (?:\[[^\]]*\] )?("(?:[^"\\]|\\.)*")', evidence, re.MULTILINE)[:3]
+        highlights = "".join(f"- {q}\n" for q in quotes) or "- No quotable evidence.\n"
+        return (
+            f"# Executive summary\n{question}\n\n"
+            f"# Key findings\n{analysis}\n\n"
+            f"# Evidence highlights\n{highlights}\n"
+            "# Caveats (evidence limits)\n- Retrieval covers a subset of the corpus.\n"
+        )
+
+
+def _response(text: str, input_tokens: int) -> Any:
+    # Just the parts of an openai Response that the project reads.
+    usage = SimpleNamespace(input_tokens=input_tokens, output_tokens=estimate_tokens(text))
+    return SimpleNamespace(output=[SimpleNamespace(content=[SimpleNamespace(text=text)])], usage=usage)
+
+
+class FakeLLMClient:
+    """
+    LLMClient look-alike that answers from a TemplateResponder.
+
+    `latency_s` is added per request and `token_latency_s` per output token,
+    to approximate a remote model. Both default to 0 (pure local overhead).
+    """
+
+    def __init__(self, latency_s: float = 0.0, token_latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+        self.token_latency_s = token_latency_s
+        self.respond = TemplateResponder()
+        self.requests = 0
+
+    def _answer(self, request: Dict[str, Any]) -> Any:
+        self.requests += 1
+        messages = {m["role"]: m["content"] for m in request["input"]}
+        text = self.respond(messages.get("system", ""), messages.get("user", ""))
+        return _response(text, estimate_tokens(messages.get("system", "") + messages.get("user", "")))
+
+    def _delay(self, resp: Any) -> float:
+        return self.latency_s + self.token_latency_s * resp.usage.output_tokens
+
+    def create(self, estimated_tokens: int = 0, **request: Any) -> Any:
+        resp = self._answer(request)
+        time.sleep(self._delay(resp))
+        return resp
+
+    async def acreate(self, estimated_tokens: int = 0, **request: Any) -> Any:
+        resp = self._answer(request)
+        await asyncio.sleep(self._delay(resp))
+        return resp
+
+    def stream(self, estimated_tokens: int = 0, on_usage: Optional[Callable[[Any], None]] = None, **request: Any) -> Iterator[str]:
+        resp = self._answer(request)
+        time.sleep(self.latency_s)
+        for piece in re.findall(r"\S+\s*", resp.output[0].content[0].text):
+            time.sleep(self.token_latency_s)
+            yield piece
+        if on_usage is not None:
+            on_usage(resp.usage)
+
+    async def astream(self, estimated_tokens: int = 0, on_usage: Optional[Callable[[Any], None]] = None, **request: Any) -> AsyncIterator[str]:
+        resp = self._answer(request)
+        await asyncio.sleep(self.latency_s)
+        for piece in re.findall(r"\S+\s*", resp.output[0].content[0].text):
+            await asyncio.sleep(self.token_latency_s)
+            yield piece
+        if on_usage is not None:
+            on_usage(resp.usage)
+
+    def close(self) -> None:
+        pass
+
+
+# -----------------------------------------------------------------------------
+# Wiring
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class OfflineStack:
+    index: Any
+    embed_model: HashedEmbedding
+    llm: FakeLLMClient
+    nodes: int
+    build_s: float
+
+
+def build_offline_index(corpus: str = CORPUS, embed_dim: int = 256) -> Any:
+    """
+    In-memory VectorStoreIndex over `corpus`, chunked like src.index_build.
+    """
+    docs = list(iter_corpus_documents(corpus))
+    _assign_doc_ids(docs, {})
+    embed_model = HashedEmbedding(embed_dim)
+    return VectorStoreIndex.from_documents(
+        docs,
+        embed_model=embed_model,
+        transformations=[SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)],
+    )
+
+
+def install_offline_stack(
+    corpus: str = CORPUS,
+    embed_dim: int = 256,
+    llm_latency_s: float = 0.0,
+    llm_token_latency_s: float = 0.0,
+) -> OfflineStack:
+    """
+    Build the offline index and point the retrieval / generation layer at the fakes.
+    """
+    import src.tools as tools
+
+    t0 = time.perf_counter()
+    index = build_offline_index(corpus, embed_dim)
+    build_s = time.perf_counter() - t0
+
+    reranker = tools.CrossEncoderReranker(model_name="overlap")
+    reranker._model = OverlapCrossEncoder()
+    llm = FakeLLMClient(llm_latency_s, llm_token_latency_s)
+    Settings.embed_model = index._embed_model
+
+    tools._index = index
+    tools._bm25 = build_bm25(index.docstore)
+    tools._metadata_index = MetadataIndex.build(index.docstore)
+    tools._reranker = reranker
+    tools._llm = llm
+    tools._index_version = f"offline:{docstore_fingerprint(index.docstore)}"
+
+    return OfflineStack(index, index._embed_model, llm, len(index.docstore.docs), build_s)
@@ -1,5 +1,12 @@
-from tools import rag_search
-from tools import call_llm
+import argparse
+import sys
+from pathlib import Path
+
+# Allow `python src/cli.py` from anywhere: everything is imported from the `src` package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.tools import call_llm_streaming, rag_search, stream_tokens_to, warmup
+from src.tracing import Tracer, summarize
 
 # System prompt:
 # This defines the model's role and behaviour.
@@ -21,13 +28,71 @@ def answer_question(question: str) -> str:
     user_prompt = f"Question:\n{question}\n\nContext:\n{context}"
 
     # Call the language model using the system prompt + user prompt.
-    # The model will generate an answer based on the retrieved text.
-    return call_llm(SYSTEM, user_prompt)
+    # The model will generate an answer based on the retrieved text
+    # (streamed to the terminal as it is generated, see token_printer).
+    return call_llm_streaming(SYSTEM, user_prompt, stage="answer")
+
+
+def run_pipeline(question: str) -> str:
+    # Full agent workflow (planner -> researchers -> analyst -> writer -> reviewers).
+    # Imported here so the single-shot mode never pays for LangGraph.
+    from src.graph import run_pipeline as run_graph
+
+    state = run_graph(question)
+    return state.get("final_report", "")
+
+
+def token_printer():
+    # Token sink for stream_tokens_to(): prints streamed text as it arrives,
+    # with a header whenever the pipeline moves to a new stage (writer, editor).
+    current = {"stage": None}
+
+    def sink(stage: str, delta: str) -> None:
+        if stage != current["stage"]:
+            if stage != "answer":
+                print(f"\n\n--- {stage} ---")
+            current["stage"] = stage
+        print(delta, end="", flush=True)
+
+    return sink
+
+
+def print_trace_summary(spans) -> None:
+    # Where this question's seconds and dollars went, per stage.
+    print(f"\n{'stage':20s} {'seconds':>8s} {'llm':>4s} {'cached':>6s} {'in tok':>8s} {'out tok':>8s} {'usd':>8s}")
+    for stage, row in summarize(spans).items():
+        print(
+            f"{stage:20s} {row['seconds']:8.2f} {row['llm_calls']:4d} {row['llm_cache_hits']:6d} "
+            f"{row['input_tokens']:8d} {row['output_tokens']:8d} {row['cost_usd']:8.4f}"
+        )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ask a question about the lyrics corpus.")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Run the full multi-agent pipeline (src/graph.py) instead of a single RAG answer.",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Print per-stage time, token and cost totals after the answer.",
+    )
+    args = parser.parse_args()
+
+    # Load the index, BM25, reranker and LLM client in the background
+    # while the user is still typing; answer_question() waits if needed.
+    warmup()
+
     # Get a question from the user.
     q = input("Enter your question: ")
 
-    # Print the model's grounded answer.
-    print(answer_question(q))
+    # Print the model's grounded answer (or the reviewed pipeline report)
+    # token by token as it is generated.
+    with stream_tokens_to(token_printer()), Tracer().activate() as tracer:
+        run_pipeline(q) if args.pipeline else answer_question(q)
+    print()
+
+    if args.trace:
+        print_trace_summary(tracer.export())
@@ -8,8 +8,9 @@ All environment-variable driven configuration lives here so that:
 """
 
 import os
+from typing import Any, Optional
+
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Load variables from a local .env file if present.
 # In production, environment variables are expected to be set externally.
@@ -21,8 +22,9 @@ load_dotenv()
 # ---------------------------------------------------------------------
 
 # OpenAI API key is required for all LLM and embedding calls.
-# Fail fast if it is missing.
-OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
+# It is checked when the first API client is built (see require_api_key()),
+# not at import time, so importing the project never needs it.
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
 
 # ---------------------------------------------------------------------
@@ -33,11 +35,151 @@ OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
 # Can be overridden via environment variable for cost/quality trade-offs.
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4.1-mini")
 
+# Per-request timeout (seconds) for LLM calls.
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+
+# How many times a rate-limited / failed LLM call is retried with backoff.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+# Maximum number of LLM requests in flight across the whole process.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Client-side tokens-per-minute budget (prompt + max output). 0 disables it.
+# Set this just under the account's TPM limit to avoid 429s under load.
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+
+# Optional override of the API endpoint (proxies, local fakes).
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
 # Embedding model used by the retrieval layer.
 # Keeping this configurable allows future experimentation without refactors.
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
 
 
+# ---------------------------------------------------------------------
+# Agent configuration (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# Maximum number of researcher sub-tasks processed concurrently.
+# Each sub-task is one LLM round trip, so this bounds in-flight requests.
+RESEARCHER_MAX_WORKERS = int(os.getenv("RESEARCHER_MAX_WORKERS", "4"))
+
+
+# ---------------------------------------------------------------------
+# Reranker configuration (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# Cross-encoder used to rerank fused retrieval candidates.
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-2-v2")
+
+# Number of (query, chunk) pairs scored per forward pass.
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+
+# Device for the cross-encoder ("cpu", "cuda", "mps").
+# Empty means auto-detect, which falls back to CPU on hosts without a GPU.
+RERANK_DEVICE = os.getenv("RERANK_DEVICE", "") or None
+
+# Cap on intra-op CPU threads used by the cross-encoder (0 = library default).
+# Useful on shared hosts where torch would otherwise claim every core.
+RERANK_MAX_THREADS = int(os.getenv("RERANK_MAX_THREADS", "0"))
+
+
+# ---------------------------------------------------------------------
+# Hybrid fusion (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# Which retrieval stages run:
+#   dense         - vector search only
+#   bm25          - BM25 only
+#   fusion        - dense + BM25, fused (no rerank)
+#   fusion_rerank - fusion, then the cross-encoder reranker (default)
+# benchmarks/eval_retrieval.py compares their hit rate, MRR and latency.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "fusion_rerank")
+
+# How dense and BM25 results are combined before reranking:
+#   rrf            - weighted reciprocal rank fusion (scale-free, default)
+#   relative_score - min-max normalize each list's scores, then weighted sum
+#   simple         - max raw score per node (the previous behaviour)
+FUSION_MODE = os.getenv("FUSION_MODE", "rrf")
+
+# Relative weight of each retriever in rrf / relative_score fusion.
+FUSION_DENSE_WEIGHT = float(os.getenv("FUSION_DENSE_WEIGHT", "1.0"))
+FUSION_SPARSE_WEIGHT = float(os.getenv("FUSION_SPARSE_WEIGHT", "1.0"))
+
+# RRF rank constant: score = weight / (FUSION_RRF_K + rank).
+FUSION_RRF_K = int(os.getenv("FUSION_RRF_K", "60"))
+
+
+# ---------------------------------------------------------------------
+# Prompt budgets (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# Cap on the estimated input tokens of each stage's prompt. Evidence is
+# deduplicated and compactly encoded, then trimmed to fit (0 = no cap).
+ANALYST_PROMPT_BUDGET = int(os.getenv("ANALYST_PROMPT_BUDGET", "4000"))
+WRITER_PROMPT_BUDGET = int(os.getenv("WRITER_PROMPT_BUDGET", "4000"))
+VALIDATOR_PROMPT_BUDGET = int(os.getenv("VALIDATOR_PROMPT_BUDGET", "4000"))
+
+# Quotes from the same song at least this similar (difflib ratio of the
+# normalized text, 0-1) are merged into one evidence item.
+EVIDENCE_DEDUP_SIMILARITY = float(os.getenv("EVIDENCE_DEDUP_SIMILARITY", "0.9"))
+
+
+# ---------------------------------------------------------------------
+# Quote verification (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# Drop researcher evidence whose quote does not appear verbatim (ignoring
+# case and punctuation) in that sub-task's retrieved context.
+VERIFY_QUOTES = os.getenv("VERIFY_QUOTES", "1") == "1"
+
+# Skip the LLM validator pass when every quoted string in the draft is found
+# in the evidence quotes (the draft is then used as the validated report).
+VALIDATOR_SKIP_IF_VERIFIED = os.getenv("VALIDATOR_SKIP_IF_VERIFIED", "1") == "1"
+
+# Quoted strings in the draft shorter than this many words (song titles,
+# single words) are not checked as lyric quotes.
+VALIDATOR_QUOTE_MIN_WORDS = int(os.getenv("VALIDATOR_QUOTE_MIN_WORDS", "3"))
+
+
+# ---------------------------------------------------------------------
+# Adaptive retrieval (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# When enabled, the hybrid retriever sizes its candidate pool from the BM25
+# score margin (top-1 score / top-2 score) and skips or shrinks reranking
+# for queries the sparse index already answers decisively (e.g. exact lyrics).
+RETRIEVAL_ADAPTIVE = os.getenv("RETRIEVAL_ADAPTIVE", "0") == "1"
+
+# Margin at or above which the top BM25 hit is treated as decisive: shallow
+# candidate pool, and no rerank if dense retrieval also found that hit.
+RETRIEVAL_DECISIVE_MARGIN = float(os.getenv("RETRIEVAL_DECISIVE_MARGIN", "2.0"))
+
+# Margin at or above which the candidate pool (and rerank set) is halved.
+RETRIEVAL_CONFIDENT_MARGIN = float(os.getenv("RETRIEVAL_CONFIDENT_MARGIN", "1.25"))
+
+# Smallest candidate pool the adaptive mode will use (never below k).
+RETRIEVAL_MIN_CANDIDATES = int(os.getenv("RETRIEVAL_MIN_CANDIDATES", "10"))
+
+
+# ---------------------------------------------------------------------
+# Index build configuration (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# Number of songs parsed, chunked and embedded per ingestion batch.
+# Bounds build memory independently of corpus size.
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+# Processes used to parse corpus files in parallel (0 = one per CPU core).
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+
+# Number of chunks sent per embedding request while building the index.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+
+# Number of embedding requests in flight while building the index.
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+
 # ---------------------------------------------------------------------
 # Local storage paths (optional, with defaults)
 # ---------------------------------------------------------------------
@@ -46,15 +188,118 @@ EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
 # This allows the index to be reused across runs without rebuilding embeddings.
 INDEX_PERSIST_DIR = os.getenv("INDEX_PERSIST_DIR", "data/index_storage")
 
-# Path to the lyrics corpus file used to build the index.
+# Vector store backend for dense retrieval: "simple" (LlamaIndex JSON store),
+# "numpy" (memory-mapped float32 matrix, vectorized exact top-k) or
+# "hnsw" (numpy storage + approximate nearest-neighbour graph, needs hnswlib).
+# Rebuild the index (`python -m src.index_build --full`) after changing it.
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "simple")
+
+# HNSW recall/latency knobs (only used by the "hnsw" backend).
+# M and EF_CONSTRUCTION are fixed at build time; EF_SEARCH applies per query.
+# Use `python benchmarks/eval_ann.py` to pick values.
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# Lyrics corpus used to build the index: a single file, a directory (every
+# *.txt below it, e.g. one file per artist) or a glob pattern.
 # Default points to the checked-in Beatles lyrics corpus.
 CORPUS_PATH = os.getenv("CORPUS_PATH", "data/corpus/beatles_lyrics.txt")
 
 
+# ---------------------------------------------------------------------
+# Caching (optional, with defaults)
+# ---------------------------------------------------------------------
+
+# Cache LLM responses keyed on (model, prompts, generation params).
+# All nodes call the LLM at temperature=0, so re-running a question can reuse
+# earlier responses. Set to 0 to always call the API.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+
+# SQLite file for the persistent LLM cache tier. Empty = memory only.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm_responses.sqlite")
+
+# Size bounds for the in-memory and on-disk tiers (entries).
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "10000"))
+
+# Cached responses older than this are ignored and evicted (seconds). 0 = no expiry.
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+
+# Cache query embeddings keyed on (embed model, normalized text).
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"
+
+# SQLite file for the persistent embedding cache tier. Empty = memory only.
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "data/cache/embeddings.sqlite")
+
+# Size bounds for the in-memory and on-disk embedding tiers (entries).
+# One text-embedding-3-small vector is ~6 KB as float32.
+EMBED_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBED_CACHE_MEMORY_ENTRIES", "4096"))
+EMBED_CACHE_DISK_ENTRIES = int(os.getenv("EMBED_CACHE_DISK_ENTRIES", "50000"))
+
+# Cache rag_retrieve results keyed on (normalized query, k, filters, index
+# version, retrieval settings). Rebuilding the index changes the version, so
+# stale entries are never served.
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "1") == "1"
+
+# SQLite file for the persistent retrieval cache tier. Empty = memory only.
+RETRIEVAL_CACHE_PATH = os.getenv("RETRIEVAL_CACHE_PATH", "data/cache/retrieval.sqlite")
+
+# Size bounds for the in-memory and on-disk retrieval tiers (entries).
+RETRIEVAL_CACHE_MEMORY_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MEMORY_ENTRIES", "1024"))
+RETRIEVAL_CACHE_DISK_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_DISK_ENTRIES", "20000"))
+
+
+# ---------------------------------------------------------------------
+# Tracing
+# ---------------------------------------------------------------------
+
+# Append every pipeline run's spans to this JSONL file. Empty = off.
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+
+# OTLP/HTTP collector to send spans to, e.g. http://localhost:4318. Empty = off.
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+TRACE_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "agentic-rag")
+
+# Prices used for the per-stage cost estimate in traces (USD per 1M tokens).
+LLM_INPUT_USD_PER_MTOK = float(os.getenv("LLM_INPUT_USD_PER_MTOK", "0.40"))
+LLM_OUTPUT_USD_PER_MTOK = float(os.getenv("LLM_OUTPUT_USD_PER_MTOK", "1.60"))
+
+
 # ---------------------------------------------------------------------
 # API clients
 # ---------------------------------------------------------------------
 
 # OpenAI client used throughout the project.
-# Instantiated once here so all calls share configuration.
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Built on first use: importing openai alone takes about a second, and most
+# imports of this module (tests, --help, index tooling) never call the API.
+_client: Optional[Any] = None
+
+
+def require_api_key() -> str:
+    """
+    Return OPENAI_API_KEY, failing with a clear message if it is not set.
+    """
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY is not set; export it or add it to .env.")
+    return OPENAI_API_KEY
+
+
+def get_client() -> Any:
+    """
+    Shared OpenAI client, created on first call so all calls share configuration.
+    """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+
+        _client = OpenAI(api_key=require_api_key())
+    return _client
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps `from src.config import client` working without an eager client.
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
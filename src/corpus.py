@@ -1,6 +1,12 @@
+import glob
+import hashlib
+import os
 import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from llama_index.core import Document
 
@@ -11,69 +17,220 @@ def _song_from_file_stem(stem: str) -> str:
     return stem.replace("_", " ").strip()
 
 
-def load_beatles_lyrics_corpus(corpus_path: str) -> List[Document]:
+def _iter_lines(corpus_path: str) -> Iterator[str]:
     """
-    Parse beatles_lyrics.txt into one LlamaIndex Document per song.
+    Yield lines one at a time, split exactly like str.splitlines() on the whole file.
+    """
+    with open(corpus_path, encoding="utf-8") as f:
+        for raw in f:
+            # Universal newlines handle \n, \r\n and \r; splitlines() also
+            # breaks on the rarer separators (\x0c, \x1c, \u2028, ...).
+            yield from raw.splitlines()
 
-    Expected repeated block format:
 
-      lyrics/Album/Song_Name.txt
-      ===
-      <lyrics...>
-      ===
+class _Lines:
+    """Line iterator with one line of pushback."""
 
-    Metadata: song, album, source_path
-    """
-    text = Path(corpus_path).read_text(encoding="utf-8")
-    lines = text.splitlines()
+    def __init__(self, lines: Iterable[str]) -> None:
+        self._it = iter(lines)
+        self._pushed: Optional[str] = None
 
-    docs: List[Document] = []
-    i = 0
+    def __iter__(self) -> "_Lines":
+        return self
 
-    while i < len(lines):
-        if not lines[i].strip():
-            i += 1
-            continue
+    def __next__(self) -> str:
+        if self._pushed is not None:
+            line, self._pushed = self._pushed, None
+            return line
+        return next(self._it)
 
-        m = _PATH_LINE_RE.match(lines[i].strip())
+    def push(self, line: str) -> None:
+        self._pushed = line
+
+
+def _parse_blocks(lines: Iterable[str], corpus: Optional[str] = None) -> Iterator[Document]:
+    it = _Lines(lines)
+
+    for line in it:
+        m = _PATH_LINE_RE.match(line.strip())
         if not m:
-            i += 1
             continue
 
         album = m.group("album").strip()
         file_stem = m.group("file").strip()
         song = _song_from_file_stem(file_stem)
-        source_path = lines[i].strip()
-        i += 1
+        source_path = line.strip()
 
         # Seek opening delimiter ===
-        while i < len(lines) and not lines[i].strip():
-            i += 1
-        if i >= len(lines) or lines[i].strip() != "===":
+        opening = next((s for s in it if s.strip()), None)
+        if opening is None:
+            return
+        if opening.strip() != "===":
+            # Not a block; re-examine this line as a possible path line.
+            it.push(opening)
             continue
-        i += 1
 
-        # Collect lyrics until closing ===
+        # Collect lyrics until closing === (consumed) or end of file
         lyric_lines: List[str] = []
-        while i < len(lines) and lines[i].strip() != "===":
-            lyric_lines.append(lines[i])
-            i += 1
-
-        # Consume closing === if present
-        if i < len(lines) and lines[i].strip() == "===":
-            i += 1
+        for s in it:
+            if s.strip() == "===":
+                break
+            lyric_lines.append(s)
 
         lyrics = "\n".join(lyric_lines).strip()
         if lyrics:
-            docs.append(
-                Document(
-                    text=lyrics,
-                    metadata={
-                        "song": song,
-                        "album": album,
-                        "source_path": source_path,
-                    },
-                )
-            )
-
-    return docs
+            metadata = {
+                "song": song,
+                "album": album,
+                "source_path": source_path,
+            }
+            if corpus is not None:
+                metadata["corpus"] = corpus
+            yield Document(text=lyrics, metadata=metadata)
+
+
+def iter_beatles_lyrics_corpus(corpus_path: str, corpus: Optional[str] = None) -> Iterator[Document]:
+    """
+    Streaming variant of load_beatles_lyrics_corpus.
+
+    Reads the file incrementally and yields one Document per song as soon as
+    its block is complete, so memory stays flat regardless of corpus size.
+    If `corpus` is given it is added to each Document's metadata.
+    """
+    return _parse_blocks(_iter_lines(corpus_path), corpus=corpus)
+
+
+# -----------------------------------------------------------------------------
+# Multi-file ingestion
+# -----------------------------------------------------------------------------
+
+
+def resolve_corpus_files(spec: str) -> List[Path]:
+    """
+    Expand CORPUS_PATH into corpus files: a single file, a directory
+    (every *.txt below it) or a glob pattern. Sorted for stable ordering.
+    """
+    if any(ch in spec for ch in "*?["):
+        return sorted(Path(p) for p in glob.glob(spec, recursive=True) if os.path.isfile(p))
+    path = Path(spec)
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*.txt") if p.is_file())
+    return [path]
+
+
+def corpus_name(path: Path) -> str:
+    """
+    Corpus label for a file: its stem (e.g. beatles_lyrics).
+    """
+    return path.stem
+
+
+def corpus_names(files: List[Path]) -> Dict[Path, str]:
+    """
+    Corpus label per file, unique across `files`.
+
+    Files keep their stem unless another file shares it (a/lyrics.txt and
+    b/lyrics.txt); those are named by their path relative to the files'
+    common directory, without the suffix (a/lyrics, b/lyrics). The label
+    prefixes doc ids, so two files must never share one.
+    """
+    stems: Dict[str, int] = {}
+    for path in files:
+        stems[corpus_name(path)] = stems.get(corpus_name(path), 0) + 1
+    root = Path(os.path.commonpath([p.resolve().parent for p in files])) if files else Path()
+    return {
+        path: corpus_name(path) if stems[corpus_name(path)] == 1 else path.resolve().relative_to(root).with_suffix("").as_posix()
+        for path in files
+    }
+
+
+def _parse_file(path: str, name: str) -> List[Tuple[str, Dict[str, Any]]]:
+    # Process-pool worker: return plain tuples, which pickle cheaply.
+    return [(d.text, d.metadata) for d in iter_beatles_lyrics_corpus(path, corpus=name)]
+
+
+def song_key(doc: Document) -> str:
+    """
+    Identity of a song for cross-file dedup: normalized title + normalized lyrics.
+    """
+    title = " ".join(doc.metadata.get("song", "").lower().split())
+    text = " ".join(doc.text.split())
+    return hashlib.sha256(f"{title}\0{text}".encode("utf-8")).hexdigest()
+
+
+def iter_corpus_documents(spec: str, workers: Optional[int] = None) -> Iterator[Document]:
+    """
+    Stream Documents from every corpus file matched by `spec`.
+
+    Each Document gets a `corpus` metadata field. A single file is streamed
+    in-process; several files are parsed in a process pool (one file per task,
+    results yielded in file order). Songs that appear identically in more than
+    one file are kept once, from the first file; repeats within one file (the
+    same song on two albums) are all kept.
+
+    A worker returns a whole parsed file, and at most `workers` files are
+    parsed ahead of the one being yielded. So with a pool, this process holds
+    up to workers + 1 parsed files at once: memory is bounded by the largest
+    files, not the corpus. Split very large corpora into several files (or
+    pass workers=1 to stream them line by line).
+    """
+    files = resolve_corpus_files(spec)
+    names = corpus_names(files)
+    seen: Dict[str, Path] = {}  # song key -> file it was first seen in
+
+    def dedup(path: Path, docs: Iterable[Document]) -> Iterator[Document]:
+        for doc in docs:
+            if seen.setdefault(song_key(doc), path) == path:
+                yield doc
+
+    if len(files) <= 1 or workers == 1:
+        for path in files:
+            yield from dedup(path, iter_beatles_lyrics_corpus(str(path), corpus=names[path]))
+        return
+
+    window = max(1, workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=window) as pool:
+
+        def submit(path: Path) -> Tuple[Path, Future]:
+            return path, pool.submit(_parse_file, str(path), names[path])
+
+        # Unlike pool.map, which submits every file up front and keeps all of
+        # their results until consumed, keep only `window` files in flight.
+        queued = iter(files)
+        pending: Deque[Tuple[Path, Future]] = deque(submit(p) for p in islice(queued, window))
+        while pending:
+            path, future = pending.popleft()
+            parsed = future.result()
+            next_path = next(queued, None)
+            if next_path is not None:
+                pending.append(submit(next_path))
+            yield from dedup(path, (Document(text=text, metadata=meta) for text, meta in parsed))
+
+
+def iter_document_batches(docs: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    """
+    Group a Document stream into lists of at most batch_size.
+    """
+    it = iter(docs)
+    while True:
+        batch = list(islice(it, max(1, batch_size)))
+        if not batch:
+            return
+        yield batch
+
+
+def load_beatles_lyrics_corpus(corpus_path: str) -> List[Document]:
+    """
+    Parse beatles_lyrics.txt into one LlamaIndex Document per song.
+
+    Expected repeated block format:
+
+      lyrics/Album/Song_Name.txt
+      ===
+      <lyrics...>
+      ===
+
+    Metadata: song, album, source_path
+    """
+    text = Path(corpus_path).read_text(encoding="utf-8")
+    return list(_parse_blocks(text.splitlines()))
@@ -0,0 +1,114 @@
+"""
+Embedding cache for the retrieval layer.
+
+CachedEmbedding wraps any LlamaIndex embedding model (OpenAIEmbedding in
+practice) and stores vectors keyed by (model name, normalized text). Vectors
+are stored as packed float32 bytes in a TieredCache (memory LRU + bounded
+SQLite file), so repeated planner sub-tasks and rag_search queries are not
+re-embedded through the API.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from src.cache import TieredCache, content_key
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse whitespace. Case and punctuation are kept: they change embeddings.
+    """
+    return " ".join(text.split())
+
+
+def encode_vector(vector: Embedding) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode_vector(data: bytes) -> Embedding:
+    return np.frombuffer(data, dtype=np.float32).tolist()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Read-through cache in front of another embedding model.
+
+    Batch calls only forward cache misses to the wrapped model, in one batch.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: TieredCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: TieredCache, **kwargs: Any) -> None:
+        kwargs.setdefault("model_name", inner.model_name)
+        kwargs.setdefault("embed_batch_size", inner.embed_batch_size)
+        super().__init__(**kwargs)
+        self._inner = inner
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> TieredCache:
+        return self._cache
+
+    def _key(self, text: str) -> str:
+        return content_key(self.model_name, normalize_text(text))
+
+    def _lookup(self, text: str) -> Optional[Embedding]:
+        hit = self._cache.get(self._key(text))
+        return decode_vector(hit) if hit is not None else None
+
+    def _store(self, text: str, vector: Embedding) -> None:
+        self._cache.set(self._key(text), encode_vector(vector))
+
+    # -- sync ---------------------------------------------------------------
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        vector = self._lookup(query)
+        if vector is None:
+            vector = self._inner.get_query_embedding(query)
+            self._store(query, vector)
+        return vector
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        out: List[Optional[Embedding]] = [self._lookup(t) for t in texts]
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            fresh = self._inner.get_text_embedding_batch([texts[i] for i in missing])
+            for i, vector in zip(missing, fresh):
+                self._store(texts[i], vector)
+                out[i] = vector
+        return out  # type: ignore[return-value]
+
+    # -- async --------------------------------------------------------------
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        vector = self._lookup(query)
+        if vector is None:
+            vector = await self._inner.aget_query_embedding(query)
+            self._store(query, vector)
+        return vector
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        out: List[Optional[Embedding]] = [self._lookup(t) for t in texts]
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            fresh = await self._inner.aget_text_embedding_batch([texts[i] for i in missing])
+            for i, vector in zip(missing, fresh):
+                self._store(texts[i], vector)
+                out[i] = vector
+        return out  # type: ignore[return-value]
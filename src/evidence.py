@@ -0,0 +1,237 @@
+"""
+Compact evidence encoding and prompt budgeting for the downstream agents.
+
+The analyst, writer and validator all receive the researcher's evidence list.
+Sent as JSON, every item repeats its (long) sub-task string and the key
+names. Here the evidence is instead:
+
+1) deduplicated: near-identical quotes from the same song are merged, and
+   their tasks and themes are combined;
+2) encoded compactly: tasks get short ids (T1, T2, ...), items are grouped
+   by song and numbered E1, E2, ...:
+
+       Tasks:
+       T1 Find lyrics about loneliness
+       T2 Find lyrics about help
+
+       Eleanor Rigby:
+       E1 [T1,T2] "all the lonely people" (loneliness / isolation)
+
+3) trimmed to a per-stage token budget, taking items from the
+   best-covered task first. Every task keeps at least one item, even if
+   that leaves the prompt over budget, and items the validator's draft
+   quotes are dropped last.
+
+prepare_evidence() does all three and reports the tokens saved against the
+JSON encoding.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Collection, Dict, List, Sequence
+
+from src.config import EVIDENCE_DEDUP_SIMILARITY
+
+Evidence = List[Dict[str, Any]]
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9\s]+")
+
+
+def normalize_quote(text: str) -> str:
+    """
+    Lowercase, drop punctuation, collapse whitespace.
+    """
+    return " ".join(_NON_WORD_RE.sub(" ", text.lower()).split())
+
+
+def _tasks(item: Dict[str, Any]) -> List[str]:
+    tasks = item.get("tasks")
+    if isinstance(tasks, list):
+        return [str(t) for t in tasks]
+    return [str(item["task"])] if item.get("task") else []
+
+
+def _near_duplicate(a: str, b: str, similarity: float) -> bool:
+    if a == b or a in b or b in a:
+        return True
+    return SequenceMatcher(None, a, b, autojunk=False).ratio() >= similarity
+
+
+def dedupe_evidence(evidence: Sequence[Dict[str, Any]], similarity: float = EVIDENCE_DEDUP_SIMILARITY) -> Evidence:
+    """
+    Merge near-identical quotes from the same song, keeping the first (longest
+    wins the quote text). Merged items carry all their tasks under "tasks" and
+    a "; "-joined theme.
+    """
+    kept: Evidence = []
+    keys: List[str] = []
+    for item in evidence:
+        quote = str(item.get("quote", "")).strip()
+        if not quote:
+            continue
+        key = normalize_quote(quote)
+        song = str(item.get("song") or "Unknown")
+
+        for i, existing in enumerate(kept):
+            if existing["song"] == song and _near_duplicate(keys[i], key, similarity):
+                if len(key) > len(keys[i]):
+                    existing["quote"], keys[i] = quote, key
+                existing["tasks"] += [t for t in _tasks(item) if t not in existing["tasks"]]
+                theme = str(item.get("theme") or "").strip()
+                if theme and theme not in existing["theme"].split("; "):
+                    existing["theme"] = f"{existing['theme']}; {theme}" if existing["theme"] else theme
+                break
+        else:
+            kept.append(
+                {
+                    "song": song,
+                    "quote": quote,
+                    "theme": str(item.get("theme") or "").strip(),
+                    "tasks": _tasks(item),
+                }
+            )
+            keys.append(key)
+    return kept
+
+
+def encode_evidence(evidence: Sequence[Dict[str, Any]]) -> str:
+    """
+    Compact text form of (deduplicated) evidence; see the module docstring.
+    """
+    if not evidence:
+        return "(no evidence)"
+
+    task_ids: Dict[str, str] = {}
+    for item in evidence:
+        for task in _tasks(item):
+            task_ids.setdefault(task, f"T{len(task_ids) + 1}")
+
+    by_song: Dict[str, List[str]] = {}
+    for n, item in enumerate(evidence, start=1):
+        refs = ",".join(task_ids[t] for t in _tasks(item))
+        line = f"E{n}" + (f" [{refs}]" if refs else "") + f" {json.dumps(item['quote'], ensure_ascii=False)}"
+        if item.get("theme"):
+            line += f" ({item['theme']})"
+        by_song.setdefault(str(item.get("song") or "Unknown"), []).append(line)
+
+    parts = []
+    if task_ids:
+        parts.append("Tasks:\n" + "\n".join(f"{tid} {task}" for task, tid in task_ids.items()))
+    parts.extend(f"{song}:\n" + "\n".join(lines) for song, lines in by_song.items())
+    return "\n\n".join(parts)
+
+
+def trim_to_budget(evidence: Evidence, max_tokens: int, keep: Collection[int] = ()) -> Evidence:
+    """
+    Drop items until the encoding fits in `max_tokens` (estimated).
+
+    Removes the last item of whichever task currently has the most items, so
+    coverage across sub-tasks is kept as long as possible. The last item of a
+    task is never removed, so the result can stay over budget. Items whose
+    index is in `keep` are only removed once no other item can be. Order is
+    preserved.
+    """
+    from src.llm_client import estimate_tokens
+
+    items = list(enumerate(evidence))
+    while items and estimate_tokens(encode_evidence([item for _, item in items])) > max_tokens:
+        counts: Dict[str, int] = {}
+        for _, item in items:
+            for task in _tasks(item) or [""]:
+                counts[task] = counts.get(task, 0) + 1
+        droppable = [pos for pos, (_, item) in enumerate(items) if all(counts[t] > 1 for t in _tasks(item) or [""])]
+        candidates = [pos for pos in droppable if items[pos][0] not in keep] or droppable
+        if not candidates:
+            break
+        busiest = max((t for pos in candidates for t in _tasks(items[pos][1]) or [""]), key=lambda t: counts[t])
+        del items[max(pos for pos in candidates if busiest in (_tasks(items[pos][1]) or [""]))]
+    return [item for _, item in items]
+
+
+@dataclass
+class PreparedEvidence:
+    """
+    Evidence ready for a prompt, with what compaction and trimming saved.
+    """
+
+    text: str
+    items: Evidence
+    input_items: int
+    duplicates: int
+    trimmed: int
+    json_tokens: int
+    tokens: int
+    over_budget: bool = False
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.json_tokens - self.tokens)
+
+    def log_line(self, stage: str) -> str:
+        return (
+            f"[{stage}] evidence: {self.input_items} items -> {len(self.items)} "
+            f"({self.duplicates} near-duplicates merged, {self.trimmed} trimmed to budget); "
+            f"~{self.json_tokens} -> {self.tokens} tokens (saved {self.saved_tokens})"
+            + ("; over budget with one item per task" if self.over_budget else "")
+        )
+
+    def trace_attributes(self) -> Dict[str, Any]:
+        return {
+            "evidence.items_in": self.input_items,
+            "evidence.items_out": len(self.items),
+            "evidence.duplicates": self.duplicates,
+            "evidence.trimmed": self.trimmed,
+            "evidence.tokens": self.tokens,
+            "evidence.tokens_saved": self.saved_tokens,
+            "evidence.over_budget": self.over_budget,
+        }
+
+
+# How encode_evidence() output reads, for the system prompts of the stages
+# that receive it (analyst, writer, validator).
+EVIDENCE_FORMAT = """Evidence is grouped by song, one item per line:
+  E<n> [<task ids>] "<quote>" (<theme>)
+Task ids (T1, T2, ...) refer to the sub-tasks listed first."""
+
+
+def prepare_evidence(
+    evidence: Sequence[Dict[str, Any]],
+    budget: int = 0,
+    reserved: str = "",
+    quoted: Sequence[str] = (),
+) -> PreparedEvidence:
+    """
+    Deduplicate, encode and (if budget > 0) trim evidence for one prompt.
+
+    `budget` caps the estimated tokens of the whole prompt; `reserved` is the
+    rest of it (system prompt, question, draft, ...), which is not trimmed.
+    Items containing one of the `quoted` strings (e.g. the quotes in a draft
+    being validated) are trimmed last.
+    """
+    from src.llm_client import estimate_tokens
+
+    deduped = dedupe_evidence(evidence)
+    items = deduped
+    over_budget = False
+    if budget > 0:
+        max_tokens = max(0, budget - estimate_tokens(reserved))
+        wanted = [normalize_quote(q) for q in quoted]
+        keep = {i for i, item in enumerate(deduped) if any(w and w in normalize_quote(item["quote"]) for w in wanted)}
+        items = trim_to_budget(deduped, max_tokens, keep)
+        over_budget = bool(items) and estimate_tokens(encode_evidence(items)) > max_tokens
+
+    text = encode_evidence(items)
+    return PreparedEvidence(
+        text=text,
+        items=items,
+        input_items=len(evidence),
+        duplicates=len(evidence) - len(deduped),
+        trimmed=len(deduped) - len(items),
+        json_tokens=estimate_tokens(json.dumps(list(evidence), ensure_ascii=False)),
+        tokens=estimate_tokens(text),
+        over_budget=over_budget,
+    )
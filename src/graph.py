@@ -0,0 +1,122 @@
+"""
+graph.py
+
+The end-to-end agent workflow as a compiled LangGraph graph over AgentState:
+
+    planner -> research_retrieve -> research_task (x N, in parallel)
+            -> research_merge -> analyst -> writer
+            -> reviewer_validator -> reviewer_editor
+
+research_task is a map step: one Send per planner sub-task, run as parallel
+branches (bounded by RESEARCHER_MAX_WORKERS) and reduced back into
+`evidence` by research_merge in sub-task order.
+
+The agent nodes are plain functions that mutate and return the whole state
+(so they can also be chained by hand, as in src/test_*.py). The graph wraps
+them so each returns only the keys it changed.
+
+run_pipeline() traces each run (src/tracing.py) into state["trace"].
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Union
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from src.config import RESEARCHER_MAX_WORKERS
+from src.graph_state import AgentState
+from src.nodes.analyst import analyst_node
+from src.nodes.planner import planner_node
+from src.nodes.researcher import research_merge_node, research_retrieve_node, research_task_node
+from src.nodes.reviewer_editor import reviewer_editor_node
+from src.nodes.reviewer_validator import reviewer_validator_node
+from src.nodes.writer import writer_node
+from src.tracing import PIPELINE, Tracer, current_tracer, export_trace, span
+
+Node = Callable[[AgentState], AgentState]
+
+
+def _updates_only(node: Node) -> Callable[[AgentState], Dict[str, Any]]:
+    """
+    Run a whole-state node on a private copy and return only what it changed.
+
+    Lists are copied so in-place appends (e.g. to logs) never touch the
+    graph's own state, and reducer channels are not re-sent.
+    """
+
+    def run(state: AgentState) -> Dict[str, Any]:
+        before = {k: list(v) if isinstance(v, list) else v for k, v in state.items()}
+        after = node({k: list(v) if isinstance(v, list) else v for k, v in state.items()})  # type: ignore[arg-type]
+        return {k: v for k, v in after.items() if k not in before or before[k] != v}
+
+    run.__name__ = node.__name__
+    return run
+
+
+def _fan_out_research(state: AgentState) -> Union[List[Send], str]:
+    sub_tasks = state.get("sub_tasks", [])
+    contexts = state.get("research_contexts", [])
+    chunk_texts = state.get("research_chunk_texts", [])
+    if not sub_tasks:
+        return "research_merge"
+    return [
+        Send("research_task", {"index": i, "task": task, "context": context, "chunk_texts": texts})
+        for i, (task, context, texts) in enumerate(zip(sub_tasks, contexts, chunk_texts))
+    ]
+
+
+def build_graph() -> Any:
+    """
+    Compile the pipeline graph.
+    """
+    graph = StateGraph(AgentState)
+
+    graph.add_node("planner", _updates_only(planner_node))
+    graph.add_node("research_retrieve", research_retrieve_node)
+    graph.add_node("research_task", research_task_node)
+    graph.add_node("research_merge", research_merge_node)
+    graph.add_node("analyst", _updates_only(analyst_node))
+    graph.add_node("writer", _updates_only(writer_node))
+    graph.add_node("reviewer_validator", _updates_only(reviewer_validator_node))
+    graph.add_node("reviewer_editor", _updates_only(reviewer_editor_node))
+
+    graph.add_edge(START, "planner")
+    graph.add_edge("planner", "research_retrieve")
+    graph.add_conditional_edges("research_retrieve", _fan_out_research, ["research_task", "research_merge"])
+    graph.add_edge("research_task", "research_merge")
+    graph.add_edge("research_merge", "analyst")
+    graph.add_edge("analyst", "writer")
+    graph.add_edge("writer", "reviewer_validator")
+    graph.add_edge("reviewer_validator", "reviewer_editor")
+    graph.add_edge("reviewer_editor", END)
+
+    return graph.compile()
+
+
+_graph: Any = None
+
+
+def run_pipeline(question: str, max_concurrency: int = RESEARCHER_MAX_WORKERS) -> AgentState:
+    """
+    Run the full agent pipeline for one question and return the final state.
+
+    The run is traced: state["trace"] holds one span per node and per LLM /
+    retrieval call, and is exported to TRACE_JSONL_PATH and/or the OTLP
+    collector when configured.
+    """
+    global _graph
+    if _graph is None:
+        _graph = build_graph()
+
+    # Join the caller's trace if there is one (e.g. the CLI's --trace).
+    tracer = current_tracer() or Tracer()
+    with tracer.activate(), span("pipeline", PIPELINE, question=question):
+        state = _graph.invoke(
+            {"question": question, "logs": []},
+            config={"max_concurrency": max(1, max_concurrency)},
+        )
+    state["trace"] = tracer.export()
+    export_trace(state["trace"])
+    return state
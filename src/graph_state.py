@@ -21,7 +21,8 @@ Keeping the shared state explicitly defined in one place makes the system:
 - Safer to extend (new agents = new fields)
 """
 
-from typing import List, Dict, TypedDict, Any
+import operator
+from typing import Annotated, List, Dict, TypedDict, Any
 
 
 class AgentState(TypedDict, total=False):
@@ -45,6 +46,14 @@ class AgentState(TypedDict, total=False):
     # {"task": str, "song": str, "quote": str, "theme": str}
     evidence: List[Dict[str, Any]]
 
+    # Researcher fan-out (graph only): batched retrieval contexts and their
+    # chunk texts (for quote checks), one per sub-task, and per-task results.
+    # Parallel branches each append one {"index", "evidence", "logs"} item;
+    # the merge step orders them.
+    research_contexts: List[str]
+    research_chunk_texts: List[List[str]]
+    research_results: Annotated[List[Dict[str, Any]], operator.add]
+
     # Analyst output: synthesized insights and patterns
     # derived from the research notes
     analysis: str
@@ -53,6 +62,12 @@ class AgentState(TypedDict, total=False):
     # structured for readability and presentation
     draft_report: str
 
-    # Reviewer output: final, quality-checked report
-    # with unsupported claims removed or caveated
+    # Validator output: draft with unsupported claims removed or caveated
+    validated_report: str
+
+    # Editor output: final, quality-checked report
     final_report: str
+
+    # Tracing spans (src/tracing.py): one dict per node, call_llm and
+    # rag_retrieve call, with timings, token counts and cache hits
+    trace: List[Dict[str, Any]]
@@ -1,41 +1,350 @@
 from __future__ import annotations
 
-from llama_index.core import Settings, VectorStoreIndex, StorageContext
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+from llama_index.core import (
+    Document,
+    Settings,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
 from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.utils import get_tokenizer
 from llama_index.embeddings.openai import OpenAIEmbedding
 
 from src.config import (
     CORPUS_PATH,
+    EMBED_BATCH_SIZE,
+    EMBED_CONCURRENCY,
     EMBED_MODEL,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
     INDEX_PERSIST_DIR,
-    OPENAI_API_KEY,
+    INGEST_BATCH_SIZE,
+    INGEST_WORKERS,
+    VECTOR_STORE_BACKEND,
+    require_api_key,
 )
 
-from src.corpus import load_beatles_lyrics_corpus
+from src.corpus import iter_corpus_documents, iter_document_batches
+from src.metadata_index import MetadataIndex
+from src.sparse_index import build_bm25, docstore_fingerprint, persist_bm25, write_index_version
+from src.vector_stores import load_storage_context, new_storage_context
+
+# Per-song fingerprints of the last build, used to skip unchanged songs, and
+# the embedding/chunking settings and vector store they were built with.
+MANIFEST_FILENAME = "build_manifest.json"
+
+# Chunking of songs into nodes.
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
 
+# Backend parameters for src.vector_stores (ignored by backends that don't use them).
+_VECTOR_STORE_PARAMS = {
+    "m": HNSW_M,
+    "ef_construction": HNSW_EF_CONSTRUCTION,
+    "ef_search": HNSW_EF_SEARCH,
+}
 
-def build_and_persist_index() -> None:
+# Embeddings finished by an in-progress build (removed once the build persists).
+CHECKPOINT_FILENAME = "embed_checkpoint.jsonl"
+
+
+def document_fingerprint(doc: Document) -> str:
     """
-    Builds a local on-disk LlamaIndex index (vectors + docstore) under INDEX_PERSIST_DIR.
-    No external vector DB required.
+    Hash of source_path + text. A song is re-embedded only when this changes.
+    """
+    h = hashlib.sha256()
+    h.update(doc.metadata.get("source_path", "").encode("utf-8"))
+    h.update(b"\0")
+    h.update(doc.text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _assign_doc_ids(docs: List[Document], seen: Dict[str, int]) -> None:
+    # Stable ids (corpus + source path) so a song maps to the same ref doc across builds.
+    # `seen` is shared across batches so duplicate paths stay unique.
+    for doc in docs:
+        base = doc.metadata.get("source_path") or document_fingerprint(doc)
+        if doc.metadata.get("corpus"):
+            base = f"{doc.metadata['corpus']}:{base}"
+        seen[base] = seen.get(base, 0) + 1
+        doc.id_ = base if seen[base] == 1 else f"{base}#{seen[base]}"
+
+
+def _build_settings() -> Dict[str, Any]:
+    # Settings every stored vector (and the store holding it) depends on; if any
+    # changes, nothing can be reused.
+    return {
+        "embed_model": EMBED_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "vector_store": VECTOR_STORE_BACKEND,
+    }
+
+
+def _load_manifest(persist_dir: str) -> Dict[str, str]:
+    """
+    Per-document fingerprints of the last build, or {} if there is nothing
+    reusable (no build, a pre-settings manifest, or different settings).
     """
-    Settings.embed_model = OpenAIEmbedding(model=EMBED_MODEL, api_key=OPENAI_API_KEY)
+    try:
+        with open(os.path.join(persist_dir, MANIFEST_FILENAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if manifest.get("settings") != _build_settings():
+        print(f"⚠️ Index in {persist_dir} was built with other embedding/chunking/vector store settings; rebuilding.")
+        return {}
+    return manifest.get("documents", {})
+
+
+def _save_manifest(persist_dir: str, fingerprints: Dict[str, str]) -> None:
+    with open(os.path.join(persist_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump({"settings": _build_settings(), "documents": fingerprints}, f, indent=2, sort_keys=True)
+
+
+class EmbeddingCheckpoint:
+    """
+    Append-only JSONL of finished embeddings, keyed by (embed model, chunk text).
+
+    Node ids are random per split, so chunks are matched by content. Each
+    completed batch is flushed to disk, so an interrupted build resumes from
+    the last finished batch.
+    """
+
+    def __init__(self, path: str, model_name: str) -> None:
+        self.path = path
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self.vectors: Dict[str, List[float]] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn write from a crash; everything before it is good
+                    self.vectors[row["key"]] = row["embedding"]
+        except FileNotFoundError:
+            pass
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def append(self, keys: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for key, vector in zip(keys, vectors):
+                    f.write(json.dumps({"key": key, "embedding": vector}) + "\n")
+                    self.vectors[key] = vector
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class EmbedReport:
+    embedded: int = 0
+    resumed: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    def add(self, other: "EmbedReport") -> None:
+        self.embedded += other.embedded
+        self.resumed += other.resumed
+        self.tokens += other.tokens
+        self.seconds += other.seconds
 
-    docs = load_beatles_lyrics_corpus(CORPUS_PATH)
+    def __str__(self) -> str:
+        secs = max(self.seconds, 1e-9)
+        return (
+            f"embedded {self.embedded} nodes ({self.tokens} tokens) in {self.seconds:.1f}s: "
+            f"{self.embedded / secs:.1f} nodes/s, {self.tokens / secs:.0f} tokens/s"
+            f"; {self.resumed} resumed from checkpoint"
+        )
 
-    splitter = SentenceSplitter(chunk_size=800, chunk_overlap=150)
 
-    index = VectorStoreIndex.from_documents(
-        docs,
-        transformations=[splitter],
-        show_progress=True,
+def embed_nodes_parallel(
+    nodes: Sequence[BaseNode],
+    embed_model: Any,
+    checkpoint: EmbeddingCheckpoint,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_CONCURRENCY,
+) -> EmbedReport:
+    """
+    Set node.embedding for every node, in concurrent batches, checkpointing each batch.
+    """
+    report = EmbedReport()
+    tokenizer = get_tokenizer()
+
+    pending: List[tuple] = []
+    for node in nodes:
+        text = node.get_content(metadata_mode=MetadataMode.EMBED)
+        key = checkpoint.key(text)
+        if key in checkpoint.vectors:
+            node.embedding = checkpoint.vectors[key]
+            report.resumed += 1
+        else:
+            pending.append((node, key, text))
+
+    batches = [pending[i : i + max(1, batch_size)] for i in range(0, len(pending), max(1, batch_size))]
+
+    def run(batch: List[tuple]) -> int:
+        vectors = embed_model.get_text_embedding_batch([text for _, _, text in batch])
+        checkpoint.append([key for _, key, _ in batch], vectors)
+        for (node, _, _), vector in zip(batch, vectors):
+            node.embedding = vector
+        return sum(len(tokenizer(text)) for _, _, text in batch)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(run, batch) for batch in batches]
+        for done, fut in enumerate(as_completed(futures), start=1):
+            report.tokens += fut.result()
+            print(f"   embedded batch {done}/{len(batches)}", end="\r", flush=True)
+    report.seconds = time.perf_counter() - t0
+    report.embedded = len(pending)
+    if batches:
+        print()
+    return report
+
+
+@dataclass
+class BuildSummary:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    nodes_embedded: int = 0
+    full_rebuild: bool = False
+    embed_report: EmbedReport = field(default_factory=EmbedReport)
+
+    def __str__(self) -> str:
+        mode = "full rebuild" if self.full_rebuild else "incremental"
+        return (
+            f"{mode}: {len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged; "
+            f"{self.nodes_embedded} nodes embedded"
+        )
+
+
+def build_and_persist_index(full: bool = False) -> BuildSummary:
+    """
+    Builds a local on-disk LlamaIndex index (vectors + docstore) under INDEX_PERSIST_DIR,
+    plus the BM25 sparse index and the metadata filter index over the same docstore.
+    No external vector DB required.
+
+    If a previous build exists, only new or changed songs are chunked and
+    embedded, and deleted songs are removed. Pass full=True to rebuild everything.
+
+    The corpus is streamed in batches of INGEST_BATCH_SIZE songs, so parsing,
+    chunking and embedding never hold more than one batch of text at a time.
+    """
+    Settings.embed_model = OpenAIEmbedding(
+        model=EMBED_MODEL,
+        api_key=require_api_key(),
+        embed_batch_size=EMBED_BATCH_SIZE,
     )
+    checkpoint = EmbeddingCheckpoint(
+        os.path.join(INDEX_PERSIST_DIR, CHECKPOINT_FILENAME),
+        Settings.embed_model.model_name,
+    )
+
+    splitter = SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    summary = BuildSummary()
+
+    previous = {} if full else _load_manifest(INDEX_PERSIST_DIR)
+
+    index = None
+    if previous:
+        try:
+            index = load_index_from_storage(
+                load_storage_context(VECTOR_STORE_BACKEND, INDEX_PERSIST_DIR, **_VECTOR_STORE_PARAMS)
+            )
+        except FileNotFoundError:
+            # e.g. VECTOR_STORE_BACKEND changed since the last build.
+            print(f"⚠️ No '{VECTOR_STORE_BACKEND}' vector store in {INDEX_PERSIST_DIR}; rebuilding.")
+            previous = {}
+
+    if index is None:
+        # No usable previous build (first build, pre-manifest index, changed
+        # embedding model or chunking, or --full).
+        summary.full_rebuild = True
+        index = VectorStoreIndex(
+            [],
+            storage_context=new_storage_context(VECTOR_STORE_BACKEND, **_VECTOR_STORE_PARAMS),
+        )
 
-    storage_context: StorageContext = index.storage_context
+    fingerprints: Dict[str, str] = {}
+    seen_ids: Dict[str, int] = {}
+
+    stream = iter_corpus_documents(CORPUS_PATH, workers=INGEST_WORKERS or None)
+    for docs in iter_document_batches(stream, INGEST_BATCH_SIZE):
+        _assign_doc_ids(docs, seen_ids)
+
+        todo: List[Document] = []
+        for doc in docs:
+            fp = document_fingerprint(doc)
+            fingerprints[doc.id_] = fp
+            if doc.id_ not in previous:
+                summary.added.append(doc.id_)
+                todo.append(doc)
+            elif previous[doc.id_] != fp:
+                summary.changed.append(doc.id_)
+                # Drop the stale nodes and vectors before re-embedding.
+                index.delete_ref_doc(doc.id_, delete_from_docstore=True)
+                todo.append(doc)
+            else:
+                summary.unchanged += 1
+
+        nodes = splitter.get_nodes_from_documents(todo)
+        if nodes:
+            summary.embed_report.add(embed_nodes_parallel(nodes, Settings.embed_model, checkpoint))
+            index.insert_nodes(nodes)
+        summary.nodes_embedded += len(nodes)
+
+    summary.removed = [doc_id for doc_id in previous if doc_id not in fingerprints]
+    for doc_id in summary.removed:
+        index.delete_ref_doc(doc_id, delete_from_docstore=True)
+
+    storage_context = index.storage_context
     storage_context.persist(persist_dir=INDEX_PERSIST_DIR)
+    _save_manifest(INDEX_PERSIST_DIR, fingerprints)
+    checkpoint.clear()
+
+    # Rebuild the sparse index from the same docstore so the two stay in sync.
+    fingerprint = docstore_fingerprint(index.docstore)
+    bm25 = build_bm25(index.docstore)
+    persist_bm25(bm25, INDEX_PERSIST_DIR, fingerprint)
+    MetadataIndex.build(index.docstore).persist(INDEX_PERSIST_DIR)
+
+    # Written last: a new version means every part of the index is in place.
+    write_index_version(INDEX_PERSIST_DIR, f"{VECTOR_STORE_BACKEND}:{fingerprint}")
 
     print(f"✅ Local index persisted to: {INDEX_PERSIST_DIR}")
+    print(f"   {summary}")
+    print(f"   {summary.embed_report}")
+    for label, ids in (("added", summary.added), ("changed", summary.changed), ("removed", summary.removed)):
+        if ids and not summary.full_rebuild:
+            print(f"   {label}: {', '.join(ids)}")
+    return summary
 
 
 if __name__ == "__main__":
-    build_and_persist_index()
+    parser = argparse.ArgumentParser(description="Build or update the local retrieval index.")
+    parser.add_argument("--full", action="store_true", help="Re-embed every song, ignoring the previous build.")
+    args = parser.parse_args()
+    build_and_persist_index(full=args.full)
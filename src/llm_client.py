@@ -0,0 +1,340 @@
+"""
+Pooled, rate-limit-aware client for the OpenAI Responses API.
+
+All requests run on one background event loop that owns a single AsyncOpenAI
+client (and so a single pooled HTTP connection). This lets sync callers
+(agent nodes, researcher worker threads) and async callers share the same
+connection pool, concurrency limit and token bucket.
+
+Failures that are worth retrying (429, 5xx, timeouts, connection errors) are
+retried with jittered exponential backoff. A Retry-After header from the
+server is treated as a lower bound on the wait. Streamed responses are only
+retried before their first text delta has been delivered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import queue
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Iterator, Mapping, Optional, TypeVar
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+T = TypeVar("T")
+
+# Responses API stream events: a chunk of output text, and the final
+# response (which carries token usage).
+TEXT_DELTA_EVENT = "response.output_text.delta"
+COMPLETED_EVENT = "response.completed"
+
+# End-of-stream marker passed from the background loop to stream consumers.
+_DONE = object()
+
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """
+    Token-per-minute limiter. acquire(n) waits until n tokens are available.
+
+    Requests larger than the bucket are clamped to its capacity so they can
+    still go through (once the bucket is full).
+    """
+
+    def __init__(self, tokens_per_minute: int) -> None:
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, n: int) -> None:
+        need = min(float(n), self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < need:
+                await asyncio.sleep((need - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= need
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token) for rate limiting.
+    """
+    return len(text) // 4 + 1
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Parse Retry-After (seconds or HTTP date) or retry-after-ms, if present.
+    """
+    if not headers:
+        return None
+
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return max(0.0, float(ms) / 1000.0)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Full-jitter exponential backoff, never shorter than the server's Retry-After.
+    """
+    delay = random.uniform(0.0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class LLMClient:
+    """
+    Shared Responses API client with retries, concurrency and TPM limits.
+
+    Use `await acreate(...)` from async code or `create(...)` from sync code;
+    both run the request on the client's background loop.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        max_retries: int = 5,
+        max_concurrency: int = 8,
+        tokens_per_minute: int = 0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Created on the background loop, on first request.
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+
+    # -- event loop ---------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-client", daemon=True)
+                thread.start()
+                self._thread = thread
+                self._loop = loop
+        return self._loop
+
+    def _submit(self, coro: Coroutine[Any, Any, T]) -> "asyncio.Future[T]":
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())  # type: ignore[return-value]
+
+    def close(self) -> None:
+        """
+        Close the HTTP pool and stop the background loop.
+        """
+        if self._loop is None:
+            return
+        if self._client is not None:
+            self._submit(self._client.close()).result()
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    # -- requests -----------------------------------------------------------
+
+    def _setup(self) -> None:
+        # Runs on the background loop, so asyncio primitives bind to it.
+        if self._client is not None:
+            return
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            timeout=self.timeout,
+        )
+        self._client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=http_client,
+            max_retries=0,  # retries are handled here, with Retry-After awareness
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.tokens_per_minute > 0:
+            self._bucket = TokenBucket(self.tokens_per_minute)
+
+    async def _run(
+        self,
+        estimated_tokens: int,
+        call: Callable[[], Awaitable[T]],
+        can_retry: Callable[[], bool] = lambda: True,
+    ) -> T:
+        # Rate limit, bound concurrency and retry `call` (which holds a pool slot
+        # for as long as it runs, including while a stream is being read).
+        self._setup()
+        assert self._client is not None and self._semaphore is not None
+
+        attempt = 0
+        while True:
+            if self._bucket is not None:
+                await self._bucket.acquire(estimated_tokens)
+            try:
+                async with self._semaphore:
+                    return await call()
+            except _RETRYABLE as exc:
+                if attempt >= self.max_retries or not can_retry():
+                    raise
+                response = getattr(exc, "response", None)
+                retry_after = retry_after_seconds(response.headers if response is not None else None)
+                await asyncio.sleep(
+                    backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+                )
+                attempt += 1
+
+    async def _create(self, estimated_tokens: int, **kwargs: Any) -> Any:
+        return await self._run(estimated_tokens, lambda: self._client.responses.create(**kwargs))  # type: ignore[union-attr]
+
+    async def _stream(
+        self,
+        estimated_tokens: int,
+        emit: Callable[[Any], None],
+        on_usage: Optional[Callable[[Any], None]] = None,
+        **kwargs: Any,
+    ) -> None:
+        # Pushes text deltas, then _DONE (or the exception) through `emit`.
+        # The completed response's usage goes to `on_usage`, before _DONE.
+        emitted = False
+
+        async def call() -> None:
+            nonlocal emitted
+            stream = await self._client.responses.create(stream=True, **kwargs)  # type: ignore[union-attr]
+            async with stream:
+                async for event in stream:
+                    if event.type == TEXT_DELTA_EVENT and event.delta:
+                        emitted = True
+                        emit(event.delta)
+                    elif event.type == COMPLETED_EVENT and on_usage is not None:
+                        on_usage(event.response.usage)
+
+        try:
+            await self._run(estimated_tokens, call, can_retry=lambda: not emitted)
+        except Exception as exc:
+            emit(exc)
+        else:
+            emit(_DONE)
+
+    async def acreate(self, estimated_tokens: int = 0, **kwargs: Any) -> Any:
+        """
+        Async responses.create(**kwargs). Returns the Response object.
+        """
+        fut = self._submit(self._create(estimated_tokens, **kwargs))
+        return await asyncio.wrap_future(fut)
+
+    def create(self, estimated_tokens: int = 0, **kwargs: Any) -> Any:
+        """
+        Blocking responses.create(**kwargs), safe to call from any thread.
+        """
+        return self._submit(self._create(estimated_tokens, **kwargs)).result()
+
+    async def astream(
+        self,
+        estimated_tokens: int = 0,
+        on_usage: Optional[Callable[[Any], None]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """
+        Async responses.create(stream=True, **kwargs), yielding output text deltas.
+        `on_usage` receives the response's token usage once it completes.
+        """
+        loop = asyncio.get_running_loop()
+        items: "asyncio.Queue[Any]" = asyncio.Queue()
+        fut = self._submit(
+            self._stream(
+                estimated_tokens,
+                lambda item: loop.call_soon_threadsafe(items.put_nowait, item),
+                on_usage,
+                **kwargs,
+            )
+        )
+        try:
+            while True:
+                item = await items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            fut.cancel()  # consumer stopped early: stop reading the stream
+
+    def stream(
+        self,
+        estimated_tokens: int = 0,
+        on_usage: Optional[Callable[[Any], None]] = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+        Blocking responses.create(stream=True, **kwargs), yielding output text
+        deltas as they arrive. Safe to call from any thread.
+        `on_usage` receives the response's token usage once it completes.
+        """
+        items: "queue.Queue[Any]" = queue.Queue()
+        fut = self._submit(self._stream(estimated_tokens, items.put, on_usage, **kwargs))
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            fut.cancel()
@@ -0,0 +1,141 @@
+"""
+Inverted metadata index for filtered retrieval.
+
+Maps (field, value) -> node ids for the filterable fields, so a filter such as
+{"album": "Abbey Road"} resolves to a candidate node-id set without scanning
+the docstore. Dense retrieval passes that set as node_ids and BM25 as a weight
+mask, so both only score matching nodes.
+
+Built by `src.index_build` next to the BM25 index and loaded lazily by the
+retrieval layer. Like BM25, it records the docstore fingerprint it was built
+from and is rebuilt in memory if the two have drifted apart.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import Any, Dict, Mapping, Optional, Sequence, Set, Union
+
+from src.sparse_index import docstore_fingerprint
+
+# File (inside INDEX_PERSIST_DIR) holding the persisted index.
+METADATA_INDEX_FILENAME = "metadata_index.json"
+
+# Metadata fields that can be used in retrieval filters.
+FILTER_FIELDS = ("album", "song", "source_path", "corpus")
+
+# A filter value is one string or several (matched as OR).
+FilterValue = Union[str, Sequence[str]]
+Filters = Mapping[str, FilterValue]
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_value(field: str, value: Any) -> str:
+    """
+    Lookup form of a metadata value.
+
+    Titles are matched loosely ("Abbey Road" == "AbbeyRoad", "sgt. pepper's" ==
+    "SgtPeppers"); source paths only ignore surrounding whitespace.
+    """
+    text = str(value).strip()
+    if field == "source_path":
+        return text
+    return _NON_ALNUM_RE.sub("", text.lower())
+
+
+def canonical_filters(filters: Optional[Filters]) -> Dict[str, list]:
+    """
+    Order- and spelling-insensitive form of `filters`, for use in cache keys.
+    """
+    out: Dict[str, list] = {}
+    for field, wanted in (filters or {}).items():
+        values = [wanted] if isinstance(wanted, str) else list(wanted)
+        out[field] = sorted({normalize_value(field, v) for v in values})
+    return out
+
+
+class MetadataIndex:
+    """
+    field -> normalized value -> set of node ids.
+    """
+
+    def __init__(self, postings: Dict[str, Dict[str, Set[str]]], fingerprint: str = "") -> None:
+        self.postings = postings
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, docstore: Any) -> "MetadataIndex":
+        postings: Dict[str, Dict[str, Set[str]]] = {f: {} for f in FILTER_FIELDS}
+        for node_id, node in docstore.docs.items():
+            metadata = getattr(node, "metadata", None) or {}
+            for field in FILTER_FIELDS:
+                if metadata.get(field) is None:
+                    continue
+                value = normalize_value(field, metadata[field])
+                postings[field].setdefault(value, set()).add(node_id)
+        return cls(postings, docstore_fingerprint(docstore))
+
+    def match(self, filters: Optional[Filters]) -> Optional[Set[str]]:
+        """
+        Node ids matching every field in `filters` (None if there is no filter).
+
+        Fields are ANDed; a list of values for one field is ORed.
+        Raises ValueError for fields that are not in FILTER_FIELDS.
+        """
+        if not filters:
+            return None
+
+        result: Optional[Set[str]] = None
+        for field, wanted in filters.items():
+            if field not in self.postings:
+                raise ValueError(f"Cannot filter on {field!r}; supported fields: {', '.join(FILTER_FIELDS)}")
+            values = [wanted] if isinstance(wanted, str) else list(wanted)
+            ids: Set[str] = set()
+            for value in values:
+                ids |= self.postings[field].get(normalize_value(field, value), set())
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+    def persist(self, index_persist_dir: str) -> None:
+        payload = {
+            "fingerprint": self.fingerprint,
+            "postings": {
+                field: {value: sorted(ids) for value, ids in values.items()}
+                for field, values in self.postings.items()
+            },
+        }
+        os.makedirs(index_persist_dir, exist_ok=True)
+        with open(os.path.join(index_persist_dir, METADATA_INDEX_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def from_persist_dir(cls, index_persist_dir: str) -> "MetadataIndex":
+        with open(os.path.join(index_persist_dir, METADATA_INDEX_FILENAME), encoding="utf-8") as f:
+            payload = json.load(f)
+        postings = {
+            field: {value: set(ids) for value, ids in values.items()}
+            for field, values in payload["postings"].items()
+        }
+        return cls(postings, payload.get("fingerprint", ""))
+
+
+def load_metadata_index(index_persist_dir: str, docstore: Any) -> MetadataIndex:
+    """
+    Load the persisted metadata index if it matches the docstore; otherwise rebuild it.
+    """
+    try:
+        index = MetadataIndex.from_persist_dir(index_persist_dir)
+    except (FileNotFoundError, KeyError, json.JSONDecodeError):
+        index = None
+
+    if index is not None and index.fingerprint == docstore_fingerprint(docstore):
+        return index
+
+    print(f"⚠️ Metadata index in {index_persist_dir} is missing or stale; rebuilding in memory.")
+    return MetadataIndex.build(docstore)
+
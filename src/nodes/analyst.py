@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-import json
-from graph_state import AgentState
-from tools import call_llm
+from src.config import ANALYST_PROMPT_BUDGET
+from src.evidence import EVIDENCE_FORMAT, prepare_evidence
+from src.graph_state import AgentState
+from src.tools import call_llm
+from src.tracing import annotate, traced_node
 
-SYSTEM = """You are a senior analyst.
+SYSTEM = f"""You are a senior analyst.
 
-Input is a JSON list of evidence items:
-- song, quote, theme, task
+{EVIDENCE_FORMAT}
 
 Rules:
 - You may ONLY make claims supported by evidence items.
-- Every theme you mention must cite at least 2 evidence items (by quoting their 'quote' fields).
+- Every theme you mention must cite at least 2 evidence items (by quoting them).
 - If evidence is thin, say so and keep the analysis short.
 - Do NOT invent lyrics or add songs not present.
 
@@ -22,19 +23,22 @@ Return markdown with:
 """
 
 
+@traced_node
 def analyst_node(state: AgentState) -> AgentState:
     question = state["question"]
-    evidence = state.get("evidence", [])
+    head = f"Question:\n{question}\n\n"
+    tail = "Write the analysis now."
+
+    # Deduplicated, compact evidence, trimmed to the stage's prompt budget.
+    evidence = prepare_evidence(state.get("evidence", []), ANALYST_PROMPT_BUDGET, reserved=SYSTEM + head + tail)
+    annotate(**evidence.trace_attributes())
 
     analysis = call_llm(
         system_prompt=SYSTEM,
-        user_prompt=(
-            f"Question:\n{question}\n\n"
-            f"Evidence (JSON):\n{json.dumps(evidence, ensure_ascii=False)}\n\n"
-            "Write the analysis now."
-        ),
+        user_prompt=f"{head}Evidence:\n{evidence.text}\n\n{tail}",
     )
 
     state["analysis"] = analysis
+    state.setdefault("logs", []).append(evidence.log_line("analyst"))
     state.setdefault("logs", []).append("[analyst] analysis produced from evidence")
     return state
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 from typing import List
 
-from graph_state import AgentState
-from tools import call_llm
+from src.graph_state import AgentState
+from src.tools import call_llm
+from src.tracing import traced_node
 
 SYSTEM = """You are a planning agent for a Beatles-lyrics-only corpus.
 
@@ -28,6 +29,7 @@ def _parse_numbered_lines(text: str) -> List[str]:
     return tasks
 
 
+@traced_node
 def planner_node(state: AgentState) -> AgentState:
     question = state["question"]
 
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 import json
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from typing import List, Dict, Any, Tuple
 
-from graph_state import AgentState
-from tools import rag_search, call_llm
+from src.config import RESEARCHER_MAX_WORKERS, VERIFY_QUOTES
+from src.graph_state import AgentState
+from src.quote_index import QuoteIndex
+from src.tools import call_llm, format_chunks, rag_retrieve_many
+from src.tracing import traced_node
 
 SYSTEM = """You are a research agent working ONLY from retrieved Beatles lyrics.
 
@@ -29,37 +34,137 @@ Example:
 """
 
 
+def _research_task(task: str, context: str, chunk_texts: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Extract evidence for one sub-task. Returns (evidence, logs) for that task only.
+
+    `chunk_texts` are the lyrics behind `context`, without its per-chunk headers.
+    """
+    evidence: List[Dict[str, Any]] = []
+    logs: List[str] = []
+
+    # If retrieval returns nothing useful, skip cleanly
+    if not context or not context.strip():
+        logs.append(f"[researcher] empty context for task: {task}")
+        return evidence, logs
+
+    raw = call_llm(
+        system_prompt=SYSTEM,
+        user_prompt=f"Sub-task:\n{task}\n\nRetrieved context:\n{context}",
+    )
+
+    try:
+        items = json.loads(raw)
+        if isinstance(items, list):
+            # Basic sanity filter
+            for it in items:
+                if not isinstance(it, dict):
+                    continue
+                it.setdefault("task", task)
+                if "quote" in it and isinstance(it["quote"], str) and it["quote"].strip():
+                    evidence.append(it)
+    except json.JSONDecodeError:
+        logs.append(f"[researcher] JSON parse failed for task: {task}")
+        logs.append(f"[researcher] raw:\n{raw}")
+
+    if VERIFY_QUOTES and evidence:
+        # Quotes must appear verbatim in the retrieved lyrics; drop anything
+        # invented. The chunk texts are indexed one by one, not the formatted
+        # context, so a song title, album or path from a header does not count.
+        index = QuoteIndex(chunk_texts)
+        verified = [it for it in evidence if index.contains(it["quote"])]
+        if len(verified) < len(evidence):
+            logs.append(f"[researcher] dropped {len(evidence) - len(verified)} quotes not found in context for task: {task}")
+        evidence = verified
+
+    return evidence, logs
+
+
+def _retrieve_contexts(sub_tasks: List[str]) -> Tuple[List[str], List[List[str]]]:
+    """
+    Formatted context and chunk texts for every sub-task.
+    """
+    # Retrieve for every sub-task in one batch (shared embedding/BM25/rerank work).
+    retrieved = rag_retrieve_many(sub_tasks, k=8)
+    contexts = [format_chunks(chunks) for chunks in retrieved]
+    chunk_texts = [[c.page_content for c in chunks] for chunks in retrieved]
+    return contexts, chunk_texts
+
+
+def _safe_research_task(task: str, context: str, chunk_texts: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    try:
+        return _research_task(task, context, chunk_texts)
+    except Exception as exc:
+        # One failed task must not abort the others.
+        return [], [f"[researcher] task failed: {task}: {exc!r}"]
+
+
+@traced_node
 def researcher_node(state: AgentState) -> AgentState:
     sub_tasks: List[str] = state.get("sub_tasks", [])
     all_evidence: List[Dict[str, Any]] = []
 
-    for task in sub_tasks:
-        context = rag_search(task, k=8)
-
-        # If retrieval returns nothing useful, skip cleanly
-        if not context or not context.strip():
-            state.setdefault("logs", []).append(f"[researcher] empty context for task: {task}")
-            continue
-
-        raw = call_llm(
-            system_prompt=SYSTEM,
-            user_prompt=f"Sub-task:\n{task}\n\nRetrieved context:\n{context}",
-        )
-
-        try:
-            items = json.loads(raw)
-            if isinstance(items, list):
-                # Basic sanity filter
-                for it in items:
-                    if not isinstance(it, dict):
-                        continue
-                    it.setdefault("task", task)
-                    if "quote" in it and isinstance(it["quote"], str) and it["quote"].strip():
-                        all_evidence.append(it)
-        except json.JSONDecodeError:
-            state.setdefault("logs", []).append(f"[researcher] JSON parse failed for task: {task}")
-            state.setdefault("logs", []).append(f"[researcher] raw:\n{raw}")
+    contexts, chunk_texts = _retrieve_contexts(sub_tasks)
+
+    # One LLM call per sub-task, run concurrently. Results are collected per task
+    # and merged in the original sub-task order, so output is order-stable.
+    results: List[Tuple[List[Dict[str, Any]], List[str]]] = [([], []) for _ in sub_tasks]
+    with ThreadPoolExecutor(max_workers=max(1, RESEARCHER_MAX_WORKERS)) as pool:
+        # Each task runs in a copy of this context, so its spans nest under this node.
+        futures = {
+            pool.submit(copy_context().run, _safe_research_task, task, context, texts): i
+            for i, (task, context, texts) in enumerate(zip(sub_tasks, contexts, chunk_texts))
+        }
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+
+    for evidence, logs in results:
+        all_evidence.extend(evidence)
+        state.setdefault("logs", []).extend(logs)
 
     state["evidence"] = all_evidence
     state.setdefault("logs", []).append(f"[researcher] extracted {len(all_evidence)} evidence items")
     return state
+
+
+# -----------------------------------------------------------------------------
+# Map/reduce form, used by the LangGraph pipeline (src/graph.py)
+# -----------------------------------------------------------------------------
+#
+#   research_retrieve_node -> research_task_node (one per sub-task, in parallel)
+#                          -> research_merge_node
+#
+# Same behaviour as researcher_node, but the per-task LLM calls are graph
+# branches, so LangGraph schedules them (bounded by max_concurrency).
+
+
+@traced_node
+def research_retrieve_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Batched retrieval for all sub-tasks; contexts feed the fan-out.
+    """
+    contexts, chunk_texts = _retrieve_contexts(state.get("sub_tasks", []))
+    return {"research_contexts": contexts, "research_chunk_texts": chunk_texts}
+
+
+@traced_node
+def research_task_node(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map step for one sub-task. `item` is {"index", "task", "context", "chunk_texts"}.
+    """
+    evidence, logs = _safe_research_task(item["task"], item["context"], item["chunk_texts"])
+    return {"research_results": [{"index": item["index"], "evidence": evidence, "logs": logs}]}
+
+
+@traced_node
+def research_merge_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Reduce step: merge per-task results in sub-task order.
+    """
+    evidence: List[Dict[str, Any]] = []
+    logs: List[str] = list(state.get("logs", []))
+    for result in sorted(state.get("research_results", []), key=lambda r: r["index"]):
+        evidence.extend(result["evidence"])
+        logs.extend(result["logs"])
+    logs.append(f"[researcher] extracted {len(evidence)} evidence items")
+    return {"evidence": evidence, "logs": logs}
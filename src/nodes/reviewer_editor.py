@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from graph_state import AgentState
-from tools import call_llm
+from src.graph_state import AgentState
+from src.tools import call_llm_streaming
+from src.tracing import traced_node
 
 SYSTEM = """You are an editor.
 
@@ -17,12 +18,14 @@ Return ONLY the final markdown report (no preamble).
 """
 
 
+@traced_node
 def reviewer_editor_node(state: AgentState) -> AgentState:
     validated = state.get("validated_report", "")
 
-    final = call_llm(
+    final = call_llm_streaming(
         system_prompt=SYSTEM,
         user_prompt=f"Validated report:\n{validated}\n\nEdit for clarity now.",
+        stage="editor",
     )
 
     state["final_report"] = final
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-import json
-from graph_state import AgentState
-from tools import call_llm
+from src.config import VALIDATOR_PROMPT_BUDGET, VALIDATOR_QUOTE_MIN_WORDS, VALIDATOR_SKIP_IF_VERIFIED
+from src.evidence import EVIDENCE_FORMAT, prepare_evidence
+from src.graph_state import AgentState
+from src.quote_index import QuoteIndex, quoted_strings
+from src.tools import call_llm
+from src.tracing import annotate, traced_node
 
-SYSTEM = """You are a strict validator.
+SYSTEM = f"""You are a strict validator.
 
 You will be given:
 - A draft report
-- Evidence items (JSON)
+- Evidence items
+
+{EVIDENCE_FORMAT}
 
 Goal:
 - Remove or rewrite any sentence/quote that is not supported by evidence.
@@ -24,19 +29,39 @@ Output format:
 """
 
 
+@traced_node
 def reviewer_validator_node(state: AgentState) -> AgentState:
     draft = state.get("draft_report", "")
-    evidence = state.get("evidence", [])
+    logs = state.setdefault("logs", [])
+
+    # Check every quoted lyric in the draft against the evidence quotes locally
+    # (short quoted strings are song titles, not lyrics).
+    quotes = quoted_strings(draft, min_words=VALIDATOR_QUOTE_MIN_WORDS)
+    unverified = QuoteIndex(str(e.get("quote", "")) for e in state.get("evidence", [])).unverified(quotes)
+    annotate(**{"quotes.checked": len(quotes), "quotes.unverified": len(unverified)})
+
+    if VALIDATOR_SKIP_IF_VERIFIED and quotes and not unverified:
+        state["validated_report"] = draft
+        logs.append(f"[reviewer_validator] all {len(quotes)} quotes verified against evidence; LLM validation skipped")
+        return state
+    if unverified:
+        logs.append(f"[reviewer_validator] {len(unverified)} of {len(quotes)} quotes not found in evidence")
+
+    head = f"Draft report:\n{draft}\n\n"
+    tail = "Validate now."
+
+    # Under a tight budget, keep the evidence the draft actually quotes.
+    evidence = prepare_evidence(
+        state.get("evidence", []), VALIDATOR_PROMPT_BUDGET, reserved=SYSTEM + head + tail, quoted=quotes
+    )
+    annotate(**evidence.trace_attributes())
 
     validated = call_llm(
         system_prompt=SYSTEM,
-        user_prompt=(
-            f"Draft report:\n{draft}\n\n"
-            f"Evidence (JSON):\n{json.dumps(evidence, ensure_ascii=False)}\n\n"
-            "Validate now."
-        ),
+        user_prompt=f"{head}Evidence:\n{evidence.text}\n\n{tail}",
     )
 
     state["validated_report"] = validated
-    state.setdefault("logs", []).append("[reviewer_validator] validation pass completed")
+    logs.append(evidence.log_line("reviewer_validator"))
+    logs.append("[reviewer_validator] validation pass completed")
     return state
@@ -1,16 +1,20 @@
 # src/nodes/writer.py
 from __future__ import annotations
 
-import json
-from graph_state import AgentState
-from tools import call_llm
+from src.config import WRITER_PROMPT_BUDGET
+from src.evidence import EVIDENCE_FORMAT, prepare_evidence
+from src.graph_state import AgentState
+from src.tools import call_llm_streaming
+from src.tracing import annotate, traced_node
 
-SYSTEM = """You are an executive brief writer.
+SYSTEM = f"""You are an executive brief writer.
 
 You will be given:
 - The user's question
 - The analyst's analysis
-- A JSON list of evidence items (song, quote, theme)
+- Evidence items
+
+{EVIDENCE_FORMAT}
 
 Rules:
 - You may ONLY include lyric quotes that appear in evidence items.
@@ -26,21 +30,23 @@ Return markdown with:
 """
 
 
+@traced_node
 def writer_node(state: AgentState) -> AgentState:
     question = state["question"]
     analysis = state.get("analysis", "")
-    evidence = state.get("evidence", [])
+    head = f"Question:\n{question}\n\nAnalysis:\n{analysis}\n\n"
+    tail = "Write the report now."
+
+    evidence = prepare_evidence(state.get("evidence", []), WRITER_PROMPT_BUDGET, reserved=SYSTEM + head + tail)
+    annotate(**evidence.trace_attributes())
 
-    draft = call_llm(
+    draft = call_llm_streaming(
         system_prompt=SYSTEM,
-        user_prompt=(
-            f"Question:\n{question}\n\n"
-            f"Analysis:\n{analysis}\n\n"
-            f"Evidence (JSON):\n{json.dumps(evidence, ensure_ascii=False)}\n\n"
-            "Write the report now."
-        ),
+        user_prompt=f"{head}Evidence:\n{evidence.text}\n\n{tail}",
+        stage="writer",
     )
 
     state["draft_report"] = draft
+    state.setdefault("logs", []).append(evidence.log_line("writer"))
     state.setdefault("logs", []).append("[writer] draft produced from evidence")
     return state
@@ -0,0 +1,85 @@
+"""
+Local, deterministic quote verification.
+
+The researcher must copy quotes verbatim from its retrieved context, and the
+writer may only quote evidence. Both rules are checked here without an LLM.
+
+QuoteIndex normalizes its texts like src/evidence.py (lowercase, no
+punctuation, collapsed whitespace) and indexes them by word n-gram. A quote
+is verified when its normalized form occurs, on word boundaries, in one text.
+For larger text sets (a docstore, not one retrieved context) the n-gram
+postings narrow the candidates first; a substring check on those texts
+confirms the match.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from src.evidence import normalize_quote
+
+# Below this many texts, scanning them all is cheaper than building postings.
+_POSTINGS_MIN_TEXTS = 16
+
+# Double-quoted spans in generated markdown: "...", “...”.
+_QUOTED_RE = re.compile(r'"([^"\n]+)"|“([^”\n]+)”')
+
+
+class QuoteIndex:
+    """
+    Normalized texts, plus word n-gram -> text ids postings when there are many.
+    """
+
+    def __init__(self, texts: Iterable[str], n: int = 3) -> None:
+        self.n = n
+        self.texts: List[str] = [f" {normalize_quote(text)} " for text in texts]
+        self.postings: Optional[Dict[Tuple[str, ...], Set[int]]] = None
+        if len(self.texts) >= _POSTINGS_MIN_TEXTS:
+            self.postings = {}
+            for doc, text in enumerate(self.texts):
+                words = text.split()
+                for size in {1, n}:
+                    for i in range(len(words) - size + 1):
+                        self.postings.setdefault(tuple(words[i : i + size]), set()).add(doc)
+
+    def _candidates(self, words: Sequence[str]) -> Iterable[int]:
+        if self.postings is None:
+            return range(len(self.texts))
+        size = self.n if len(words) >= self.n else 1
+        candidates: Set[int] = set()
+        for i in range(len(words) - size + 1):
+            docs = self.postings.get(tuple(words[i : i + size]))
+            if not docs:
+                return set()
+            candidates = set(docs) if i == 0 else candidates & docs
+            if not candidates:
+                break
+        return candidates
+
+    def contains(self, quote: str) -> bool:
+        """
+        True if `quote` appears (normalized, on word boundaries) in one indexed text.
+        """
+        words = normalize_quote(quote).split()
+        if not words:
+            return False
+        needle = f" {' '.join(words)} "
+        return any(needle in self.texts[doc] for doc in self._candidates(words))
+
+    def unverified(self, quotes: Iterable[str]) -> List[str]:
+        return [q for q in quotes if not self.contains(q)]
+
+
+def quoted_strings(text: str, min_words: int = 1) -> List[str]:
+    """
+    Double-quoted spans in `text` (straight or curly quotes), in order.
+
+    Spans of fewer than `min_words` words are skipped, e.g. quoted song titles.
+    """
+    quotes: List[str] = []
+    for m in _QUOTED_RE.finditer(text):
+        quote = (m.group(1) or m.group(2)).strip()
+        if quote and len(normalize_quote(quote).split()) >= min_words:
+            quotes.append(quote)
+    return quotes
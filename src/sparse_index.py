@@ -0,0 +1,184 @@
+"""
+Persisted BM25 (sparse) index.
+
+Building a BM25Retriever tokenizes and scores the whole docstore, so it is
+built once by `src.index_build`, saved next to the vector store, and loaded
+lazily by the retrieval layer.
+
+A fingerprint of the docstore is stored alongside the BM25 files. If the
+vector index is rebuilt without the sparse index (or vice versa), the
+fingerprints no longer match and the BM25 index is rebuilt in memory rather
+than silently serving stale nodes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import AbstractSet, Any, List, Optional, Sequence
+
+import bm25s
+import numpy as np
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+# BM25Retriever moved between namespaces across versions.
+try:
+    # Newer layout (commonly available in recent llama-index releases)
+    from llama_index.core.retrievers import BM25Retriever
+except ImportError:
+    # Older layout
+    from llama_index.retrievers.bm25 import BM25Retriever  # type: ignore
+
+# Subdirectory of INDEX_PERSIST_DIR holding the persisted BM25 index.
+BM25_SUBDIR = "bm25"
+
+# File (inside the BM25 directory) recording which docstore it was built from.
+FINGERPRINT_FILENAME = "docstore_fingerprint.txt"
+
+
+def bm25_dir(index_persist_dir: str) -> str:
+    return os.path.join(index_persist_dir, BM25_SUBDIR)
+
+
+def docstore_fingerprint(docstore: Any) -> str:
+    """
+    Stable hash of the docstore contents (node ids + node content hashes).
+    """
+    h = hashlib.sha256()
+    for node_id, node in sorted(docstore.docs.items()):
+        h.update(node_id.encode("utf-8"))
+        h.update(b"\0")
+        h.update(node.hash.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+# File (inside INDEX_PERSIST_DIR) with the version of the whole persisted
+# index, written last by `src.index_build`; retrieval caches key on it.
+INDEX_VERSION_FILENAME = "index_version.txt"
+
+
+def write_index_version(persist_dir: str, version: str) -> None:
+    with open(os.path.join(persist_dir, INDEX_VERSION_FILENAME), "w", encoding="utf-8") as f:
+        f.write(version)
+
+
+def read_index_version(persist_dir: str) -> str:
+    """
+    Version written by the last build ("" if there is none).
+    """
+    try:
+        with open(os.path.join(persist_dir, INDEX_VERSION_FILENAME), encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def build_bm25(docstore: Any, similarity_top_k: int = 30) -> BM25Retriever:
+    """
+    Tokenize and index every node in the docstore.
+    """
+    nodes = list(docstore.docs.values())
+    return BM25Retriever.from_defaults(
+        nodes=nodes,
+        similarity_top_k=min(similarity_top_k, len(nodes)),
+    )
+
+
+def persist_bm25(retriever: BM25Retriever, index_persist_dir: str, fingerprint: str) -> None:
+    """
+    Save the BM25 index (and the docstore fingerprint) under INDEX_PERSIST_DIR.
+    """
+    path = bm25_dir(index_persist_dir)
+    os.makedirs(path, exist_ok=True)
+    retriever.persist(path)
+    with open(os.path.join(path, FINGERPRINT_FILENAME), "w", encoding="utf-8") as f:
+        f.write(fingerprint)
+
+
+def _read_fingerprint(path: str) -> str:
+    try:
+        with open(os.path.join(path, FINGERPRINT_FILENAME), encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def load_bm25(index_persist_dir: str, docstore: Any, similarity_top_k: int = 30) -> BM25Retriever:
+    """
+    Load the persisted BM25 index if it matches the docstore; otherwise rebuild it.
+
+    A stale or missing index is rebuilt in memory only. Run
+    `python -m src.index_build` to persist a fresh one.
+    """
+    path = bm25_dir(index_persist_dir)
+    fingerprint = docstore_fingerprint(docstore)
+
+    if _read_fingerprint(path) == fingerprint:
+        retriever = BM25Retriever.from_persist_dir(path)
+        set_bm25_top_k(retriever, similarity_top_k)
+        return retriever
+
+    print(f"⚠️ BM25 index at {path} is missing or stale; rebuilding in memory.")
+    return build_bm25(docstore, similarity_top_k=similarity_top_k)
+
+
+def set_bm25_top_k(retriever: BM25Retriever, k: int) -> None:
+    """
+    bm25s requires k <= number of indexed nodes, so clamp it.
+    """
+    num_docs = len(retriever.corpus)
+    retriever.similarity_top_k = max(1, min(k, num_docs))
+
+
+def bm25_retrieve_many(
+    retriever: BM25Retriever,
+    queries: Sequence[str],
+    top_k: int,
+    node_ids: Optional[AbstractSet[str]] = None,
+) -> List[List[NodeWithScore]]:
+    """
+    Score several queries against the BM25 index in one bm25s call.
+
+    Mirrors BM25Retriever._retrieve (same tokenization and node mapping), but
+    takes top_k per call instead of mutating the shared retriever, so it is
+    safe to use from several threads.
+
+    If `node_ids` is given, only those nodes can be returned (bm25s weight mask).
+    """
+    if not queries:
+        return []
+
+    weight_mask = None
+    allowed = len(retriever.corpus)
+    if node_ids is not None:
+        weight_mask = np.fromiter(
+            (row["node_id"] in node_ids for row in retriever.corpus),
+            dtype=np.float32,
+            count=len(retriever.corpus),
+        )
+        allowed = int(weight_mask.sum())
+        if allowed == 0:
+            return [[] for _ in queries]
+
+    k = max(1, min(top_k, allowed))
+    tokenized = bm25s.tokenize(
+        list(queries),
+        stemmer=retriever.stemmer if not retriever.skip_stemming else None,
+        token_pattern=retriever.token_pattern,
+        show_progress=False,
+    )
+    indexes, scores = retriever.bm25.retrieve(tokenized, k=k, show_progress=False, weight_mask=weight_mask)
+
+    out: List[List[NodeWithScore]] = []
+    for row_idx, row_scores in zip(indexes, scores):
+        nodes: List[NodeWithScore] = []
+        for idx, score in zip(row_idx, row_scores):
+            # idx is the stored node dict when the corpus was loaded, else a position.
+            node_dict = idx if isinstance(idx, dict) else retriever.corpus[int(idx)]
+            if node_ids is not None and node_dict["node_id"] not in node_ids:
+                continue  # masked node tied at score 0 with an allowed one
+            nodes.append(NodeWithScore(node=metadata_dict_to_node(node_dict), score=float(score)))
+        out.append(nodes)
+    return out
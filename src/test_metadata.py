@@ -1,22 +1,14 @@
 import sys
-import re
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+from src.evidence import normalize_quote
 from src.tools import rag_retrieve
 
-_WORDISH = re.compile(r"[^a-z0-9\s]+")
-
-def _normalize(s: str) -> str:
-    s = s.lower()
-    s = _WORDISH.sub(" ", s)          # drop punctuation
-    s = " ".join(s.split())           # collapse whitespace
-    return s
-
 
 def _contains(haystack: str, needle: str) -> bool:
-    return _normalize(needle) in _normalize(haystack)
+    return normalize_quote(needle) in normalize_quote(haystack)
 
 
 def main() -> None:
@@ -2,10 +2,10 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from nodes.planner import planner_node
-from nodes.researcher import researcher_node
-from nodes.analyst import analyst_node
-from nodes.writer import writer_node
+from src.nodes.planner import planner_node
+from src.nodes.researcher import researcher_node
+from src.nodes.analyst import analyst_node
+from src.nodes.writer import writer_node
 
 question = "How does the theme of loneliness appear across Beatles lyrics? Give examples."
 
@@ -1,42 +1,77 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
-
-from llama_index.core import Settings, StorageContext, load_index_from_storage
-from llama_index.core.indices.vector_store import VectorStoreIndex
-from llama_index.embeddings.openai import OpenAIEmbedding
-
-# QueryFusionRetriever has lived in a few places across versions; prefer core.
-try:
-    from llama_index.core.retrievers import QueryFusionRetriever
-except ImportError:  # older layout
-    from llama_index.core.retrievers import QueryFusionRetriever  # type: ignore
-
-# BM25Retriever moved between namespaces across versions.
-try:
-    # Newer layout (commonly available in recent llama-index releases)
-    from llama_index.core.retrievers import BM25Retriever
-except ImportError:
-    # Older layout
-    from llama_index.retrievers.bm25 import BM25Retriever  # type: ignore
-
-# SentenceTransformerRerank also moved in some releases.
-try:
-    from llama_index.core.postprocessor import SentenceTransformerRerank
-except ImportError:
-    try:
-        from llama_index.core.postprocessor import SentenceTransformerRerank  # type: ignore
-    except ImportError:
-        from llama_index.postprocessor import SentenceTransformerRerank  # type: ignore
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from src.config import (
+    EMBED_CACHE_DISK_ENTRIES,
+    EMBED_CACHE_ENABLED,
+    EMBED_CACHE_MEMORY_ENTRIES,
+    EMBED_CACHE_PATH,
     EMBED_MODEL,
+    FUSION_DENSE_WEIGHT,
+    FUSION_MODE,
+    FUSION_RRF_K,
+    FUSION_SPARSE_WEIGHT,
+    HNSW_EF_SEARCH,
     INDEX_PERSIST_DIR,
-    OPENAI_API_KEY,
+    LLM_CACHE_DISK_ENTRIES,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_S,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_TIMEOUT_S,
+    LLM_TOKENS_PER_MINUTE,
     MODEL_NAME,
-    client,
+    OPENAI_BASE_URL,
+    RERANK_BATCH_SIZE,
+    RERANK_DEVICE,
+    RERANK_MAX_THREADS,
+    RERANK_MODEL,
+    RETRIEVAL_ADAPTIVE,
+    RETRIEVAL_CACHE_DISK_ENTRIES,
+    RETRIEVAL_CACHE_ENABLED,
+    RETRIEVAL_CACHE_MEMORY_ENTRIES,
+    RETRIEVAL_CACHE_PATH,
+    RETRIEVAL_CONFIDENT_MARGIN,
+    RETRIEVAL_DECISIVE_MARGIN,
+    RETRIEVAL_MIN_CANDIDATES,
+    RETRIEVAL_MODE,
+    VECTOR_STORE_BACKEND,
+    require_api_key,
 )
+from src.cache import LRUCache, SQLiteCache, TieredCache, content_key
+from src.tracing import LLM, RETRIEVAL, current_tracer, llm_cost_usd, span, start_span
+
+# llama_index, openai, bm25s and numpy take seconds to import, so they are
+# imported where first used. Importing this module (and every agent node)
+# stays cheap; warmup() pays the cost in the background instead.
+if TYPE_CHECKING:
+    from llama_index.core.indices.vector_store import VectorStoreIndex
+    from llama_index.core.schema import NodeWithScore
+
+    from src.llm_client import LLMClient
+    from src.metadata_index import Filters, MetadataIndex
+    from src.sparse_index import BM25Retriever
 
 
 # -----------------------------------------------------------------------------
@@ -44,11 +79,28 @@ from src.config import (
 # -----------------------------------------------------------------------------
 #
 # Public API:
-#   - rag_retrieve(query, k) -> List[RetrievedChunk]
-#   - rag_search(query, k) -> str
-#   - call_llm(system_prompt, user_prompt) -> str
+#   - rag_retrieve(query, k, filters=None, stats=None) -> List[RetrievedChunk]
+#   - rag_retrieve_many(queries, k, filters=None, stats=None) -> List[List[RetrievedChunk]]
+#   - rag_search(query, k, filters=None) -> str
+#   - format_chunks(chunks) -> str
+#   - call_llm(system_prompt, user_prompt, use_cache=True) -> str
+#   - acall_llm(system_prompt, user_prompt, use_cache=True) -> str (async)
+#   - call_llm_stream(system_prompt, user_prompt, use_cache=True) -> Iterator[str]
+#   - acall_llm_stream(...) -> AsyncIterator[str] (async)
+#   - call_llm_streaming(system_prompt, user_prompt, stage) -> str
+#       (full text; also streamed to the sink set by stream_tokens_to(sink))
+#   - get_llm_cache() -> Optional[TieredCache] (hit/miss stats in .stats)
+#   - get_retrieval_cache() -> Optional[TieredCache] (hit/miss stats in .stats)
+#   - get_reranker() -> CrossEncoderReranker (process-wide, warm with .warmup())
+#   - warmup(background=True) -> preload index, BM25, reranker and LLM client
 #
 # Retrieval (rag_*) is corpus-only (no LLM). Generation is in call_llm().
+# `filters` restricts retrieval by metadata, e.g. {"album": "Abbey Road"} or
+# {"song": ["Help", "Yesterday"]}; supported fields are album, song,
+# source_path and corpus. `stats` (a RetrievalStats) collects per-stage
+# timings and the adaptive-retrieval decisions (RETRIEVAL_ADAPTIVE).
+# Under an active src.tracing Tracer, every rag_retrieve* and call_llm* call
+# is also recorded as a span (timings, tokens, cache hits).
 # -----------------------------------------------------------------------------
 
 
@@ -60,6 +112,36 @@ class RetrievedChunk:
 
 
 _index: Optional[VectorStoreIndex] = None
+# Version of the loaded index; cache keys include it (see _get_index_version).
+_index_version: Optional[str] = None
+_bm25: Optional[BM25Retriever] = None
+_metadata_index: Optional[MetadataIndex] = None
+
+# Serializes the lazy loads below, so warmup() in a background thread and the
+# first query never load the same artifact twice. Re-entrant: BM25 and the
+# metadata index load the vector index first.
+_load_lock = threading.RLock()
+
+
+def _make_embed_model() -> Any:
+    """
+    Query embedding model, wrapped in the embedding cache unless disabled.
+    """
+    from llama_index.embeddings.openai import OpenAIEmbedding
+
+    from src.embedding_cache import CachedEmbedding
+
+    embed_model = OpenAIEmbedding(model=EMBED_MODEL, api_key=require_api_key())
+    if not EMBED_CACHE_ENABLED:
+        return embed_model
+
+    disk = (
+        SQLiteCache(EMBED_CACHE_PATH, EMBED_CACHE_DISK_ENTRIES)
+        if EMBED_CACHE_PATH
+        else None
+    )
+    cache = TieredCache(LRUCache(EMBED_CACHE_MEMORY_ENTRIES), disk)
+    return CachedEmbedding(embed_model, cache)
 
 
 def _get_index() -> VectorStoreIndex:
@@ -68,60 +150,497 @@ def _get_index() -> VectorStoreIndex:
 
     Prerequisite: run `python -m src.index_build` (or `make index`) once.
     """
-    global _index
+    global _index, _index_version
     if _index is not None:
         return _index
 
-    # Ensure LlamaIndex is configured with the embedding model used at build time.
-    Settings.embed_model = OpenAIEmbedding(model=EMBED_MODEL, api_key=OPENAI_API_KEY)
+    with _load_lock:
+        if _index is None:
+            from llama_index.core import Settings, load_index_from_storage
+
+            from src.sparse_index import docstore_fingerprint, read_index_version
+            from src.vector_stores import load_storage_context
 
-    storage_context = StorageContext.from_defaults(persist_dir=INDEX_PERSIST_DIR)
-    _index = load_index_from_storage(storage_context)
+            # Ensure LlamaIndex is configured with the embedding model used at build time.
+            Settings.embed_model = _make_embed_model()
+
+            # A build writes the version file last. If it changes while we load,
+            # the files read may span two builds, so load again.
+            for _ in range(3):
+                version = read_index_version(INDEX_PERSIST_DIR)
+                storage_context = load_storage_context(
+                    VECTOR_STORE_BACKEND,
+                    INDEX_PERSIST_DIR,
+                    ef_search=HNSW_EF_SEARCH,
+                )
+                index = load_index_from_storage(storage_context)
+                if read_index_version(INDEX_PERSIST_DIR) == version:
+                    break
+            # Indexes built before versioning: fingerprint the loaded docstore.
+            _index_version = version or f"{VECTOR_STORE_BACKEND}:{docstore_fingerprint(index.docstore)}"
+            _index = index
     return _index
 
 
-def _retrieve_nodes(query: str, k: int) -> List[Any]:
+def _get_bm25() -> BM25Retriever:
+    """
+    Load and cache the persisted BM25 index built by `src.index_build`.
+
+    Falls back to an in-memory rebuild if the persisted index is missing or
+    was built from a different docstore.
+    """
+    global _bm25
+    if _bm25 is not None:
+        return _bm25
+
+    with _load_lock:
+        if _bm25 is None:
+            from src.sparse_index import load_bm25
+
+            _bm25 = load_bm25(INDEX_PERSIST_DIR, _get_index().docstore)
+    return _bm25
+
+
+def _get_metadata_index() -> MetadataIndex:
+    """
+    Load and cache the persisted metadata index built by `src.index_build`.
+    """
+    global _metadata_index
+    if _metadata_index is not None:
+        return _metadata_index
+
+    with _load_lock:
+        if _metadata_index is None:
+            from src.metadata_index import load_metadata_index
+
+            _metadata_index = load_metadata_index(INDEX_PERSIST_DIR, _get_index().docstore)
+    return _metadata_index
+
+
+# -----------------------------------------------------------------------------
+# Cross-encoder reranker
+# -----------------------------------------------------------------------------
+
+
+class CrossEncoderReranker:
     """
-    Hybrid retrieval + rerank:
-      1) dense retrieval (vector)
-      2) sparse retrieval (BM25)
-      3) fusion
-      4) cross-encoder rerank down to top-k
+    Long-lived cross-encoder that scores (query, chunk) pairs in batches.
+
+    The model is loaded once, on first use or on an explicit warmup(), and then
+    shared by every retrieval in the process.
+    """
+
+    # Matches llama_index's SentenceTransformerRerank default.
+    MAX_LENGTH = 512
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        batch_size: int = RERANK_BATCH_SIZE,
+        device: Optional[str] = RERANK_DEVICE,
+        max_threads: int = RERANK_MAX_THREADS,
+    ) -> None:
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.max_threads = max_threads
+        self._model: Any = None
+        self._lock = threading.Lock()
+
+    def _get_model(self) -> Any:
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None:
+                import torch
+                from sentence_transformers import CrossEncoder
+
+                if self.max_threads > 0:
+                    torch.set_num_threads(self.max_threads)
+
+                device = self.device
+                if device is None:
+                    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+                self._model = CrossEncoder(
+                    self.model_name,
+                    max_length=self.MAX_LENGTH,
+                    device=device,
+                )
+        return self._model
+
+    def warmup(self) -> None:
+        """
+        Load the weights and run one tiny forward pass so the first real query is fast.
+        """
+        self.score([("warmup", "warmup")])
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """
+        Score (query, chunk) pairs in batches of `batch_size`.
+        """
+        if not pairs:
+            return []
+        scores = self._get_model().predict(
+            list(pairs),
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        return [float(s) for s in scores]
+
+    def rerank(self, query: str, nodes: List[NodeWithScore], top_n: int) -> List[NodeWithScore]:
+        return self.rerank_many([query], [nodes], top_n)[0]
+
+    def rerank_many(
+        self,
+        queries: Sequence[str],
+        node_lists: Sequence[List[NodeWithScore]],
+        top_n: int,
+    ) -> List[List[NodeWithScore]]:
+        """
+        Rerank several queries' candidates in one batched scoring pass.
+
+        Returns one top_n list per query, in the same order as `queries`.
+        """
+        from llama_index.core.schema import MetadataMode, NodeWithScore
+
+        pairs: List[Tuple[str, str]] = []
+        for query, nodes in zip(queries, node_lists):
+            for nw in nodes:
+                pairs.append((query, nw.node.get_content(metadata_mode=MetadataMode.EMBED)))
+
+        scores = self.score(pairs)
+
+        out: List[List[NodeWithScore]] = []
+        pos = 0
+        for nodes in node_lists:
+            rescored = [
+                NodeWithScore(node=nw.node, score=score)
+                for nw, score in zip(nodes, scores[pos : pos + len(nodes)])
+            ]
+            pos += len(nodes)
+            rescored.sort(key=lambda nw: nw.score, reverse=True)
+            out.append(rescored[:top_n])
+        return out
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """
+    Process-wide reranker instance (configured from src.config).
+    """
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
+
+
+# -----------------------------------------------------------------------------
+# Retrieval
+# -----------------------------------------------------------------------------
+
+
+def _embed_queries(queries: Sequence[str]) -> List[List[float]]:
+    """
+    Embed all queries in one batched embedding request.
+
+    text-embedding-3 models use the same engine for queries and documents, so
+    the batch text-embedding call is equivalent to per-query embedding.
     """
+    from llama_index.core import Settings
+
+    _get_index()  # ensures Settings.embed_model is configured
+    return Settings.embed_model.get_text_embedding_batch(list(queries))
+
+
+FUSION_MODES = ("rrf", "relative_score", "simple")
+RETRIEVAL_MODES = ("dense", "bm25", "fusion", "fusion_rerank")
+
+
+def _fuse(
+    result_lists: Sequence[List[NodeWithScore]],
+    top_k: int,
+    mode: str = FUSION_MODE,
+    weights: Optional[Sequence[float]] = None,
+) -> List[NodeWithScore]:
+    """
+    Fuse ranked result lists into one, de-duplicated by node id.
+
+    Each list's contribution is laid out as a row of a (lists x nodes) NumPy
+    score matrix and combined per `mode`:
+      - rrf: sum of weight / (FUSION_RRF_K + rank)
+      - relative_score: sum of weight * min-max normalized score
+      - simple: max raw score (QueryFusionRetriever's default mode)
+    `weights` defaults to 1.0 per list.
+    """
+    if mode not in FUSION_MODES:
+        raise ValueError(f"Unknown fusion mode {mode!r}; expected one of {', '.join(FUSION_MODES)}")
+
+    import numpy as np
+    from llama_index.core.schema import NodeWithScore
+
+    # Dense and BM25 both return docstore nodes, so node ids identify a chunk
+    # (and, unlike node.hash, cost nothing to read).
+    position: Dict[str, int] = {}
+    unique: List[NodeWithScore] = []
+    columns: List[Any] = []
+    for nodes in result_lists:
+        cols = np.empty(len(nodes), dtype=np.int64)
+        for j, nw in enumerate(nodes):
+            col = position.get(nw.node.node_id)
+            if col is None:
+                col = position[nw.node.node_id] = len(unique)
+                unique.append(nw)
+            cols[j] = col
+        columns.append(cols)
+    if not unique:
+        return []
+
+    w = np.ones(len(result_lists)) if weights is None else np.asarray(weights, dtype=np.float64)
+    fill = -np.inf if mode == "simple" else 0.0
+    matrix = np.full((len(result_lists), len(unique)), fill)
+
+    for row, (nodes, cols) in enumerate(zip(result_lists, columns)):
+        if not nodes:
+            continue
+        if mode == "rrf":
+            # Ranks follow list order; a duplicate within a list keeps its best rank.
+            contrib = w[row] / (FUSION_RRF_K + np.arange(1, len(nodes) + 1))
+        else:
+            scores = np.fromiter((nw.score or 0.0 for nw in nodes), dtype=np.float64, count=len(nodes))
+            if mode == "relative_score":
+                lo, hi = scores.min(), scores.max()
+                contrib = w[row] * ((scores - lo) / (hi - lo) if hi > lo else np.ones_like(scores))
+            else:
+                contrib = scores
+        np.maximum.at(matrix[row], cols, contrib)
+
+    fused = matrix.max(axis=0) if mode == "simple" else matrix.sum(axis=0)
+    k = min(top_k, len(unique))
+    top = np.argpartition(-fused, k - 1)[:k] if k < len(unique) else np.arange(len(unique))
+    # Stable sort so ties keep first-seen order (dense before sparse).
+    top = top[np.argsort(-fused[top], kind="stable")]
+    return [NodeWithScore(node=unique[i].node, score=float(fused[i])) for i in top]
+
+
+_search_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    """
+    Small shared pool that runs dense and sparse candidate search side by side.
+    """
+    global _search_pool
+    if _search_pool is None:
+        with _reranker_lock:
+            if _search_pool is None:
+                _search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+    return _search_pool
+
+
+@dataclass
+class RetrievalStats:
+    """
+    Per-stage wall-clock timings (seconds) and adaptive decisions for one
+    retrieval call. Pass an instance as `stats=` to rag_retrieve(_many).
+
+    Sparse search overlaps embedding and dense search, so the stage sum
+    (total_s) can exceed the end-to-end time (wall_s).
+    """
+    wall_s: float = 0.0
+    embed_s: float = 0.0
+    sparse_s: float = 0.0
+    dense_s: float = 0.0
+    fuse_s: float = 0.0
+    rerank_s: float = 0.0
+    # Queries answered from the retrieval cache (no stages run for them).
+    cache_hits: int = 0
+    # Per retrieved query: BM25 top-1/top-2 margin, candidate depth, whether it was reranked.
+    margins: List[float] = field(default_factory=list)
+    candidates: List[int] = field(default_factory=list)
+    reranked: List[bool] = field(default_factory=list)
+
+    @property
+    def total_s(self) -> float:
+        return self.embed_s + self.sparse_s + self.dense_s + self.fuse_s + self.rerank_s
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "total_s": self.total_s}
+
+
+def _bm25_margin(hits: List[NodeWithScore]) -> float:
+    """
+    Ratio of the top BM25 score to the runner-up (inf if the runner-up scored 0).
+    """
+    if not hits or not hits[0].score:
+        return 0.0
+    if len(hits) < 2 or not hits[1].score:
+        return float("inf")
+    return hits[0].score / hits[1].score
+
+
+def _candidate_depth(margin: float, k: int, candidate_k: int) -> int:
+    """
+    Adaptive candidate pool size: shallow for decisive sparse hits, halved for
+    confident ones, full depth otherwise.
+    """
+    shallow = min(candidate_k, max(k, RETRIEVAL_MIN_CANDIDATES))
+    if margin >= RETRIEVAL_DECISIVE_MARGIN:
+        return shallow
+    if margin >= RETRIEVAL_CONFIDENT_MARGIN:
+        return max(shallow, candidate_k // 2)
+    return candidate_k
+
+
+def _retrieve_nodes_many(
+    queries: Sequence[str],
+    k: int,
+    filters: Optional[Filters] = None,
+    adaptive: Optional[bool] = None,
+    stats: Optional[RetrievalStats] = None,
+    mode: Optional[str] = None,
+) -> List[List[NodeWithScore]]:
+    """
+    Hybrid retrieval + rerank for several queries at once:
+      0) resolve metadata filters to a node-id set (inverted metadata index)
+      1) sparse retrieval (BM25) for all queries in one bm25s call, on the
+         search pool, concurrently with
+      2) one batched embedding request for all queries and
+      3) dense retrieval (vector) per precomputed embedding
+      4) weighted fusion per query (FUSION_MODE, see _fuse)
+      5) one batched cross-encoder pass, reranked down to top-k per query
+
+    In adaptive mode (RETRIEVAL_ADAPTIVE, or adaptive=True) the BM25 margin of
+    each query picks its dense/fusion/rerank depth, and a decisive BM25 hit
+    that dense retrieval agrees on is returned first, without a rerank.
+
+    `mode` (default RETRIEVAL_MODE) runs a subset of the stages: "dense" or
+    "bm25" alone (top-k, no fusion or rerank), or "fusion" without the rerank.
+    """
+    mode = RETRIEVAL_MODE if mode is None else mode
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {', '.join(RETRIEVAL_MODES)}")
+    if not queries:
+        return []
+
+    from llama_index.core.indices.vector_store import VectorIndexRetriever
+    from llama_index.core.schema import QueryBundle
+
+    from src.sparse_index import bm25_retrieve_many
+
+    stats = stats if stats is not None else RetrievalStats()
+    adaptive = RETRIEVAL_ADAPTIVE if adaptive is None else adaptive
     index = _get_index()
 
+    # Both retrievers only score nodes that pass the filters.
+    node_ids = _get_metadata_index().match(filters) if filters else None
+    if node_ids is not None and not node_ids:
+        return [[] for _ in queries]
+
     # Retrieve more than k so reranking has room to improve precision.
     candidate_k = max(30, k * 6)
+    if node_ids is not None:
+        candidate_k = min(candidate_k, len(node_ids))
 
-    vector_retriever = index.as_retriever(similarity_top_k=candidate_k)
+    t0 = time.perf_counter()
 
-    bm25_retriever = BM25Retriever.from_defaults(
-        docstore=index.docstore,
-        similarity_top_k=candidate_k,
-    )
+    def sparse_search(depth: int = candidate_k) -> List[List[NodeWithScore]]:
+        hits = bm25_retrieve_many(_get_bm25(), queries, depth, node_ids=node_ids)
+        stats.sparse_s += time.perf_counter() - t0
+        return hits
 
-    fusion = QueryFusionRetriever(
-        retrievers=[vector_retriever, bm25_retriever],
-        similarity_top_k=candidate_k,
-        num_queries=1,
-        use_async=False,
-    )
-    nodes = fusion.retrieve(query)
+    # Not index.as_retriever(): it always passes every node id as a restriction,
+    # which forces the NumPy/HNSW stores onto their (exact) subset path.
+    restrict = sorted(node_ids) if node_ids is not None else None
 
-    reranker = SentenceTransformerRerank(
-        model="cross-encoder/ms-marco-MiniLM-L-2-v2",
-        top_n=k,
-    )
-    nodes = reranker.postprocess_nodes(nodes, query_str=query)
-    return nodes
+    def dense_search(embeddings: List[List[float]], depths: Sequence[int]) -> List[List[NodeWithScore]]:
+        t = time.perf_counter()
+        hits = [
+            VectorIndexRetriever(index, similarity_top_k=depth, node_ids=restrict).retrieve(
+                QueryBundle(query_str=q, embedding=e)
+            )
+            for q, e, depth in zip(queries, embeddings, depths)
+        ]
+        stats.dense_s += time.perf_counter() - t
+        return hits
 
+    if mode == "bm25":
+        sparse = sparse_search(k)
+        stats.wall_s += time.perf_counter() - t0
+        return sparse
+    if mode == "dense":
+        embeddings = _embed_queries(queries)
+        stats.embed_s += time.perf_counter() - t0
+        dense = dense_search(embeddings, [k] * len(queries))
+        stats.wall_s += time.perf_counter() - t0
+        return dense
 
-def rag_retrieve(query: str, k: int = 5) -> List[RetrievedChunk]:
-    """
-    Retrieve top-k chunks with metadata (song/album/source_path if indexed).
-    """
-    nodes = _retrieve_nodes(query, k=k)
+    # BM25 runs on the search pool while this thread embeds the queries (and,
+    # unless adaptive depth needs the BM25 margins first, runs dense search).
+    sparse_future = _get_search_pool().submit(sparse_search)
+    embeddings = _embed_queries(queries)
+    stats.embed_s += time.perf_counter() - t0
+
+    dense: Optional[List[List[NodeWithScore]]] = None
+    if not adaptive:
+        dense = dense_search(embeddings, [candidate_k] * len(queries))
+    sparse = sparse_future.result()
+
+    margins = [_bm25_margin(hits) for hits in sparse]
+    depths = [_candidate_depth(m, k, candidate_k) if adaptive else candidate_k for m in margins]
+    if dense is None:
+        dense = dense_search(embeddings, depths)
+
+    t3 = time.perf_counter()
+    weights = (FUSION_DENSE_WEIGHT, FUSION_SPARSE_WEIGHT)
+    fused = [_fuse([d, s[:depth]], depth, weights=weights) for d, s, depth in zip(dense, sparse, depths)]
+
+    # Decisive sparse hit that dense retrieval also found: skip the rerank.
+    skip = [
+        adaptive
+        and margin >= RETRIEVAL_DECISIVE_MARGIN
+        and any(nw.node.node_id == s[0].node.node_id for nw in d)
+        for margin, d, s in zip(margins, dense, sparse)
+    ]
+    t4 = time.perf_counter()
+    stats.fuse_s += t4 - t3
+
+    todo = [i for i, skipped in enumerate(skip) if not skipped] if mode == "fusion_rerank" else []
+    reranked = get_reranker().rerank_many([queries[i] for i in todo], [fused[i] for i in todo], top_n=k)
+    out: List[List[NodeWithScore]] = []
+    for nodes, hits, skipped in zip(fused, sparse, skip):
+        if skipped:
+            # The decisive BM25 hit leads; the rest keep their fused order.
+            top = hits[0].node.node_id
+            nodes = sorted(nodes, key=lambda nw: nw.node.node_id != top)
+        out.append(nodes[:k])
+    for i, nodes in zip(todo, reranked):
+        out[i] = nodes
+    stats.rerank_s += time.perf_counter() - t4
 
+    stats.margins.extend(margins)
+    stats.candidates.extend(depths)
+    stats.reranked.extend(i in todo for i in range(len(queries)))
+    stats.wall_s += time.perf_counter() - t0
+    return out
+
+
+def _retrieve_nodes(
+    query: str,
+    k: int,
+    filters: Optional[Filters] = None,
+    stats: Optional[RetrievalStats] = None,
+) -> List[NodeWithScore]:
+    return _retrieve_nodes_many([query], k, filters, stats=stats)[0]
+
+
+def _to_chunks(nodes: List[NodeWithScore]) -> List[RetrievedChunk]:
     out: List[RetrievedChunk] = []
     for nw in nodes:
         node = nw.node
@@ -138,12 +657,161 @@ def rag_retrieve(query: str, k: int = 5) -> List[RetrievedChunk]:
     return out
 
 
-def rag_search(query: str, k: int = 5) -> str:
+# -----------------------------------------------------------------------------
+# Retrieval cache
+# -----------------------------------------------------------------------------
+
+_retrieval_cache: Optional[TieredCache] = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[TieredCache]:
     """
-    Return a single context string for prompting, with metadata headers per chunk.
+    Process-wide retrieval result cache (None when RETRIEVAL_CACHE_ENABLED=0).
+    """
+    global _retrieval_cache
+    if not RETRIEVAL_CACHE_ENABLED:
+        return None
+    if _retrieval_cache is None:
+        with _retrieval_cache_lock:
+            if _retrieval_cache is None:
+                disk = (
+                    SQLiteCache(RETRIEVAL_CACHE_PATH, RETRIEVAL_CACHE_DISK_ENTRIES)
+                    if RETRIEVAL_CACHE_PATH
+                    else None
+                )
+                _retrieval_cache = TieredCache(LRUCache(RETRIEVAL_CACHE_MEMORY_ENTRIES), disk)
+    return _retrieval_cache
+
+
+def _get_index_version() -> str:
+    """
+    Version of the loaded index, read in the same load as the index (see
+    `_get_index`), so cache keys always match the index that answered.
+    """
+    global _index_version
+    index = _get_index()
+    if _index_version is None:
+        # `_index` was installed directly (tests, offline benchmarks).
+        from src.sparse_index import docstore_fingerprint
+
+        _index_version = f"{VECTOR_STORE_BACKEND}:{docstore_fingerprint(index.docstore)}"
+    return _index_version
+
+
+def _retrieval_cache_key(query: str, k: int, filters: Optional[Filters]) -> str:
+    from src.embedding_cache import normalize_text
+    from src.metadata_index import canonical_filters
+
+    # Everything besides the index that changes which chunks come back.
+    settings = [
+        EMBED_MODEL,
+        RERANK_MODEL,
+        FUSION_MODE,
+        FUSION_DENSE_WEIGHT,
+        FUSION_SPARSE_WEIGHT,
+        FUSION_RRF_K,
+        RETRIEVAL_ADAPTIVE,
+        RETRIEVAL_DECISIVE_MARGIN,
+        RETRIEVAL_CONFIDENT_MARGIN,
+        RETRIEVAL_MIN_CANDIDATES,
+        RETRIEVAL_MODE,
+        HNSW_EF_SEARCH,
+    ]
+    return content_key(
+        "rag_retrieve",
+        normalize_text(query),
+        k,
+        canonical_filters(filters),
+        _get_index_version(),
+        settings,
+    )
+
+
+def _encode_chunks(chunks: List[RetrievedChunk]) -> bytes:
+    payload = [{"page_content": c.page_content, "metadata": c.metadata} for c in chunks]
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _decode_chunks(data: bytes) -> List[RetrievedChunk]:
+    return [RetrievedChunk(**row) for row in json.loads(data.decode("utf-8"))]
+
+
+def rag_retrieve(
+    query: str,
+    k: int = 5,
+    filters: Optional[Filters] = None,
+    stats: Optional[RetrievalStats] = None,
+    use_cache: bool = True,
+) -> List[RetrievedChunk]:
+    """
+    Retrieve top-k chunks with metadata (song/album/source_path if indexed).
+
+    `filters` limits candidates to matching metadata, e.g. {"album": "Abbey Road"}.
+    Pass a RetrievalStats as `stats` to collect per-stage timings, and
+    use_cache=False to bypass the retrieval cache.
     """
-    chunks = rag_retrieve(query, k=k)
+    return rag_retrieve_many([query], k=k, filters=filters, stats=stats, use_cache=use_cache)[0]
+
+
+def rag_retrieve_many(
+    queries: Sequence[str],
+    k: int = 5,
+    filters: Optional[Filters] = None,
+    stats: Optional[RetrievalStats] = None,
+    use_cache: bool = True,
+) -> List[List[RetrievedChunk]]:
+    """
+    Batched rag_retrieve: one result list per query, in the same order.
+
+    Embedding, BM25 scoring and reranking are shared across the batch;
+    `filters` applies to every query. Cached queries are answered from the
+    retrieval cache and only the misses are retrieved.
+    """
+    # Tracing records the stage timings, so collect them even if the caller did not ask.
+    if stats is None and current_tracer() is not None:
+        stats = RetrievalStats()
+
+    with span("rag_retrieve", RETRIEVAL, **{"retrieval.queries": len(queries), "retrieval.k": k}) as s:
+        out = _rag_retrieve_many(queries, k, filters, stats, use_cache)
+        if stats is not None:
+            s.set(**{f"retrieval.{name}": value for name, value in stats.as_dict().items() if not isinstance(value, list)})
+        return out
+
+
+def _rag_retrieve_many(
+    queries: Sequence[str],
+    k: int,
+    filters: Optional[Filters],
+    stats: Optional[RetrievalStats],
+    use_cache: bool,
+) -> List[List[RetrievedChunk]]:
+    cache = get_retrieval_cache() if use_cache else None
+    if cache is None:
+        nodes = _retrieve_nodes_many(queries, k=k, filters=filters, stats=stats)
+        return [_to_chunks(n) for n in nodes]
 
+    out: List[Optional[List[RetrievedChunk]]] = []
+    keys = [_retrieval_cache_key(q, k, filters) for q in queries]
+    for key in keys:
+        hit = cache.get(key)
+        out.append(_decode_chunks(hit) if hit is not None else None)
+    missing = [i for i, chunks in enumerate(out) if chunks is None]
+    if stats is not None:
+        stats.cache_hits += len(queries) - len(missing)
+
+    if missing:
+        nodes = _retrieve_nodes_many([queries[i] for i in missing], k=k, filters=filters, stats=stats)
+        for i, n in zip(missing, nodes):
+            out[i] = _to_chunks(n)
+            cache.set(keys[i], _encode_chunks(out[i]))
+    return out  # type: ignore[return-value]
+
+
+def format_chunks(chunks: List[RetrievedChunk]) -> str:
+    """
+    Join chunks into a single context string, with metadata headers per chunk.
+    """
     parts: List[str] = []
     for c in chunks:
         song = c.metadata.get("song", "Unknown")
@@ -156,17 +824,290 @@ def rag_search(query: str, k: int = 5) -> str:
     return "\n\n---\n\n".join(parts)
 
 
-def call_llm(system_prompt: str, user_prompt: str) -> str:
+def rag_search(query: str, k: int = 5, filters: Optional[Filters] = None) -> str:
     """
-    Call the OpenAI Responses API for generation.
+    Return a single context string for prompting, with metadata headers per chunk.
+    """
+    return format_chunks(rag_retrieve(query, k=k, filters=filters))
+
+
+# -----------------------------------------------------------------------------
+# Generation
+# -----------------------------------------------------------------------------
+
+MAX_OUTPUT_TOKENS = 1200
+
+_llm: Optional[LLMClient] = None
+_llm_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
     """
-    resp = client.responses.create(
-        model=MODEL_NAME,
-        input=[
+    Process-wide LLM client: one HTTP pool, shared retry/concurrency/TPM limits.
+    """
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from src.llm_client import LLMClient
+
+                _llm = LLMClient(
+                    api_key=require_api_key(),
+                    base_url=OPENAI_BASE_URL,
+                    timeout=LLM_TIMEOUT_S,
+                    max_retries=LLM_MAX_RETRIES,
+                    max_concurrency=LLM_MAX_CONCURRENCY,
+                    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                )
+    return _llm
+
+
+def _llm_request(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+    from src.llm_client import estimate_tokens
+
+    return {
+        "estimated_tokens": estimate_tokens(system_prompt + user_prompt) + MAX_OUTPUT_TOKENS,
+        "model": MODEL_NAME,
+        "input": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-        max_output_tokens=1200,
-        temperature=0,
+        "max_output_tokens": MAX_OUTPUT_TOKENS,
+        "temperature": 0,
+    }
+
+
+_llm_cache: Optional[TieredCache] = None
+
+
+def get_llm_cache() -> Optional[TieredCache]:
+    """
+    Process-wide LLM response cache (None when LLM_CACHE_ENABLED=0).
+    """
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        with _llm_lock:
+            if _llm_cache is None:
+                ttl = LLM_CACHE_TTL_S or None
+                disk = SQLiteCache(LLM_CACHE_PATH, LLM_CACHE_DISK_ENTRIES, ttl) if LLM_CACHE_PATH else None
+                _llm_cache = TieredCache(LRUCache(LLM_CACHE_MEMORY_ENTRIES, ttl), disk)
+    return _llm_cache
+
+
+def _llm_cache_key(request: Dict[str, Any]) -> str:
+    # Everything that changes the response; estimated_tokens is client-side only.
+    return content_key({k: v for k, v in request.items() if k != "estimated_tokens"})
+
+
+def _trace_llm(s: Any, request: Dict[str, Any], cache_hit: bool, streamed: bool = False) -> None:
+    s.set(
+        **{
+            "gen_ai.request.model": request["model"],
+            "llm.estimated_tokens": request["estimated_tokens"],
+            "llm.streamed": streamed,
+            "cache.hit": cache_hit,
+        }
     )
-    return resp.output[0].content[0].text
+
+
+def _trace_usage(s: Any, usage: Any) -> None:
+    if usage is None:
+        return
+    s.set(
+        **{
+            "gen_ai.usage.input_tokens": usage.input_tokens,
+            "gen_ai.usage.output_tokens": usage.output_tokens,
+            "llm.cost_usd": llm_cost_usd(usage.input_tokens, usage.output_tokens),
+        }
+    )
+
+
+def _cache_lookup(request: Dict[str, Any], use_cache: bool) -> Tuple[Optional[TieredCache], str, Optional[str]]:
+    cache = get_llm_cache() if use_cache else None
+    if cache is None:
+        return None, "", None
+    key = _llm_cache_key(request)
+    hit = cache.get(key)
+    return cache, key, hit.decode("utf-8") if hit is not None else None
+
+
+async def acall_llm(system_prompt: str, user_prompt: str, use_cache: bool = True) -> str:
+    """
+    Async call to the OpenAI Responses API for generation.
+
+    Pass use_cache=False to bypass the response cache for this call.
+    """
+    request = _llm_request(system_prompt, user_prompt)
+    with span("call_llm", LLM) as s:
+        cache, key, hit = _cache_lookup(request, use_cache)
+        _trace_llm(s, request, hit is not None)
+        if hit is not None:
+            return hit
+
+        resp = await get_llm_client().acreate(**request)
+        _trace_usage(s, resp.usage)
+        text = resp.output[0].content[0].text
+        if cache is not None:
+            cache.set(key, text.encode("utf-8"))
+        return text
+
+
+def call_llm(system_prompt: str, user_prompt: str, use_cache: bool = True) -> str:
+    """
+    Call the OpenAI Responses API for generation.
+
+    Blocking wrapper over the same pooled client as acall_llm().
+    Pass use_cache=False to bypass the response cache for this call.
+    """
+    request = _llm_request(system_prompt, user_prompt)
+    with span("call_llm", LLM) as s:
+        cache, key, hit = _cache_lookup(request, use_cache)
+        _trace_llm(s, request, hit is not None)
+        if hit is not None:
+            return hit
+
+        resp = get_llm_client().create(**request)
+        _trace_usage(s, resp.usage)
+        text = resp.output[0].content[0].text
+        if cache is not None:
+            cache.set(key, text.encode("utf-8"))
+        return text
+
+
+# -----------------------------------------------------------------------------
+# Streaming generation
+# -----------------------------------------------------------------------------
+
+# Receives (stage, text delta) as streamed responses arrive, e.g. ("writer", "The ").
+TokenSink = Callable[[str, str], None]
+
+_token_sink: ContextVar[Optional[TokenSink]] = ContextVar("token_sink", default=None)
+
+
+@contextmanager
+def stream_tokens_to(sink: TokenSink) -> Iterator[None]:
+    """
+    Within this block, nodes that generate via call_llm_streaming() (writer,
+    editor) send their text to `sink` as it is generated.
+    """
+    token = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+def call_llm_stream(system_prompt: str, user_prompt: str, use_cache: bool = True) -> Iterator[str]:
+    """
+    Streaming call_llm: yields text deltas from the Responses API as they arrive.
+
+    A cache hit is yielded as a single chunk. The full text is cached only
+    once the stream has completed.
+    """
+    request = _llm_request(system_prompt, user_prompt)
+    cache, key, hit = _cache_lookup(request, use_cache)
+    s = start_span("call_llm", LLM)
+    _trace_llm(s, request, hit is not None, streamed=True)
+    try:
+        if hit is not None:
+            yield hit
+            return
+
+        parts: List[str] = []
+        for delta in get_llm_client().stream(on_usage=lambda usage: _trace_usage(s, usage), **request):
+            parts.append(delta)
+            yield delta
+        if cache is not None:
+            cache.set(key, "".join(parts).encode("utf-8"))
+    except Exception as exc:
+        s.end(error=exc)
+        raise
+    finally:
+        s.end()
+
+
+async def acall_llm_stream(system_prompt: str, user_prompt: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Async call_llm_stream().
+    """
+    request = _llm_request(system_prompt, user_prompt)
+    cache, key, hit = _cache_lookup(request, use_cache)
+    s = start_span("call_llm", LLM)
+    _trace_llm(s, request, hit is not None, streamed=True)
+    try:
+        if hit is not None:
+            yield hit
+            return
+
+        parts: List[str] = []
+        async for delta in get_llm_client().astream(on_usage=lambda usage: _trace_usage(s, usage), **request):
+            parts.append(delta)
+            yield delta
+        if cache is not None:
+            cache.set(key, "".join(parts).encode("utf-8"))
+    except Exception as exc:
+        s.end(error=exc)
+        raise
+    finally:
+        s.end()
+
+
+def call_llm_streaming(system_prompt: str, user_prompt: str, stage: str, use_cache: bool = True) -> str:
+    """
+    call_llm() that also streams its text to the active token sink, if any.
+
+    Returns the full text either way, so callers store it in AgentState as usual.
+    """
+    sink = _token_sink.get()
+    if sink is None:
+        return call_llm(system_prompt, user_prompt, use_cache=use_cache)
+
+    parts: List[str] = []
+    for delta in call_llm_stream(system_prompt, user_prompt, use_cache=use_cache):
+        sink(stage, delta)
+        parts.append(delta)
+    return "".join(parts)
+
+
+# -----------------------------------------------------------------------------
+# Warmup
+# -----------------------------------------------------------------------------
+
+
+def warmup(background: bool = True) -> Optional[threading.Thread]:
+    """
+    Preload what the first question needs: the vector index, BM25 and metadata
+    indexes, the reranker weights and the LLM client (with their imports).
+
+    With background=True this runs in a daemon thread, which is returned, so
+    the CLI can load while the user types. Failures are printed, not raised;
+    the first real query reports them again.
+    """
+
+    def load_indexes() -> None:
+        _get_index()
+        _get_bm25()
+        _get_metadata_index()
+
+    steps = [
+        ("index", load_indexes),
+        ("reranker", lambda: get_reranker().warmup()),
+        ("llm client", get_llm_client),
+    ]
+
+    def run() -> None:
+        for name, step in steps:
+            try:
+                step()
+            except Exception as exc:
+                print(f"⚠️ warmup: could not preload {name}: {exc}")
+
+    if not background:
+        run()
+        return None
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,385 @@
+"""
+Per-stage tracing for the agent pipeline.
+
+A Tracer collects spans: one per agent node, and one per call_llm /
+rag_retrieve call made inside it. Each span records wall time and structured
+attributes (tokens, cache hits, retrieval stage timings). Spans nest through a
+context variable, so LLM and retrieval spans are attributed to the node that
+made them, including across LangGraph's worker threads.
+
+    with Tracer().activate() as tracer:
+        ...                          # run nodes / call_llm / rag_retrieve
+    summarize(tracer.export())       # seconds, tokens and dollars per node
+
+Spans are plain dicts (AgentState["trace"]), can be appended to a JSONL file,
+and converted to OTLP/JSON for an OpenTelemetry collector (e.g. the default
+http://localhost:4318). No tracing cost is paid when no tracer is active.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.config import (
+    LLM_INPUT_USD_PER_MTOK,
+    LLM_OUTPUT_USD_PER_MTOK,
+    OTEL_EXPORTER_OTLP_ENDPOINT,
+    TRACE_JSONL_PATH,
+    TRACE_SERVICE_NAME,
+)
+
+# Span kinds: a whole pipeline run, an agent node, an LLM request, a retrieval call.
+PIPELINE = "pipeline"
+NODE = "node"
+LLM = "llm"
+RETRIEVAL = "retrieval"
+
+# OTLP SpanKind: INTERNAL for local work, CLIENT for remote LLM calls.
+_OTLP_KIND = {PIPELINE: 1, NODE: 1, RETRIEVAL: 1, LLM: 3}
+
+
+class Span:
+    """
+    One timed operation. Set attributes with `set(...)`; `end()` records it.
+    """
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        kind: str,
+        parent: Optional["Span"],
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = tracer.trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+        self.start_s = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_s: Optional[float] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.duration_s is not None:
+            return
+        self.duration_s = time.perf_counter() - self._t0
+        if error is not None:
+            self.error = repr(error)
+        self.tracer._record(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_s": self.start_s,
+            "duration_s": self.duration_s,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": dict(self.attributes),
+        }
+
+
+class _NoopSpan:
+    # Stands in for a Span when no tracer is active.
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+_tracer: ContextVar[Optional["Tracer"]] = ContextVar("tracer", default=None)
+_parent: ContextVar[Optional[Span]] = ContextVar("trace_parent", default=None)
+
+
+class Tracer:
+    """
+    Collects finished spans for one trace (e.g. one pipeline run). Thread-safe.
+    """
+
+    def __init__(self) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """
+        Make this the current tracer for code run in this context.
+        """
+        token = _tracer.set(self)
+        try:
+            yield self
+        finally:
+            _tracer.reset(token)
+
+    def export(self) -> List[Dict[str, Any]]:
+        """
+        Finished spans as dicts, in start order.
+        """
+        with self._lock:
+            spans = list(self._spans)
+        return [s.as_dict() for s in sorted(spans, key=lambda s: s._t0)]
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _tracer.get()
+
+
+def start_span(name: str, kind: str, **attributes: Any) -> Any:
+    """
+    Start a span under the current one without making it current.
+
+    For work that spans generator yields (streamed LLM calls), where a context
+    variable cannot be set and reset safely. Call `.end()` when done.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        return _NOOP
+    return Span(tracer, name, kind, _parent.get(), attributes)
+
+
+@contextmanager
+def span(name: str, kind: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Time the enclosed block as a child of the current span.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield _NOOP
+        return
+
+    s = Span(tracer, name, kind, _parent.get(), attributes)
+    token = _parent.set(s)
+    try:
+        yield s
+    except BaseException as exc:
+        s.end(error=exc)
+        raise
+    finally:
+        _parent.reset(token)
+        s.end()
+
+
+def annotate(**attributes: Any) -> None:
+    """
+    Add attributes to the current span (no-op when not tracing).
+    """
+    s = _parent.get()
+    if s is not None and _tracer.get() is not None:
+        s.set(**attributes)
+
+
+def traced_node(node: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap an agent node in a span named after it (writer_node -> "writer").
+
+    Under an active tracer (the graph pipeline), spans go to that tracer. A
+    whole-state node called on its own traces itself and appends its spans to
+    state["trace"], so hand-chained runs get the same record.
+    """
+    name = node.__name__[: -len("_node")] if node.__name__.endswith("_node") else node.__name__
+
+    @functools.wraps(node)
+    def run(state: Any) -> Any:
+        if _tracer.get() is not None:
+            with span(name, NODE):
+                return node(state)
+
+        with Tracer().activate() as tracer:
+            with span(name, NODE):
+                out = node(state)
+        if out is state:
+            state.setdefault("trace", []).extend(tracer.export())
+        return out
+
+    return run
+
+
+# -----------------------------------------------------------------------------
+# Cost summary
+# -----------------------------------------------------------------------------
+
+
+def llm_cost_usd(input_tokens: int, output_tokens: int) -> float:
+    return (input_tokens * LLM_INPUT_USD_PER_MTOK + output_tokens * LLM_OUTPUT_USD_PER_MTOK) / 1e6
+
+
+def summarize(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-node totals: seconds, LLM calls, tokens, cache hits and estimated cost.
+
+    LLM and retrieval spans are attributed to their nearest enclosing node;
+    those outside any node (e.g. a bare rag_retrieve call) only count towards
+    "total". "total" sums all spans, except for seconds: that is the wall
+    time of the top-level spans, since research tasks run in parallel.
+    """
+    by_id = {s["span_id"]: s for s in spans}
+
+    def owner(s: Dict[str, Any]) -> Optional[str]:
+        while s is not None and s["kind"] != NODE:
+            s = by_id.get(s["parent_id"])  # type: ignore[arg-type]
+        return s["name"] if s is not None else None
+
+    out: Dict[str, Dict[str, Any]] = {}
+    total = out.setdefault("total", _empty_summary())
+    for s in spans:
+        name = owner(s)
+        rows = (out.setdefault(name, _empty_summary()), total) if name is not None else (total,)
+        attrs = s["attributes"]
+        if s["parent_id"] is None:
+            total["seconds"] += s["duration_s"] or 0.0
+        if s["kind"] == NODE:
+            rows[0]["seconds"] += s["duration_s"] or 0.0  # a node owns itself
+        elif s["kind"] == LLM:
+            for r in rows:
+                r["llm_calls"] += 1
+                r["llm_cache_hits"] += int(bool(attrs.get("cache.hit")))
+                r["input_tokens"] += attrs.get("gen_ai.usage.input_tokens", 0)
+                r["output_tokens"] += attrs.get("gen_ai.usage.output_tokens", 0)
+                r["llm_seconds"] += s["duration_s"] or 0.0
+        elif s["kind"] == RETRIEVAL:
+            for r in rows:
+                r["retrieval_seconds"] += s["duration_s"] or 0.0
+                r["retrieval_cache_hits"] += attrs.get("retrieval.cache_hits", 0)
+
+    for row in out.values():
+        row["cost_usd"] = llm_cost_usd(row["input_tokens"], row["output_tokens"])
+    out["total"] = out.pop("total")  # keep the total row last
+    return out
+
+
+def _empty_summary() -> Dict[str, Any]:
+    return {
+        "seconds": 0.0,
+        "llm_calls": 0,
+        "llm_cache_hits": 0,
+        "llm_seconds": 0.0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "retrieval_seconds": 0.0,
+        "retrieval_cache_hits": 0,
+    }
+
+
+# -----------------------------------------------------------------------------
+# Export
+# -----------------------------------------------------------------------------
+
+
+def write_jsonl(spans: List[Dict[str, Any]], path: str) -> None:
+    """
+    Append one JSON line per span to `path`.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for s in spans:
+            f.write(json.dumps(s, ensure_ascii=False) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str = TRACE_SERVICE_NAME) -> Dict[str, Any]:
+    """
+    OTLP/JSON ExportTraceServiceRequest for `spans`.
+    """
+    otlp_spans = []
+    for s in spans:
+        start_ns = int(s["start_s"] * 1e9)
+        span = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": _OTLP_KIND.get(s["kind"], 1),
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((s["duration_s"] or 0.0) * 1e9)),
+            "attributes": _otlp_attributes({"span.kind": s["kind"], **s["attributes"]}),
+            "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 1},
+        }
+        if s["parent_id"]:
+            span["parentSpanId"] = s["parent_id"]
+        otlp_spans.append(span)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+                "scopeSpans": [{"scope": {"name": "src.tracing"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+def post_otlp(spans: List[Dict[str, Any]], endpoint: str, timeout: float = 5.0) -> None:
+    """
+    Send `spans` to an OTLP/HTTP collector (`endpoint` like http://localhost:4318).
+    """
+    req = urllib.request.Request(
+        endpoint.rstrip("/") + "/v1/traces",
+        data=json.dumps(to_otlp(spans)).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+
+
+def export_trace(
+    spans: List[Dict[str, Any]],
+    jsonl_path: str = TRACE_JSONL_PATH,
+    otlp_endpoint: str = OTEL_EXPORTER_OTLP_ENDPOINT,
+) -> None:
+    """
+    Export to the configured sinks (both off by default). Never raises.
+    """
+    if not spans:
+        return
+    if jsonl_path:
+        try:
+            write_jsonl(spans, jsonl_path)
+        except OSError as exc:
+            print(f"⚠️ trace: could not write {jsonl_path}: {exc}")
+    if otlp_endpoint:
+        try:
+            post_otlp(spans, otlp_endpoint)
+        except Exception as exc:
+            print(f"⚠️ trace: could not export to {otlp_endpoint}: {exc}")
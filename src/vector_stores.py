@@ -0,0 +1,333 @@
+"""
+Vector store backends for the dense retriever.
+
+- "simple": LlamaIndex's default SimpleVectorStore (JSON on disk, Python lists
+  in memory, pure-Python similarity scan).
+- "numpy": NumpyVectorStore below. Embeddings are persisted as one contiguous
+  float32 .npy matrix, memory-mapped on load, and searched with a single
+  matrix-vector product + argpartition.
+- "hnsw": HNSWVectorStore below. Same .npy storage plus an approximate
+  nearest-neighbour graph (hnswlib) for sub-linear search on large corpora.
+
+The backend is chosen by VECTOR_STORE_BACKEND in src/config.py and must match
+between `src.index_build` and the retrieval layer.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from llama_index.core import StorageContext
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.simple import DEFAULT_PERSIST_FNAME
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from pydantic import PrivateAttr
+
+BACKENDS = ("simple", "numpy", "hnsw")
+
+# Persisted as <namespace>__vector_store.npy / .ids.json, next to where the
+# simple store would write <namespace>__vector_store.json.
+DEFAULT_NAMESPACE = "default"
+NAMESPACE_SEP = "__"
+
+
+def _base_path(persist_path: str) -> str:
+    return persist_path[: -len(".json")] if persist_path.endswith(".json") else persist_path
+
+
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (mat / norms).astype(np.float32, copy=False)
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    Dense vectors in a float32 matrix; cosine similarity via a normalized dot product.
+
+    Rows are L2-normalized on add, so a query is one mat @ q. Loaded stores are
+    memory-mapped (read-only); the first add/delete copies them into memory.
+    """
+
+    stores_text: bool = False
+
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[Optional[str]] = PrivateAttr(default_factory=list)
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)  # node id -> matrix row
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    # No __len__: StorageContext.from_defaults tests `if vector_store:`, and an
+    # empty store must not be mistaken for "no store given".
+    @property
+    def count(self) -> int:
+        return len(self._ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    # -- mutation -----------------------------------------------------------
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        new = _normalize_rows(np.asarray([n.get_embedding() for n in nodes], dtype=np.float32))
+        if self._matrix is None or len(self._ids) == 0:
+            self._matrix = new
+        else:
+            self._matrix = np.concatenate([np.asarray(self._matrix), new])
+        for n in nodes:
+            self._rows[n.node_id] = len(self._ids)
+            self._ids.append(n.node_id)
+            self._ref_doc_ids.append(n.ref_doc_id)
+        return [n.node_id for n in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        keep = [i for i, r in enumerate(self._ref_doc_ids) if r != ref_doc_id]
+        if len(keep) == len(self._ids):
+            return
+        self._matrix = np.asarray(self.matrix)[keep] if keep else None
+        self._ids = [self._ids[i] for i in keep]
+        self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep]
+        self._rows = {nid: row for row, nid in enumerate(self._ids)}
+
+    # -- search -------------------------------------------------------------
+
+    def _query_vector(self, query: VectorStoreQuery) -> Optional[np.ndarray]:
+        """
+        Validate the query and return the normalized query vector (None = no results).
+        """
+        if query.filters is not None:
+            raise ValueError(f"{self.class_name()} does not support metadata filters; pass node_ids instead.")
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"{self.class_name()} only supports the default query mode, not {query.mode}")
+        if not self._ids or query.query_embedding is None:
+            return None
+
+        q = np.asarray(query.query_embedding, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        return q
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        q = self._query_vector(query)
+        if q is None:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        rows: Optional[np.ndarray] = None
+        if query.node_ids is not None:
+            # Unique and in store order, like a full scan would rank ties.
+            rows = np.unique(np.fromiter((self._rows[nid] for nid in query.node_ids if nid in self._rows), dtype=np.int64))
+            if rows.size == 0:
+                return VectorStoreQueryResult(similarities=[], ids=[])
+            scores = self.matrix[rows] @ q
+        else:
+            scores = self.matrix @ q
+
+        top = self._top_k(scores, query.similarity_top_k)
+        if rows is not None:
+            positions = rows[top]
+        else:
+            positions = top
+        return VectorStoreQueryResult(
+            similarities=[float(scores[i]) for i in top],
+            ids=[self._ids[int(p)] for p in positions],
+        )
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    # -- persistence --------------------------------------------------------
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        base = _base_path(persist_path)
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+
+        # Write to temp files then rename, so a reader never maps a half-written file.
+        tmp_npy = base + ".npy.tmp"
+        with open(tmp_npy, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        tmp_ids = base + ".ids.json.tmp"
+        with open(tmp_ids, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "ref_doc_ids": self._ref_doc_ids}, f)
+        os.replace(tmp_npy, base + ".npy")
+        os.replace(tmp_ids, base + ".ids.json")
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, mmap: bool = True, **kwargs: Any) -> "NumpyVectorStore":
+        base = _base_path(persist_path)
+        store = cls(**kwargs)
+        with open(base + ".ids.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        store._ids = list(meta["ids"])
+        store._ref_doc_ids = list(meta["ref_doc_ids"])
+        store._rows = {nid: row for row, nid in enumerate(store._ids)}
+        if store._ids:
+            store._matrix = np.load(base + ".npy", mmap_mode="r" if mmap else None)
+        return store
+
+    @classmethod
+    def from_persist_dir(
+        cls,
+        persist_dir: str,
+        namespace: str = DEFAULT_NAMESPACE,
+        mmap: bool = True,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        fname = f"{namespace}{NAMESPACE_SEP}{DEFAULT_PERSIST_FNAME}"
+        return cls.from_persist_path(os.path.join(persist_dir, fname), mmap=mmap, **kwargs)
+
+
+def _import_hnswlib() -> Any:
+    try:
+        import hnswlib
+    except ImportError:
+        raise ImportError(
+            "VECTOR_STORE_BACKEND=hnsw requires hnswlib; `pip install hnswlib`"
+        )
+    return hnswlib
+
+
+class HNSWVectorStore(NumpyVectorStore):
+    """
+    NumpyVectorStore plus an HNSW graph for approximate top-k.
+
+    Recall/latency knobs:
+      - m: graph degree (build time; higher = better recall, more memory)
+      - ef_construction: build-time beam width (higher = better graph, slower build)
+      - ef_search: query-time beam width (higher = better recall, slower queries)
+
+    The graph is rebuilt after any add/delete, on persist() (i.e. by
+    `src.index_build`) or lazily on the next query. Queries restricted to
+    node_ids use the exact matrix scan, since candidate sets are small.
+    """
+
+    m: int = 16
+    ef_construction: int = 200
+    ef_search: int = 64
+
+    _hnsw: Any = PrivateAttr(default=None)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HNSWVectorStore"
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        self._hnsw = None
+        return super().add(nodes, **add_kwargs)
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._hnsw = None
+        super().delete(ref_doc_id, **delete_kwargs)
+
+    def _graph(self) -> Any:
+        if self._hnsw is None:
+            hnswlib = _import_hnswlib()
+            n, dim = self.matrix.shape
+            index = hnswlib.Index(space="ip", dim=dim)
+            index.init_index(max_elements=max(n, 1), ef_construction=self.ef_construction, M=self.m)
+            index.add_items(np.asarray(self.matrix), np.arange(n))
+            index.set_ef(self.ef_search)
+            self._hnsw = index
+        return self._hnsw
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.node_ids is not None:
+            return super().query(query, **kwargs)
+
+        q = self._query_vector(query)
+        if q is None:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        graph = self._graph()
+        k = min(query.similarity_top_k, len(self._ids))
+        if k <= 0:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+        # hnswlib needs ef >= k to return k results.
+        graph.set_ef(max(self.ef_search, k))
+        labels, distances = graph.knn_query(q, k=k)
+        return VectorStoreQueryResult(
+            similarities=[1.0 - float(d) for d in distances[0]],  # "ip" distance is 1 - dot
+            ids=[self._ids[int(i)] for i in labels[0]],
+        )
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        super().persist(persist_path, fs=fs)
+        if self._ids:
+            base = _base_path(persist_path)
+            self._graph().save_index(base + ".hnsw.bin.tmp")
+            os.replace(base + ".hnsw.bin.tmp", base + ".hnsw.bin")
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, mmap: bool = True, **kwargs: Any) -> "HNSWVectorStore":
+        store = super().from_persist_path(persist_path, mmap=mmap, **kwargs)
+        path = _base_path(persist_path) + ".hnsw.bin"
+        if store._ids and os.path.exists(path):
+            hnswlib = _import_hnswlib()
+            index = hnswlib.Index(space="ip", dim=store.matrix.shape[1])
+            index.load_index(path, max_elements=len(store._ids))
+            index.set_ef(store.ef_search)
+            store._hnsw = index
+        return store  # type: ignore[return-value]
+
+
+_STORE_CLASSES = {"numpy": NumpyVectorStore, "hnsw": HNSWVectorStore}
+
+
+def new_storage_context(backend: str, **store_kwargs: Any) -> StorageContext:
+    """
+    Empty storage context for a fresh build with the chosen backend.
+
+    store_kwargs are backend parameters (e.g. m/ef_construction/ef_search for hnsw).
+    """
+    if backend in _STORE_CLASSES:
+        cls = _STORE_CLASSES[backend]
+        return StorageContext.from_defaults(vector_store=cls(**_fields_for(cls, store_kwargs)))
+    if backend == "simple":
+        return StorageContext.from_defaults()
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND {backend!r}; expected one of {BACKENDS}")
+
+
+def load_storage_context(backend: str, persist_dir: str, **store_kwargs: Any) -> StorageContext:
+    """
+    Storage context for a persisted index with the chosen backend.
+    """
+    if backend in _STORE_CLASSES:
+        cls = _STORE_CLASSES[backend]
+        return StorageContext.from_defaults(
+            persist_dir=persist_dir,
+            vector_store=cls.from_persist_dir(persist_dir, **_fields_for(cls, store_kwargs)),
+        )
+    if backend == "simple":
+        return StorageContext.from_defaults(persist_dir=persist_dir)
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND {backend!r}; expected one of {BACKENDS}")
+
+
+def _fields_for(cls: Any, store_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # Callers pass every backend's knobs; keep only those this store accepts.
+    return {k: v for k, v in store_kwargs.items() if k in cls.model_fields}
@@ -1,5 +1,63 @@
+import os
+import re
 import sys
 from pathlib import Path
 
+from llama_index.core.embeddings import MockEmbedding
+
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
+
+# Building an API client requires a key (require_api_key()); tests only ever
+# talk to local fakes, so any value will do.
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+# Keep tests hermetic: no shared on-disk LLM cache unless a test opts in.
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["EMBED_CACHE_ENABLED"] = "0"
+os.environ["RETRIEVAL_CACHE_ENABLED"] = "0"
+
+
+class CountingEmbedding(MockEmbedding):
+    """
+    MockEmbedding that counts texts embedded and batch calls. Vectors are
+    [len(text)] * embed_dim, so they are deterministic but differ per text.
+    """
+
+    texts_embedded: int = 0
+    batch_calls: int = 0
+
+    def _vector(self, text):
+        return [float(len(text))] * self.embed_dim
+
+    def _get_query_embedding(self, query):
+        self.texts_embedded += 1
+        return self._vector(query)
+
+    def _get_text_embedding(self, text):
+        self.texts_embedded += 1
+        return self._vector(text)
+
+    def get_text_embedding_batch(self, texts, show_progress=False, **kwargs):
+        self.batch_calls += 1
+        return super().get_text_embedding_batch(texts, show_progress=show_progress, **kwargs)
+
+
+class OverlapCrossEncoder:
+    """
+    Cross-encoder stand-in: scores (query, text) pairs by how many query words
+    the text contains. `calls` records the number of pairs per predict() call.
+    """
+
+    _word_re = re.compile(r"[a-z0-9']+")
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=64, show_progress_bar=False):
+        self.calls.append(len(pairs))
+        scores = []
+        for query, text in pairs:
+            words = set(self._word_re.findall(text.lower()))
+            scores.append(float(sum(w in words for w in self._word_re.findall(query.lower()))))
+        return scores
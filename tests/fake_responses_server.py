@@ -0,0 +1,144 @@
+"""
+Minimal local stand-in for the OpenAI Responses API (POST /v1/responses).
+
+Tests script a queue of (status, headers) failures; every other request gets
+a completed response whose text echoes the user prompt. Requests with
+"stream": true get the same text as server-sent events, one
+response.output_text.delta per word (stream_delay seconds apart).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+
+def response_body(text: str) -> Dict[str, Any]:
+    return {
+        "id": "resp_fake",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": "fake-model",
+        "status": "completed",
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_fake",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "usage": {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15},
+    }
+
+
+def stream_events(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    text = response["output"][0]["content"][0]["text"]
+    events: List[Dict[str, Any]] = [{"type": "response.created", "response": {**response, "status": "in_progress"}}]
+    for piece in re.findall(r"\S+\s*", text):
+        events.append(
+            {
+                "type": "response.output_text.delta",
+                "item_id": "msg_fake",
+                "output_index": 0,
+                "content_index": 0,
+                "delta": piece,
+                "logprobs": [],
+            }
+        )
+    events.append({"type": "response.completed", "response": response})
+    return [{**event, "sequence_number": i} for i, event in enumerate(events)]
+
+
+class FakeResponsesServer:
+    def __init__(self, delay: float = 0.0, stream_delay: float = 0.0) -> None:
+        self.delay = delay
+        self.stream_delay = stream_delay
+        self.failures: List[Tuple[int, Dict[str, str]]] = []
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.requests.append(body)
+                    server.in_flight += 1
+                    server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+                    failure = server.failures.pop(0) if server.failures else None
+                try:
+                    time.sleep(server.delay)
+                    if failure is not None:
+                        status, headers = failure
+                        payload = {"error": {"message": "scripted failure", "type": "fake"}}
+                    elif body.get("stream"):
+                        self._send_stream(stream_events(server.render(body)))
+                        return
+                    else:
+                        status, headers = 200, {}
+                        payload = server.render(body)
+                    self._send_json(status, payload, headers)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _send_json(self, status: int, payload: Any, headers: Dict[str, str]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, events: List[Dict[str, Any]]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in events:
+                    data = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                    if event["type"] == "response.output_text.delta":
+                        time.sleep(server.stream_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.handler_class = Handler
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def render(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        user = next(m["content"] for m in body["input"] if m["role"] == "user")
+        return response_body(f"echo: {user}")
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "FakeResponsesServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from src.cache import LRUCache, SQLiteCache, TieredCache, content_key
+
+
+def test_content_key_is_stable_and_order_insensitive():
+    a = content_key({"model": "m", "temperature": 0, "input": ["x"]})
+    b = content_key({"input": ["x"], "temperature": 0, "model": "m"})
+    assert a == b
+    assert a != content_key({"model": "m", "temperature": 0, "input": ["y"]})
+
+
+def test_lru_evicts_least_recently_used():
+    c = LRUCache(max_entries=2)
+    c.set("a", b"1")
+    c.set("b", b"2")
+    c.get("a")
+    c.set("c", b"3")
+    assert c.get("b") is None
+    assert c.get("a") == b"1"
+    assert c.get("c") == b"3"
+
+
+def test_lru_ttl_expires(monkeypatch):
+    c = LRUCache(max_entries=10, ttl_s=60)
+    c.set("a", b"1")
+    real = time.time
+    monkeypatch.setattr(time, "time", lambda: real() + 61)
+    assert c.get("a") is None
+
+
+def test_sqlite_persists_and_evicts_by_access(tmp_path: Path):
+    path = str(tmp_path / "cache.sqlite")
+    c = SQLiteCache(path, max_entries=2)
+    c.set("a", b"1")
+    time.sleep(0.01)
+    c.set("b", b"2")
+    time.sleep(0.01)
+    c.get("a")
+    c.set("c", b"3")
+    assert len(c) == 2
+    assert c.get("b") is None
+    c.close()
+
+    reopened = SQLiteCache(path, max_entries=2)
+    assert reopened.get("a") == b"1"
+    assert reopened.get("c") == b"3"
+
+
+def test_sqlite_ttl_expires(tmp_path: Path, monkeypatch):
+    c = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl_s=60)
+    c.set("a", b"1")
+    real = time.time
+    monkeypatch.setattr(time, "time", lambda: real() + 61)
+    assert c.get("a") is None
+    assert len(c) == 0
+
+
+def test_tiered_promotes_disk_hits_and_counts(tmp_path: Path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    disk.set("k", b"v")
+    c = TieredCache(LRUCache(), disk)
+
+    assert c.get("k") == b"v"  # disk hit
+    assert c.get("k") == b"v"  # memory hit
+    assert c.get("missing") is None
+
+    assert c.stats.as_dict() == {
+        "memory_hits": 1,
+        "disk_hits": 1,
+        "misses": 1,
+        "hits": 2,
+        "hit_rate": 2 / 3,
+    }
@@ -6,7 +6,13 @@ import pytest
 
 from llama_index.core.node_parser import SentenceSplitter
 
-from src.corpus import load_beatles_lyrics_corpus
+from src.corpus import (
+    iter_beatles_lyrics_corpus,
+    iter_corpus_documents,
+    iter_document_batches,
+    load_beatles_lyrics_corpus,
+    resolve_corpus_files,
+)
 
 
 @pytest.fixture
@@ -57,3 +63,92 @@ def test_sentence_splitter_preserves_metadata(sample_corpus_file: Path):
     assert "Carry That Weight" in songs
 
     assert any(n.metadata.get("source_path") == "lyrics/AbbeyRoad/Because.txt" for n in nodes)
+
+
+def test_streaming_loader_matches_list_loader(sample_corpus_file: Path):
+    streamed = list(iter_beatles_lyrics_corpus(str(sample_corpus_file)))
+    loaded = load_beatles_lyrics_corpus(str(sample_corpus_file))
+    assert [(d.text, d.metadata) for d in streamed] == [(d.text, d.metadata) for d in loaded]
+
+
+def test_streaming_loader_handles_partial_delimiters(tmp_path: Path):
+    content = (
+        "lyrics/Help/No_Opening.txt\r\n"
+        "lyrics/Help/Help.txt\r\n"
+        "\r\n"
+        "===\r\n"
+        "Help me if you can\r\n"
+        "  ===  \r\n"
+        "stray text\n"
+        "lyrics/Help/Unterminated.txt\n"
+        "===\n"
+        "Runs to end of file"
+    )
+    p = tmp_path / "mixed.txt"
+    p.write_bytes(content.encode("utf-8"))
+
+    streamed = list(iter_beatles_lyrics_corpus(str(p)))
+    assert [(d.metadata["song"], d.text) for d in streamed] == [
+        ("Help", "Help me if you can"),
+        ("Unterminated", "Runs to end of file"),
+    ]
+    assert [d.text for d in load_beatles_lyrics_corpus(str(p))] == [d.text for d in streamed]
+
+
+def test_iter_document_batches(sample_corpus_file: Path):
+    batches = list(iter_document_batches(iter_beatles_lyrics_corpus(str(sample_corpus_file)), 1))
+    assert [len(b) for b in batches] == [1, 1]
+
+
+def _write(path: Path, blocks) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"lyrics/{a}/{s}.txt\n===\n{t}\n===\n" for a, s, t in blocks), encoding="utf-8")
+
+
+def test_directory_ingestion_tags_corpus_and_dedups(tmp_path: Path):
+    _write(tmp_path / "beatles.txt", [("Help", "Help", "Help me if you can"), ("Abbey", "Because", "Because the world")])
+    _write(tmp_path / "covers" / "tribute.txt", [("Tribute", "Help", "Help  me if you\ncan"), ("Tribute", "Yesterday", "Yesterday")])
+    (tmp_path / "notes.md").write_text("ignored", encoding="utf-8")
+
+    docs = list(iter_corpus_documents(str(tmp_path), workers=2))
+
+    assert [(d.metadata["corpus"], d.metadata["song"]) for d in docs] == [
+        ("beatles", "Help"),
+        ("beatles", "Because"),
+        ("tribute", "Yesterday"),
+    ]
+
+
+def test_files_with_the_same_name_get_distinct_corpus_names(tmp_path: Path):
+    from src.index_build import _assign_doc_ids
+
+    _write(tmp_path / "a" / "lyrics.txt", [("Help", "Help", "Help me if you can")])
+    _write(tmp_path / "b" / "lyrics.txt", [("Help", "Help", "Help, I need somebody")])
+    _write(tmp_path / "c.txt", [("X", "One", "one")])
+
+    docs = list(iter_corpus_documents(str(tmp_path), workers=1))
+    assert [d.metadata["corpus"] for d in docs] == ["a/lyrics", "b/lyrics", "c"]
+
+    _assign_doc_ids(docs, {})
+    assert [d.id_ for d in docs] == ["a/lyrics:lyrics/Help/Help.txt", "b/lyrics:lyrics/Help/Help.txt", "c:lyrics/X/One.txt"]
+
+
+def test_glob_and_single_file_specs(tmp_path: Path, sample_corpus_file: Path):
+    _write(tmp_path / "a.txt", [("X", "One", "one")])
+    _write(tmp_path / "b.txt", [("Y", "Two", "two")])
+
+    assert [p.name for p in resolve_corpus_files(str(tmp_path / "*.txt"))] == ["a.txt", "b.txt", "beatles_lyrics.txt"]
+    docs = list(iter_corpus_documents(str(sample_corpus_file)))
+    assert {d.metadata["corpus"] for d in docs} == {"beatles_lyrics"}
+    assert len(docs) == 2
+
+
+def test_default_corpus_matches_list_loader():
+    # Songs repeated inside one file (e.g. on Revolver and Yellow Submarine) are all kept.
+    path = str(Path(__file__).resolve().parents[1] / "data" / "corpus" / "beatles_lyrics.txt")
+    streamed = list(iter_corpus_documents(path))
+    loaded = load_beatles_lyrics_corpus(path)
+
+    assert len(streamed) == len(loaded) == 158
+    assert [d.metadata["source_path"] for d in streamed] == [d.metadata["source_path"] for d in loaded]
+    assert any(d.metadata["album"] == "YellowSubmarine" and d.metadata["song"] == "Yellow Submarine" for d in streamed)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from conftest import CountingEmbedding
+from src.cache import LRUCache, SQLiteCache, TieredCache
+from src.embedding_cache import CachedEmbedding, decode_vector, encode_vector
+
+
+def _cached(tmp_path: Path, inner=None):
+    inner = inner or CountingEmbedding(embed_dim=4, model_name="fake-embed")
+    cache = TieredCache(LRUCache(16), SQLiteCache(str(tmp_path / "emb.sqlite"), max_entries=100))
+    return inner, CachedEmbedding(inner, cache)
+
+
+def test_vectors_round_trip_as_float32():
+    data = encode_vector([0.5, -1.25, 3.0])
+    assert len(data) == 3 * 4
+    assert decode_vector(data) == [0.5, -1.25, 3.0]
+
+
+def test_repeated_query_is_embedded_once(tmp_path: Path):
+    inner, emb = _cached(tmp_path)
+    a = emb.get_query_embedding("Find lyrics about loneliness")
+    b = emb.get_query_embedding("  Find lyrics   about loneliness ")
+    assert a == b
+    assert inner.texts_embedded == 1
+    assert emb.cache.stats.memory_hits == 1
+
+
+def test_batch_only_embeds_misses(tmp_path: Path):
+    inner, emb = _cached(tmp_path)
+    emb.get_query_embedding("sun")
+    out = emb.get_text_embedding_batch(["sun", "weight", "world"])
+    assert inner.texts_embedded == 3
+    np.testing.assert_allclose(out[1], [6.0] * 4)
+
+
+def test_disk_tier_survives_restart(tmp_path: Path):
+    inner, emb = _cached(tmp_path)
+    emb.get_query_embedding("here comes the sun")
+
+    inner2, emb2 = _cached(tmp_path)
+    emb2.get_query_embedding("here comes the sun")
+    assert inner2.texts_embedded == 0
+    assert emb2.cache.stats.disk_hits == 1
+
+
+def test_key_includes_model_name(tmp_path: Path):
+    _, emb_a = _cached(tmp_path, CountingEmbedding(embed_dim=4, model_name="model-a"))
+    inner_b, emb_b = _cached(tmp_path, CountingEmbedding(embed_dim=4, model_name="model-b"))
+    emb_a.get_query_embedding("help")
+    emb_b.get_query_embedding("help")
+    assert inner_b.texts_embedded == 1
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+
+from src import evidence as ev
+from src.llm_client import estimate_tokens
+from src.nodes import analyst
+from src.tracing import Tracer
+
+TASK_1 = "1. Find lyrics about loneliness and isolation in the songs"
+TASK_2 = "2. Find lyrics about asking for help"
+
+
+def _item(task, song, quote, theme="x"):
+    return {"task": task, "song": song, "quote": quote, "theme": theme}
+
+
+def test_dedupe_merges_near_duplicates_within_a_song_only():
+    items = [
+        _item(TASK_1, "Eleanor Rigby", "All the lonely people", "loneliness"),
+        _item(TASK_2, "Eleanor Rigby", "all the lonely people!", "isolation"),
+        _item(TASK_2, "Eleanor Rigby", "Ah, look at all the lonely people", "loneliness"),
+        _item(TASK_1, "Nowhere Man", "All the lonely people", "loneliness"),
+    ]
+
+    merged = ev.dedupe_evidence(items)
+
+    assert len(merged) == 2
+    rigby, nowhere = merged
+    assert rigby["quote"] == "Ah, look at all the lonely people"  # the longest text wins
+    assert rigby["tasks"] == [TASK_1, TASK_2]
+    assert rigby["theme"] == "loneliness; isolation"
+    assert nowhere["song"] == "Nowhere Man" and nowhere["tasks"] == [TASK_1]
+
+
+def test_encoding_groups_by_song_with_task_and_item_ids():
+    items = ev.dedupe_evidence(
+        [
+            _item(TASK_1, "Eleanor Rigby", "All the lonely people", "loneliness"),
+            _item(TASK_2, "Help!", "Help me if you can", "help"),
+            _item(TASK_2, "Eleanor Rigby", "All the lonely people", "loneliness"),
+        ]
+    )
+
+    assert ev.encode_evidence(items) == (
+        f"Tasks:\nT1 {TASK_1}\nT2 {TASK_2}\n\n"
+        'Eleanor Rigby:\nE1 [T1,T2] "All the lonely people" (loneliness)\n\n'
+        'Help!:\nE2 [T2] "Help me if you can" (help)'
+    )
+    assert ev.encode_evidence([]) == "(no evidence)"
+
+
+def test_trim_keeps_every_task_covered_and_fits_the_budget():
+    items = ev.dedupe_evidence(
+        [_item(TASK_1, f"Song {i}", f"lonely line number {i} goes here") for i in range(12)]
+        + [_item(TASK_2, "Help!", "Help me if you can")]
+    )
+    budget = estimate_tokens(ev.encode_evidence(items)) // 3
+
+    kept = ev.trim_to_budget(items, budget)
+
+    assert estimate_tokens(ev.encode_evidence(kept)) <= budget
+    assert kept[0]["song"] == "Song 0"  # earliest items survive
+    assert any(TASK_2 in item["tasks"] for item in kept)
+
+
+def test_prepare_evidence_reports_savings():
+    items = [
+        _item(TASK_1, "Eleanor Rigby", "All the lonely people"),
+        _item(TASK_1, "Eleanor Rigby", "Wearing the face that she keeps in a jar by the door"),
+        _item(TASK_1, "Eleanor Rigby", "All the lonely people"),
+    ]
+
+    prepared = ev.prepare_evidence(items)
+
+    assert prepared.duplicates == 1 and prepared.trimmed == 0
+    assert prepared.json_tokens == estimate_tokens(json.dumps(items))
+    assert 0 < prepared.tokens < prepared.json_tokens
+    assert "saved" in prepared.log_line("analyst")
+
+    tight = ev.prepare_evidence(items, budget=prepared.tokens + 5, reserved="x" * 40)
+    assert tight.trimmed == 1
+
+
+def test_over_budget_keeps_one_item_per_task_and_the_quoted_ones():
+    items = [_item(f"task {i % 3}", f"Song {i}", f"line number {i} of the song") for i in range(30)]
+
+    prepared = ev.prepare_evidence(items, budget=4000, reserved="x" * 16000, quoted=["Number 28 of the"])
+
+    assert prepared.text != "(no evidence)"
+    assert [item["song"] for item in prepared.items] == ["Song 0", "Song 2", "Song 28"]  # Song 28 kept for task 1
+    assert prepared.over_budget and "over budget" in prepared.log_line("reviewer_validator")
+
+
+def test_analyst_prompt_uses_compact_evidence(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(analyst, "call_llm", lambda system_prompt, user_prompt: prompts.append(user_prompt) or "analysis")
+    evidence = [_item(TASK_1, "Eleanor Rigby", "All the lonely people")] * 3
+
+    with Tracer().activate() as tracer:
+        state = analyst.analyst_node({"question": "q", "evidence": evidence, "logs": []})
+
+    assert 'Evidence:\nTasks:\nT1 ' in prompts[0]
+    assert prompts[0].count("All the lonely people") == 1
+    assert state["logs"][0].startswith("[analyst] evidence: 3 items -> 1 (2 near-duplicates merged")
+    assert tracer.export()[0]["attributes"]["evidence.duplicates"] == 2
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import pytest
+
+from src import graph
+from src.nodes import analyst, planner, researcher, reviewer_editor, reviewer_validator, writer
+from src.tools import RetrievedChunk
+
+
+@pytest.fixture
+def fake_agents(monkeypatch):
+    calls = {"active": 0, "peak": 0, "plan": "1. Find lyrics about the sun\n2. Find lyrics about help\n3. Find lyrics about rain"}
+    lock = threading.Lock()
+
+    def fake_llm(system_prompt, user_prompt):
+        if system_prompt is planner.SYSTEM:
+            return calls["plan"]
+        if system_prompt is researcher.SYSTEM:
+            task = user_prompt.split("\n")[1]
+            with lock:
+                calls["active"] += 1
+                calls["peak"] = max(calls["peak"], calls["active"])
+            time.sleep(0.05)
+            with lock:
+                calls["active"] -= 1
+            if "rain" in task:
+                raise RuntimeError("rate limited")
+            return json.dumps([{"song": task, "quote": f"quote for {task}", "theme": "x"}])
+        if system_prompt is analyst.SYSTEM:
+            return "analysis"
+        if system_prompt is writer.SYSTEM:
+            return "draft"
+        if system_prompt is reviewer_validator.SYSTEM:
+            return "validated"
+        return "final report"
+
+    for module in (planner, researcher, analyst, reviewer_validator):
+        monkeypatch.setattr(module, "call_llm", fake_llm)
+    for module in (writer, reviewer_editor):
+        monkeypatch.setattr(module, "call_llm_streaming", lambda system_prompt, user_prompt, stage: fake_llm(system_prompt, user_prompt))
+    monkeypatch.setattr(
+        researcher,
+        "rag_retrieve_many",
+        lambda queries, k: [[RetrievedChunk(page_content=f"quote for {q}", metadata={"song": q})] for q in queries],
+    )
+    return calls
+
+
+def test_pipeline_fans_out_research_and_reduces_in_order(fake_agents):
+    state = graph.build_graph().invoke({"question": "q", "logs": []}, config={"max_concurrency": 4})
+
+    assert state["final_report"] == "final report"
+    assert state["validated_report"] == "validated"
+    assert [e["task"] for e in state["evidence"]] == [
+        "1. Find lyrics about the sun",
+        "2. Find lyrics about help",
+    ]
+    assert fake_agents["peak"] == 3
+
+    logs = state["logs"]
+    assert sum(log.startswith("[planner]") for log in logs) == 1
+    assert any("task failed: 3. Find lyrics about rain" in log for log in logs)
+    assert "[researcher] extracted 2 evidence items" in logs
+    assert logs[-1] == "[reviewer_editor] edit pass completed"
+
+
+def test_pipeline_respects_max_concurrency(fake_agents):
+    graph.build_graph().invoke({"question": "q", "logs": []}, config={"max_concurrency": 1})
+    assert fake_agents["peak"] == 1
+
+
+def test_pipeline_with_no_sub_tasks_skips_fan_out(fake_agents):
+    fake_agents["plan"] = ""
+    state = graph.build_graph().invoke({"question": "q", "logs": []})
+
+    assert state["evidence"] == []
+    assert state["final_report"] == "final report"
+
+
+def test_run_pipeline_traces_every_node(fake_agents):
+    state = graph.run_pipeline("q", max_concurrency=4)
+
+    trace = state["trace"]
+    by_id = {s["span_id"]: s for s in trace}
+    root = trace[0]
+    assert root["name"] == "pipeline" and root["parent_id"] is None
+
+    nodes = [s["name"] for s in trace if s["kind"] == "node"]
+    assert nodes.count("research_task") == 3
+    assert {"planner", "research_retrieve", "research_merge", "analyst", "writer", "reviewer_validator", "reviewer_editor"} <= set(nodes)
+    assert all(by_id[s["parent_id"]] is root for s in trace if s["kind"] == "node")
+    assert len({s["trace_id"] for s in trace}) == 1
+
+
+def test_nodes_chained_by_hand_append_their_own_trace(fake_agents):
+    state = planner.planner_node({"question": "q", "logs": []})
+    state = analyst.analyst_node(state)
+
+    assert [s["name"] for s in state["trace"]] == ["planner", "analyst"]
+    assert all(s["duration_s"] >= 0 for s in state["trace"])
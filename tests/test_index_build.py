@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from llama_index.core import Settings, load_index_from_storage
+
+import src.index_build as index_build
+from conftest import CountingEmbedding
+from src.metadata_index import MetadataIndex
+from src.sparse_index import docstore_fingerprint, load_bm25, read_index_version
+from src.vector_stores import load_storage_context
+
+
+def _block(album: str, song: str, lyrics: str) -> str:
+    return f"lyrics/{album}/{song}.txt\n===\n{lyrics}\n===\n"
+
+
+@pytest.fixture(params=["simple", "numpy", "hnsw"])
+def build_env(tmp_path: Path, monkeypatch, request):
+    corpus = tmp_path / "corpus.txt"
+    persist = tmp_path / "index"
+    embed = CountingEmbedding(embed_dim=8)
+
+    monkeypatch.setattr(index_build, "CORPUS_PATH", str(corpus))
+    monkeypatch.setattr(index_build, "INDEX_PERSIST_DIR", str(persist))
+    monkeypatch.setattr(index_build, "VECTOR_STORE_BACKEND", request.param)
+    monkeypatch.setattr(index_build, "OpenAIEmbedding", lambda **kwargs: embed)
+    monkeypatch.setattr(Settings, "_embed_model", None)
+    return corpus, persist, embed
+
+
+def test_rebuild_only_embeds_changed_songs(build_env):
+    corpus, persist, embed = build_env
+    corpus.write_text(
+        _block("AbbeyRoad", "Because", "Because the world is round")
+        + _block("Help", "Help", "Help me if you can")
+        + _block("AbbeyRoad", "Carry_That_Weight", "Carry that weight a long time"),
+        encoding="utf-8",
+    )
+    first = index_build.build_and_persist_index()
+    assert first.full_rebuild
+    assert first.nodes_embedded == 3
+
+    corpus.write_text(
+        _block("AbbeyRoad", "Because", "Because the world is round")
+        + _block("Help", "Help", "Help me if you can, I'm feeling down")
+        + _block("AbbeyRoad", "Here_Comes_The_Sun", "Here comes the sun"),
+        encoding="utf-8",
+    )
+    embed.texts_embedded = 0
+    first_version = read_index_version(str(persist))
+    second = index_build.build_and_persist_index()
+
+    assert not second.full_rebuild
+    assert second.added == ["corpus:lyrics/AbbeyRoad/Here_Comes_The_Sun.txt"]
+    assert second.changed == ["corpus:lyrics/Help/Help.txt"]
+    assert second.removed == ["corpus:lyrics/AbbeyRoad/Carry_That_Weight.txt"]
+    assert second.unchanged == 1
+    assert embed.texts_embedded == 2
+
+    storage = load_storage_context(index_build.VECTOR_STORE_BACKEND, str(persist))
+    texts = sorted(n.get_content() for n in storage.docstore.docs.values())
+    assert texts == ["Because the world is round", "Help me if you can, I'm feeling down", "Here comes the sun"]
+    index = load_index_from_storage(storage)
+    hits = index.as_retriever(similarity_top_k=10).retrieve("anything")
+    assert sorted(h.node.get_content() for h in hits) == texts
+
+    # The persisted BM25 index matches the updated docstore.
+    bm25 = load_bm25(str(persist), storage.docstore, similarity_top_k=1)
+    assert bm25.retrieve("sun")[0].node.get_content() == "Here comes the sun"
+
+    # The index version moved on with the contents.
+    assert read_index_version(str(persist)) == (
+        f"{index_build.VECTOR_STORE_BACKEND}:{docstore_fingerprint(storage.docstore)}"
+    )
+    assert read_index_version(str(persist)) != first_version
+
+    # ...and so does the metadata filter index.
+    meta = MetadataIndex.from_persist_dir(str(persist))
+    assert meta.fingerprint == docstore_fingerprint(storage.docstore)
+    (node_id,) = meta.match({"album": "Abbey Road", "song": "here comes the sun"})
+    assert storage.docstore.get_node(node_id).get_content() == "Here comes the sun"
+
+
+def test_full_flag_re_embeds_everything(build_env):
+    corpus, _, embed = build_env
+    corpus.write_text(_block("Help", "Help", "Help me if you can"), encoding="utf-8")
+    index_build.build_and_persist_index()
+
+    embed.texts_embedded = 0
+    summary = index_build.build_and_persist_index(full=True)
+    assert summary.full_rebuild
+    assert embed.texts_embedded == 1
+
+
+@pytest.mark.parametrize(
+    "setting, value",
+    [("EMBED_MODEL", "text-embedding-3-large"), ("CHUNK_SIZE", 400), ("VECTOR_STORE_BACKEND", None)],
+)
+def test_changed_embedding_settings_force_a_full_rebuild(build_env, monkeypatch, setting, value):
+    corpus, persist, _ = build_env
+    if setting == "VECTOR_STORE_BACKEND":  # switch to another backend than the fixture's
+        value = {"simple": "numpy", "numpy": "hnsw", "hnsw": "simple"}[index_build.VECTOR_STORE_BACKEND]
+    corpus.write_text(_block("Help", "Help", "Help me if you can") + _block("Abbey", "Because", "Because"), encoding="utf-8")
+    index_build.build_and_persist_index()
+
+    # A new model with a different dimension: no old vector may be kept.
+    embed = CountingEmbedding(embed_dim=16)
+    monkeypatch.setattr(index_build, "OpenAIEmbedding", lambda **kwargs: embed)
+    monkeypatch.setattr(index_build, setting, value)
+    summary = index_build.build_and_persist_index()
+
+    assert summary.full_rebuild
+    assert embed.texts_embedded == 2
+    index = load_index_from_storage(load_storage_context(index_build.VECTOR_STORE_BACKEND, str(persist)))
+    hits = index.as_retriever(similarity_top_k=10, embed_model=embed).retrieve("help")
+    assert len(hits) == 2
+
+    # Same settings again: incremental, nothing re-embedded.
+    embed.texts_embedded = 0
+    assert not index_build.build_and_persist_index().full_rebuild
+    assert embed.texts_embedded == 0
+
+
+def test_embedding_resumes_from_checkpoint_after_crash(tmp_path: Path):
+    from llama_index.core.schema import TextNode
+
+    class _FlakyEmbedding(CountingEmbedding):
+        fail_after: int = 2
+
+        def _get_text_embedding(self, text):
+            if self.texts_embedded >= self.fail_after:
+                raise RuntimeError("network dropped")
+            return super()._get_text_embedding(text)
+
+    nodes = [TextNode(text=f"line {i}") for i in range(5)]
+    path = str(tmp_path / index_build.CHECKPOINT_FILENAME)
+
+    flaky = _FlakyEmbedding(embed_dim=4)
+    with pytest.raises(RuntimeError):
+        index_build.embed_nodes_parallel(
+            nodes, flaky, index_build.EmbeddingCheckpoint(path, "m"), batch_size=1, concurrency=1
+        )
+
+    fresh_nodes = [TextNode(text=f"line {i}") for i in range(5)]
+    embed = CountingEmbedding(embed_dim=4)
+    report = index_build.embed_nodes_parallel(
+        fresh_nodes, embed, index_build.EmbeddingCheckpoint(path, "m"), batch_size=2, concurrency=2
+    )
+
+    assert report.resumed == 2
+    assert report.embedded == 3
+    assert embed.texts_embedded == 3
+    assert report.tokens > 0
+    assert all(n.embedding is not None for n in fresh_nodes)
+
+
+def test_checkpoint_is_removed_after_successful_build(build_env):
+    corpus, persist, _ = build_env
+    corpus.write_text(_block("Help", "Help", "Help me if you can"), encoding="utf-8")
+    summary = index_build.build_and_persist_index()
+
+    assert summary.embed_report.embedded == 1
+    assert not (persist / index_build.CHECKPOINT_FILENAME).exists()
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import openai
+import pytest
+
+import src.tools as tools
+from src.cache import LRUCache, SQLiteCache, TieredCache
+from src.llm_client import LLMClient, TokenBucket, backoff_delay, retry_after_seconds
+from src.tracing import Tracer
+
+from fake_responses_server import FakeResponsesServer
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def make(delay: float = 0.0, stream_delay: float = 0.0, **client_kwargs):
+        server = FakeResponsesServer(delay=delay, stream_delay=stream_delay).__enter__()
+        client = LLMClient(api_key="test-key", base_url=server.base_url, backoff_base=0.01, **client_kwargs)
+        monkeypatch.setattr(tools, "_llm", client)
+        made.append((server, client))
+        return server
+
+    made = []
+    yield make
+    for server, client in made:
+        client.close()
+        server.__exit__(None, None, None)
+
+
+def test_call_llm_returns_output_text(fake_llm):
+    server = fake_llm()
+    assert tools.call_llm("sys", "hello") == "echo: hello"
+
+    req = server.requests[0]
+    assert req["temperature"] == 0
+    assert req["max_output_tokens"] == tools.MAX_OUTPUT_TOKENS
+    assert "estimated_tokens" not in req
+
+
+def test_retries_429_and_respects_retry_after(fake_llm):
+    server = fake_llm()
+    server.failures = [(429, {"Retry-After": "0.3"}), (503, {})]
+
+    t0 = time.monotonic()
+    assert tools.call_llm("sys", "again") == "echo: again"
+    assert time.monotonic() - t0 >= 0.3
+    assert len(server.requests) == 3
+
+
+def test_gives_up_after_max_retries(fake_llm):
+    server = fake_llm(max_retries=1)
+    server.failures = [(429, {}), (429, {}), (429, {})]
+
+    with pytest.raises(openai.RateLimitError):
+        tools.call_llm("sys", "x")
+    assert len(server.requests) == 2
+
+
+def test_non_retryable_errors_fail_fast(fake_llm):
+    server = fake_llm()
+    server.failures = [(400, {})]
+
+    with pytest.raises(openai.BadRequestError):
+        tools.call_llm("sys", "x")
+    assert len(server.requests) == 1
+
+
+def test_acall_llm_shares_concurrency_limit(fake_llm):
+    server = fake_llm(delay=0.05, max_concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(tools.acall_llm("sys", f"q{i}") for i in range(6)))
+
+    assert asyncio.run(run()) == [f"echo: q{i}" for i in range(6)]
+    assert server.peak_in_flight == 2
+
+
+def test_call_llm_stream_yields_deltas_incrementally(fake_llm):
+    server = fake_llm(stream_delay=0.05)
+    # The SDK builds its event models on first use; keep that out of the timing.
+    list(tools.call_llm_stream("sys", "warm up", use_cache=False))
+
+    t0 = time.monotonic()
+    arrivals = []
+    for delta in tools.call_llm_stream("sys", "all you need is love", use_cache=False):
+        arrivals.append((time.monotonic() - t0, delta))
+
+    assert "".join(d for _, d in arrivals) == "echo: all you need is love"
+    assert len(arrivals) == 6
+    # The first word arrives well before the last one is generated.
+    assert arrivals[-1][0] - arrivals[0][0] >= 0.2
+    assert server.requests[-1]["stream"] is True
+
+
+def test_call_llm_stream_caches_only_completed_text(fake_llm, monkeypatch):
+    cache = TieredCache(LRUCache(8))
+    monkeypatch.setattr(tools, "_llm_cache", cache)
+    monkeypatch.setattr(tools, "LLM_CACHE_ENABLED", True)
+    server = fake_llm()
+
+    stream = tools.call_llm_stream("sys", "let it be")
+    assert next(stream) == "echo: "
+    assert len(cache.memory) == 0
+    assert list(stream) == ["let ", "it ", "be"]
+    assert len(cache.memory) == 1
+
+    # A cache hit is replayed as one chunk without calling the API.
+    assert list(tools.call_llm_stream("sys", "let it be")) == ["echo: let it be"]
+    assert tools.call_llm("sys", "let it be") == "echo: let it be"
+    assert len(server.requests) == 1
+
+
+def test_call_llm_stream_retries_before_first_delta(fake_llm):
+    server = fake_llm()
+    server.failures = [(429, {}), (503, {})]
+
+    assert "".join(tools.call_llm_stream("sys", "help", use_cache=False)) == "echo: help"
+    assert len(server.requests) == 3
+
+
+def test_acall_llm_stream(fake_llm):
+    fake_llm(stream_delay=0.01)
+
+    async def run():
+        return [delta async for delta in tools.acall_llm_stream("sys", "here comes the sun", use_cache=False)]
+
+    assert asyncio.run(run()) == ["echo: ", "here ", "comes ", "the ", "sun"]
+
+
+def test_call_llm_streaming_forwards_to_sink(fake_llm):
+    server = fake_llm()
+    received = []
+
+    # Without a sink it is a plain (non-streaming) call.
+    assert tools.call_llm_streaming("sys", "yesterday", stage="writer", use_cache=False) == "echo: yesterday"
+    assert not server.requests[-1].get("stream")
+
+    with tools.stream_tokens_to(lambda stage, delta: received.append((stage, delta))):
+        text = tools.call_llm_streaming("sys", "yesterday", stage="writer", use_cache=False)
+
+    assert text == "echo: yesterday"
+    assert received == [("writer", "echo: "), ("writer", "yesterday")]
+    assert server.requests[-1]["stream"] is True
+
+
+def test_writer_node_stores_full_draft_while_streaming(fake_llm, monkeypatch):
+    from src.nodes.writer import writer_node
+
+    fake_llm()
+    received = []
+    with tools.stream_tokens_to(lambda stage, delta: received.append(delta)):
+        state = writer_node({"question": "q", "analysis": "a", "evidence": [], "logs": []})
+
+    assert state["draft_report"].startswith("echo: Question:")
+    assert "".join(received) == state["draft_report"]
+    assert len(received) > 1
+
+
+def test_call_llm_records_span_with_tokens_and_cache_hits(fake_llm, monkeypatch):
+    monkeypatch.setattr(tools, "_llm_cache", TieredCache(LRUCache(8)))
+    monkeypatch.setattr(tools, "LLM_CACHE_ENABLED", True)
+    fake_llm()
+
+    with Tracer().activate() as tracer:
+        tools.call_llm("sys", "penny lane")
+        tools.call_llm("sys", "penny lane")
+        "".join(tools.call_llm_stream("sys", "strawberry fields", use_cache=False))
+
+    miss, hit, streamed = tracer.export()
+    assert [s["kind"] for s in (miss, hit, streamed)] == ["llm"] * 3
+    assert miss["attributes"]["cache.hit"] is False
+    assert miss["attributes"]["gen_ai.usage.input_tokens"] == 10
+    assert miss["attributes"]["gen_ai.usage.output_tokens"] == 5
+    assert miss["attributes"]["llm.cost_usd"] > 0
+    assert hit["attributes"]["cache.hit"] is True
+    assert "gen_ai.usage.input_tokens" not in hit["attributes"]
+    # Streamed responses report usage in their completion event.
+    assert streamed["attributes"]["llm.streamed"] is True
+    assert streamed["attributes"]["gen_ai.usage.output_tokens"] == 5
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds({"retry-after": "2"}) == 2.0
+    assert retry_after_seconds({"retry-after-ms": "250"}) == 0.25
+    assert retry_after_seconds({"retry-after": "Thu, 01 Jan 1970 00:00:00 GMT"}) == 0.0
+    assert retry_after_seconds({}) is None
+
+
+def test_backoff_is_bounded_and_honours_retry_after():
+    for attempt in range(10):
+        assert 0.0 <= backoff_delay(attempt, base=0.5, cap=4.0) <= 4.0
+    assert backoff_delay(0, base=0.5, cap=4.0, retry_after=3.0) >= 3.0
+
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(tokens_per_minute=600)  # 10 tokens/s
+        await bucket.acquire(600)
+        t0 = time.monotonic()
+        await bucket.acquire(3)
+        return time.monotonic() - t0
+
+    assert asyncio.run(run()) >= 0.25
+
+
+def test_call_llm_cache_hits_and_bypass(fake_llm, monkeypatch, tmp_path):
+    server = fake_llm()
+    cache = TieredCache(LRUCache(), SQLiteCache(str(tmp_path / "llm.sqlite")))
+    monkeypatch.setattr(tools, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(tools, "_llm_cache", cache)
+
+    assert tools.call_llm("sys", "same") == "echo: same"
+    assert asyncio.run(tools.acall_llm("sys", "same")) == "echo: same"
+    assert len(server.requests) == 1
+
+    tools.call_llm("other system", "same")
+    assert len(server.requests) == 2
+
+    tools.call_llm("sys", "same", use_cache=False)
+    assert len(server.requests) == 3
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from llama_index.core import Document
+from llama_index.core.storage.docstore import SimpleDocumentStore
+
+from src.metadata_index import MetadataIndex, load_metadata_index
+
+
+def _docstore(rows):
+    ds = SimpleDocumentStore()
+    ds.add_documents([Document(text=text, id_=f"n{i}", metadata=meta) for i, (text, meta) in enumerate(rows)])
+    return ds
+
+
+ROWS = [
+    ("Because the world is round", {"song": "Because", "album": "AbbeyRoad", "source_path": "lyrics/AbbeyRoad/Because.txt"}),
+    ("Here comes the sun", {"song": "Here Comes The Sun", "album": "AbbeyRoad", "source_path": "lyrics/AbbeyRoad/Here_Comes_The_Sun.txt"}),
+    ("Help me if you can", {"song": "Help", "album": "Help", "source_path": "lyrics/Help/Help.txt", "corpus": "beatles"}),
+]
+
+
+def test_match_ands_fields_and_ors_values():
+    index = MetadataIndex.build(_docstore(ROWS))
+
+    assert index.match(None) is None
+    assert index.match({"album": "abbey road"}) == {"n0", "n1"}
+    assert index.match({"album": "AbbeyRoad", "song": ["because", "Help"]}) == {"n0"}
+    assert index.match({"source_path": "lyrics/Help/Help.txt"}) == {"n2"}
+    assert index.match({"corpus": "beatles", "album": "AbbeyRoad"}) == set()
+
+
+def test_persisted_index_is_reused_until_docstore_changes(tmp_path: Path, capsys):
+    ds = _docstore(ROWS)
+    MetadataIndex.build(ds).persist(str(tmp_path))
+
+    assert load_metadata_index(str(tmp_path), ds).match({"album": "Help"}) == {"n2"}
+    assert "stale" not in capsys.readouterr().out
+
+    changed = _docstore(ROWS[:2])
+    assert load_metadata_index(str(tmp_path), changed).match({"album": "Help"}) == set()
+    assert "stale" in capsys.readouterr().out
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src import quote_index
+from src.nodes import researcher, reviewer_validator
+from src.quote_index import QuoteIndex, quoted_strings
+from src.tools import RetrievedChunk
+
+RIGBY = """[SONG=Eleanor Rigby | ALBUM=Revolver | SRC=x]
+Ah, look at all the lonely people
+Waits at the window, wearing the face
+That she keeps in a jar by the door"""
+
+
+@pytest.mark.parametrize("postings_min_texts", [1, 100], ids=["postings", "scan"])
+def test_index_matches_normalized_quotes_on_word_boundaries(monkeypatch, postings_min_texts):
+    monkeypatch.setattr(quote_index, "_POSTINGS_MIN_TEXTS", postings_min_texts)
+    index = QuoteIndex([RIGBY, "Help! I need somebody"])
+
+    assert index.contains("All the lonely people!")
+    assert index.contains("wearing the face that she keeps")  # across a line break
+    assert index.contains("help")
+    assert index.contains("I NEED somebody")
+    assert (index.postings is None) == (postings_min_texts == 100)
+
+    assert not index.contains("all the lonely hearts")
+    assert not index.contains("lone")  # part of a word
+    assert not index.contains("the lonely people help")  # spans two texts
+    assert not index.contains("...")
+    assert index.unverified(["all the lonely people", "yellow submarine"]) == ["yellow submarine"]
+
+
+def test_quoted_strings_finds_straight_and_curly_quotes():
+    draft = 'Loneliness: "all the lonely people" (Eleanor Rigby) and “Help me if you can”. An empty "" pair.'
+    assert quoted_strings(draft) == ["all the lonely people", "Help me if you can"]
+    assert quoted_strings('"Help!" and "Eleanor Rigby": "all the lonely people"', min_words=3) == ["all the lonely people"]
+
+
+def test_researcher_drops_quotes_missing_from_context(monkeypatch):
+    chunk = RetrievedChunk(page_content=RIGBY.split("\n", 1)[1], metadata={"song": "Eleanor Rigby"})
+    monkeypatch.setattr(researcher, "rag_retrieve_many", lambda queries, k: [[chunk] for _ in queries])
+    monkeypatch.setattr(
+        researcher,
+        "call_llm",
+        lambda system_prompt, user_prompt: json.dumps([{"quote": "All the lonely people"}, {"quote": "all you need is love"}]),
+    )
+
+    state = researcher.researcher_node({"question": "q", "sub_tasks": ["loneliness"], "logs": []})
+
+    assert [e["quote"] for e in state["evidence"]] == ["All the lonely people"]
+    assert "[researcher] dropped 1 quotes not found in context for task: loneliness" in state["logs"]
+
+
+def test_researcher_drops_quotes_only_found_in_chunk_headers(monkeypatch):
+    chunk = RetrievedChunk(
+        page_content="All the lonely people",
+        metadata={"song": "Eleanor Rigby", "album": "Revolver", "source_path": "lyrics/Revolver/Eleanor_Rigby.txt"},
+    )
+    monkeypatch.setattr(researcher, "rag_retrieve_many", lambda queries, k: [[chunk, chunk] for _ in queries])
+    quotes = ["Eleanor Rigby", "Revolver", "lyrics Revolver", "lonely people SONG Eleanor", "all the lonely people"]
+    monkeypatch.setattr(
+        researcher, "call_llm", lambda system_prompt, user_prompt: json.dumps([{"quote": q} for q in quotes])
+    )
+
+    state = researcher.researcher_node({"question": "q", "sub_tasks": ["loneliness"], "logs": []})
+
+    assert [e["quote"] for e in state["evidence"]] == ["all the lonely people"]
+
+
+def _validate(monkeypatch, draft):
+    calls = []
+    monkeypatch.setattr(reviewer_validator, "call_llm", lambda system_prompt, user_prompt: calls.append(user_prompt) or "validated")
+    evidence = [{"task": "t", "song": "Eleanor Rigby", "quote": "Ah, look at all the lonely people", "theme": "x"}]
+    state = reviewer_validator.reviewer_validator_node({"draft_report": draft, "evidence": evidence, "logs": []})
+    return state, calls
+
+
+def test_validator_skips_llm_when_every_quote_is_in_evidence(monkeypatch):
+    state, calls = _validate(monkeypatch, '# Key themes\n- "all the lonely people" (Eleanor Rigby)')
+
+    assert calls == []
+    assert state["validated_report"] == state["draft_report"]
+    assert "LLM validation skipped" in state["logs"][-1]
+
+
+def test_validator_calls_llm_for_unverified_or_missing_quotes(monkeypatch):
+    state, calls = _validate(monkeypatch, '- "all the lonely people"\n- "she loves you, yeah"')
+    assert len(calls) == 1 and state["validated_report"] == "validated"
+    assert "[reviewer_validator] 1 of 2 quotes not found in evidence" in state["logs"]
+
+    # A draft without any quotes is not "verified": the LLM still checks it.
+    state, calls = _validate(monkeypatch, "# Executive summary\nLoneliness recurs.")
+    assert len(calls) == 1
+
+
+def test_validator_ignores_quoted_titles(monkeypatch):
+    state, calls = _validate(monkeypatch, '- "Eleanor Rigby" (Revolver): "all the lonely people"\n- See also "Help!".')
+
+    assert calls == []
+    assert "all 1 quotes verified against evidence" in state["logs"][-1]
+
+
+def test_validator_catches_one_fabricated_lyric_among_titles(monkeypatch):
+    draft = '- "Eleanor Rigby": "all the lonely people"\n- "Nowhere Man": "he is a real nowhere man"'
+    state, calls = _validate(monkeypatch, draft)
+
+    assert len(calls) == 1
+    assert "[reviewer_validator] 1 of 2 quotes not found in evidence" in state["logs"]
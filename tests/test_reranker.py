@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from conftest import OverlapCrossEncoder
+from src.tools import CrossEncoderReranker
+
+
+def _nodes(*texts):
+    return [NodeWithScore(node=TextNode(text=t, id_=t), score=0.0) for t in texts]
+
+
+def _reranker():
+    r = CrossEncoderReranker(model_name="fake", batch_size=4)
+    r._model = OverlapCrossEncoder()
+    return r
+
+
+def test_rerank_orders_by_cross_encoder_score_and_truncates():
+    r = _reranker()
+    out = r.rerank("world round", _nodes("help me", "because the world is round", "the world"), top_n=2)
+    assert [nw.node.node_id for nw in out] == ["because the world is round", "the world"]
+
+
+def test_rerank_many_uses_one_scoring_pass_and_keeps_query_order():
+    r = _reranker()
+    out = r.rerank_many(
+        ["sun", "weight"],
+        [_nodes("carry that weight", "here comes the sun"), _nodes("here comes the sun", "carry that weight")],
+        top_n=1,
+    )
+    assert r._model.calls == [4]
+    assert out[0][0].node.node_id == "here comes the sun"
+    assert out[1][0].node.node_id == "carry that weight"
+
+
+def test_score_empty_does_not_load_model():
+    r = CrossEncoderReranker(model_name="does-not-exist")
+    assert r.score([]) == []
+    assert r._model is None
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+from src.nodes import researcher
+from src.tools import RetrievedChunk
+
+
+def _fake_retrieve_many(queries, k):
+    return [[RetrievedChunk(page_content=f"quote {q}\nall the lonely people", metadata={"song": q})] for q in queries]
+
+
+def _run(monkeypatch, fake_llm, sub_tasks):
+    monkeypatch.setattr(researcher, "rag_retrieve_many", _fake_retrieve_many)
+    monkeypatch.setattr(researcher, "call_llm", fake_llm)
+    return researcher.researcher_node({"question": "q", "sub_tasks": sub_tasks, "logs": []})
+
+
+def test_evidence_merged_in_sub_task_order(monkeypatch):
+    def fake_llm(system_prompt, user_prompt):
+        task = user_prompt.split("\n")[1]
+        # Earlier tasks finish last.
+        time.sleep(0.05 if task == "t1" else 0.0)
+        return json.dumps([{"song": task, "quote": f"quote {task}", "theme": "x"}])
+
+    out = _run(monkeypatch, fake_llm, ["t1", "t2", "t3"])
+    assert [e["task"] for e in out["evidence"]] == ["t1", "t2", "t3"]
+
+
+def test_sub_tasks_run_concurrently_within_limit(monkeypatch):
+    monkeypatch.setattr(researcher, "RESEARCHER_MAX_WORKERS", 2)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fake_llm(system_prompt, user_prompt):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return "[]"
+
+    _run(monkeypatch, fake_llm, ["a", "b", "c", "d", "e"])
+    assert peak == 2
+
+
+def test_failures_are_isolated_per_task(monkeypatch):
+    def fake_llm(system_prompt, user_prompt):
+        task = user_prompt.split("\n")[1]
+        if task == "boom":
+            raise RuntimeError("api down")
+        if task == "bad-json":
+            return "not json"
+        return json.dumps([{"quote": "all the lonely people"}])
+
+    out = _run(monkeypatch, fake_llm, ["boom", "bad-json", "ok"])
+
+    assert [e["task"] for e in out["evidence"]] == ["ok"]
+    logs = "\n".join(out["logs"])
+    assert "task failed: boom" in logs
+    assert "JSON parse failed for task: bad-json" in logs
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from llama_index.core import Document, Settings, VectorStoreIndex
+from llama_index.core.schema import NodeWithScore
+
+import src.tools as tools
+from conftest import CountingEmbedding, OverlapCrossEncoder
+from src.cache import LRUCache, TieredCache
+from src.metadata_index import MetadataIndex
+from src.sparse_index import build_bm25
+
+SONGS = {
+    "Because": "Because the world is round it turns me on",
+    "Carry That Weight": "Boy you're gonna carry that weight a long time",
+    "Here Comes The Sun": "Here comes the sun and I say it's all right",
+    "Help": "Help me if you can I'm feeling down",
+}
+ALBUMS = {"Because": "AbbeyRoad", "Carry That Weight": "AbbeyRoad", "Here Comes The Sun": "AbbeyRoad", "Help": "Help"}
+
+
+@pytest.fixture
+def offline_index(monkeypatch):
+    embed = CountingEmbedding(embed_dim=8)
+    monkeypatch.setattr(Settings, "_embed_model", embed)
+
+    docs = [Document(text=t, metadata={"song": s, "album": ALBUMS[s]}) for s, t in SONGS.items()]
+    index = VectorStoreIndex.from_documents(docs, embed_model=embed)
+
+    reranker = tools.CrossEncoderReranker(model_name="fake")
+    reranker._model = OverlapCrossEncoder()
+
+    monkeypatch.setattr(tools, "_index", index)
+    monkeypatch.setattr(tools, "_bm25", build_bm25(index.docstore))
+    monkeypatch.setattr(tools, "_reranker", reranker)
+    monkeypatch.setattr(tools, "_metadata_index", MetadataIndex.build(index.docstore))
+    embed.batch_calls = 0
+    return embed, reranker
+
+
+def test_rag_retrieve_many_returns_results_in_query_order(offline_index):
+    queries = ["here comes the sun", "carry that weight", "help me"]
+    results = tools.rag_retrieve_many(queries, k=1)
+
+    assert [r[0].metadata["song"] for r in results] == ["Here Comes The Sun", "Carry That Weight", "Help"]
+
+
+def test_rag_retrieve_many_shares_embedding_and_rerank_passes(offline_index):
+    embed, reranker = offline_index
+    tools.rag_retrieve_many(["sun", "weight", "world", "help"], k=2)
+
+    assert embed.batch_calls == 1
+    assert len(reranker._model.calls) == 1
+
+
+def test_rag_retrieve_many_empty():
+    assert tools.rag_retrieve_many([], k=3) == []
+
+
+def test_rag_search_matches_single_query_batch(offline_index):
+    single = tools.rag_search("because the world is round", k=2)
+    batched = tools.format_chunks(tools.rag_retrieve_many(["because the world is round"], k=2)[0])
+    assert single == batched
+    assert single.startswith("[SONG=Because |")
+
+
+def test_filters_restrict_dense_and_sparse_candidates(offline_index):
+    # "help" is the best match overall, but it is not on Abbey Road.
+    results = tools.rag_retrieve("help me", k=4, filters={"album": "Abbey Road"})
+    assert results
+    assert {c.metadata["album"] for c in results} == {"AbbeyRoad"}
+
+    (only,) = tools.rag_retrieve("anything", k=4, filters={"song": ["help", "Yesterday"]})
+    assert only.metadata["song"] == "Help"
+
+
+def test_filters_with_no_match_skip_retrieval(offline_index):
+    embed, reranker = offline_index
+    assert tools.rag_retrieve_many(["sun", "help"], k=2, filters={"album": "Revolver"}) == [[], []]
+    assert embed.batch_calls == 0
+
+
+def test_unknown_filter_field_is_rejected(offline_index):
+    with pytest.raises(ValueError, match="year"):
+        tools.rag_retrieve("sun", filters={"year": "1969"})
+
+
+def test_adaptive_mode_skips_rerank_for_decisive_sparse_hits(offline_index):
+    _, reranker = offline_index
+    stats = tools.RetrievalStats()
+
+    # "weight" only occurs in one song: decisive BM25 margin.
+    nodes = tools._retrieve_nodes_many(["carry that weight", "it"], k=2, adaptive=True, stats=stats)
+
+    assert nodes[0][0].node.metadata["song"] == "Carry That Weight"
+    assert stats.reranked == [False, True]
+    assert stats.candidates[0] == tools.RETRIEVAL_MIN_CANDIDATES
+    assert len(reranker._model.calls) == 1
+    assert stats.total_s >= stats.rerank_s >= 0
+    assert set(stats.as_dict()) >= {"embed_s", "sparse_s", "dense_s", "fuse_s", "rerank_s", "total_s"}
+
+
+def test_default_mode_reranks_everything_at_full_depth(offline_index):
+    stats = tools.RetrievalStats()
+    tools.rag_retrieve_many(["carry that weight", "help me"], k=2, stats=stats)
+
+    assert stats.reranked == [True, True]
+    assert stats.candidates == [30, 30]
+
+
+def test_single_retriever_and_fusion_modes_skip_later_stages(offline_index, monkeypatch):
+    embed, reranker = offline_index
+
+    sparse = tools._retrieve_nodes_many(["carry that weight"], k=2, mode="bm25")[0]
+    assert sparse[0].node.metadata["song"] == "Carry That Weight"
+    assert embed.batch_calls == 0
+
+    with monkeypatch.context() as m:
+        m.setattr(tools, "_get_bm25", lambda: pytest.fail("dense mode must not run BM25"))
+        assert len(tools._retrieve_nodes_many(["carry that weight"], k=2, mode="dense")[0]) == 2
+
+    stats = tools.RetrievalStats()
+    fused = tools._retrieve_nodes_many(["carry that weight", "help me"], k=2, mode="fusion", stats=stats)
+    assert [len(nodes) for nodes in fused] == [2, 2]
+    assert len(reranker._model.calls) == 0 and stats.reranked == [False, False]
+
+
+def test_unknown_retrieval_mode_is_rejected(offline_index):
+    with pytest.raises(ValueError, match="retrieval mode"):
+        tools._retrieve_nodes_many(["sun"], k=1, mode="hybrid")
+
+
+def _scored(*pairs):
+    from llama_index.core.schema import TextNode
+
+    return [NodeWithScore(node=TextNode(text=text, id_=text), score=score) for text, score in pairs]
+
+
+def test_fuse_rrf_rewards_agreement_and_respects_weights():
+    dense = _scored(("a", 0.9), ("b", 0.8), ("c", 0.7))
+    sparse = _scored(("c", 12.0), ("d", 3.0))
+
+    fused = tools._fuse([dense, sparse], top_k=4, mode="rrf")
+    assert [nw.node.get_content() for nw in fused] == ["c", "a", "b", "d"]
+    assert fused[0].score == pytest.approx(1 / 63 + 1 / 61)
+
+    sparse_heavy = tools._fuse([dense, sparse], top_k=2, mode="rrf", weights=[0.1, 1.0])
+    assert [nw.node.get_content() for nw in sparse_heavy] == ["c", "d"]
+
+
+def test_fuse_relative_score_and_simple_modes():
+    dense = _scored(("a", 0.9), ("b", 0.5))
+    sparse = _scored(("b", 10.0), ("c", 2.0))
+
+    relative = tools._fuse([dense, sparse], top_k=3, mode="relative_score")
+    assert [(nw.node.get_content(), nw.score) for nw in relative] == [("a", 1.0), ("b", 1.0), ("c", 0.0)]
+
+    simple = tools._fuse([dense, sparse], top_k=3, mode="simple")
+    assert [(nw.node.get_content(), nw.score) for nw in simple] == [("b", 10.0), ("c", 2.0), ("a", 0.9)]
+
+    assert tools._fuse([[], []], top_k=3) == []
+    with pytest.raises(ValueError):
+        tools._fuse([dense], top_k=1, mode="borda")
+
+
+@pytest.fixture
+def retrieval_cache(monkeypatch, offline_index):
+    cache = TieredCache(LRUCache(64))
+    monkeypatch.setattr(tools, "RETRIEVAL_CACHE_ENABLED", True)
+    monkeypatch.setattr(tools, "_retrieval_cache", cache)
+    monkeypatch.setattr(tools, "_index_version", "v1")
+    return cache
+
+
+def test_retrieval_cache_serves_repeats_and_only_retrieves_misses(offline_index, retrieval_cache):
+    embed, reranker = offline_index
+    first = tools.rag_retrieve("here comes the sun", k=2)
+    assert (embed.batch_calls, len(reranker._model.calls)) == (1, 1)
+
+    stats = tools.RetrievalStats()
+    again, other = tools.rag_retrieve_many(["here comes  the sun", "help me"], k=2, stats=stats)
+    assert again == first
+    assert stats.cache_hits == 1
+    assert (embed.batch_calls, len(reranker._model.calls)) == (2, 2)
+
+    # Case-sensitive on the query (it changes embeddings); canonical on filters.
+    tools.rag_retrieve("sun", k=2, filters={"album": "Abbey Road"})
+    tools.rag_retrieve("sun", k=2, filters={"album": ["abbeyroad"]})
+    assert retrieval_cache.stats.as_dict()["hits"] == 2
+
+
+def test_rag_retrieve_is_traced_with_stage_timings(offline_index, retrieval_cache):
+    from src.tracing import Tracer
+
+    with Tracer().activate() as tracer:
+        tools.rag_retrieve_many(["here comes the sun", "help me"], k=2)
+        tools.rag_retrieve("help me", k=2)
+
+    miss, hit = tracer.export()
+    assert miss["kind"] == "retrieval"
+    assert miss["attributes"]["retrieval.queries"] == 2
+    assert miss["attributes"]["retrieval.cache_hits"] == 0
+    assert miss["attributes"]["retrieval.embed_s"] > 0
+    assert miss["attributes"]["retrieval.rerank_s"] > 0
+    assert hit["attributes"]["retrieval.cache_hits"] == 1
+    assert hit["attributes"]["retrieval.embed_s"] == 0
+
+
+def test_new_index_version_invalidates_cached_results(offline_index, retrieval_cache, monkeypatch):
+    embed, _ = offline_index
+    tools.rag_retrieve("because", k=1)
+    monkeypatch.setattr(tools, "_index_version", "v2")
+    tools.rag_retrieve("because", k=1)
+    tools.rag_retrieve("because", k=1, use_cache=False)
+
+    assert embed.batch_calls == 3
+    assert retrieval_cache.stats.misses == 2
+
+
+def test_warmup_preloads_in_background_and_reports_failures(offline_index, monkeypatch, capsys):
+    _, reranker = offline_index
+    clients = []
+    monkeypatch.setattr(tools, "get_llm_client", lambda: clients.append("client"))
+
+    tools.warmup().join(timeout=10)
+    assert len(reranker._model.calls) == 1
+    assert clients == ["client"]
+
+    def missing_index():
+        raise FileNotFoundError("no index yet")
+
+    monkeypatch.setattr(tools, "_get_index", missing_index)
+    assert tools.warmup(background=False) is None
+    assert "could not preload index: no index yet" in capsys.readouterr().out
+    assert clients == ["client", "client"]
+
+
+def test_importing_tools_defers_heavy_dependencies():
+    code = (
+        "import sys, src.tools, src.config\n"
+        "heavy = [m for m in ('llama_index.core', 'openai', 'bm25s', 'numpy') if m in sys.modules]\n"
+        "print(','.join(heavy))"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    root = str(Path(__file__).resolve().parents[1])
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
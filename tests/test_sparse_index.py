@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from llama_index.core import Document
+from llama_index.core.storage.docstore import SimpleDocumentStore
+
+from src.sparse_index import (
+    FINGERPRINT_FILENAME,
+    bm25_dir,
+    bm25_retrieve_many,
+    build_bm25,
+    docstore_fingerprint,
+    load_bm25,
+    persist_bm25,
+)
+
+
+def _docstore(texts):
+    ds = SimpleDocumentStore()
+    ds.add_documents([Document(text=t, id_=f"n{i}") for i, t in enumerate(texts)])
+    return ds
+
+
+def test_persisted_bm25_round_trip(tmp_path: Path):
+    ds = _docstore(["Because the world is round", "Carry that weight a long time", "Help me if you can"])
+    persist_bm25(build_bm25(ds), str(tmp_path), docstore_fingerprint(ds))
+
+    assert (Path(bm25_dir(str(tmp_path))) / FINGERPRINT_FILENAME).exists()
+
+    retriever = load_bm25(str(tmp_path), ds, similarity_top_k=1)
+    hits = retriever.retrieve("world round")
+    assert hits[0].node.node_id == "n0"
+
+
+def test_fingerprint_changes_with_content():
+    a = _docstore(["Because the world is round"])
+    b = _docstore(["Because the sky is blue"])
+    assert docstore_fingerprint(a) != docstore_fingerprint(b)
+
+
+def test_stale_bm25_is_rebuilt_from_docstore(tmp_path: Path):
+    old = _docstore(["Because the world is round", "Help me if you can"])
+    persist_bm25(build_bm25(old), str(tmp_path), docstore_fingerprint(old))
+
+    new = _docstore(["Carry that weight a long time", "Here comes the sun"])
+    retriever = load_bm25(str(tmp_path), new, similarity_top_k=1)
+    hits = retriever.retrieve("sun")
+    assert hits[0].node.get_content() == "Here comes the sun"
+
+
+def test_bm25_retrieve_many_respects_node_id_mask():
+    ds = _docstore(["Here comes the sun", "Good day sunshine sun sun", "Help me if you can"])
+    retriever = build_bm25(ds)
+
+    (hits,) = bm25_retrieve_many(retriever, ["sun"], top_k=3, node_ids={"n0", "n2"})
+    assert {h.node.node_id for h in hits} <= {"n0", "n2"}
+    assert hits[0].node.node_id == "n0"
+
+    assert bm25_retrieve_many(retriever, ["sun", "help"], top_k=3, node_ids=set()) == [[], []]
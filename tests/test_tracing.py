@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import tracing
+from src.tracing import LLM, NODE, Tracer, span, summarize, traced_node
+
+
+def test_spans_nest_and_record_errors():
+    with Tracer().activate() as tracer:
+        with span("writer", NODE) as node:
+            with span("call_llm", LLM) as call:
+                call.set(**{"gen_ai.usage.input_tokens": 3})
+            with pytest.raises(RuntimeError):
+                with span("call_llm", LLM):
+                    raise RuntimeError("boom")
+
+    writer, ok, failed = tracer.export()
+    assert writer["name"] == "writer" and writer["parent_id"] is None
+    assert ok["parent_id"] == failed["parent_id"] == node.span_id
+    assert ok["attributes"] == {"gen_ai.usage.input_tokens": 3}
+    assert failed["status"] == "error" and "boom" in failed["error"]
+    assert writer["duration_s"] >= ok["duration_s"]
+
+
+def test_no_tracer_records_nothing():
+    with span("call_llm", LLM) as s:
+        s.set(anything=1)
+    assert tracing.current_tracer() is None
+
+
+def test_traced_node_appends_to_state_when_run_alone():
+    @traced_node
+    def analyst_node(state):
+        with span("call_llm", LLM):
+            state["analysis"] = "x"
+        return state
+
+    assert analyst_node.__name__ == "analyst_node"
+    state = analyst_node({"question": "q"})
+    assert [s["name"] for s in state["trace"]] == ["analyst", "call_llm"]
+
+    # Under an active tracer the spans go to the tracer instead.
+    with Tracer().activate() as tracer:
+        state = analyst_node({"question": "q"})
+    assert "trace" not in state
+    assert [s["name"] for s in tracer.export()] == ["analyst", "call_llm"]
+
+
+def _llm_span(parent, tokens_in, tokens_out, hit=False):
+    return {
+        "name": "call_llm", "kind": LLM, "span_id": f"l{tokens_in}{hit}", "parent_id": parent,
+        "duration_s": 0.5, "attributes": {
+            "cache.hit": hit, "gen_ai.usage.input_tokens": tokens_in, "gen_ai.usage.output_tokens": tokens_out,
+        },
+    }
+
+
+def test_summarize_attributes_llm_calls_to_nodes(monkeypatch):
+    monkeypatch.setattr(tracing, "LLM_INPUT_USD_PER_MTOK", 1.0)
+    monkeypatch.setattr(tracing, "LLM_OUTPUT_USD_PER_MTOK", 2.0)
+    spans = [
+        {"name": "pipeline", "kind": "pipeline", "span_id": "p", "parent_id": None, "duration_s": 3.0, "attributes": {}},
+        {"name": "writer", "kind": NODE, "span_id": "w", "parent_id": "p", "duration_s": 2.0, "attributes": {}},
+        {"name": "planner", "kind": NODE, "span_id": "n", "parent_id": "p", "duration_s": 1.0, "attributes": {}},
+        _llm_span("w", 1000, 500),
+        _llm_span("n", 200, 0, hit=True),
+        _llm_span("p", 100, 10),  # outside any node
+    ]
+
+    summary = summarize(spans)
+    assert list(summary) == ["writer", "planner", "total"]
+    assert summary["writer"]["seconds"] == 2.0
+    assert summary["writer"]["cost_usd"] == pytest.approx((1000 * 1.0 + 500 * 2.0) / 1e6)
+    assert summary["planner"]["llm_cache_hits"] == 1
+    assert summary["total"]["seconds"] == 3.0
+    assert summary["total"]["llm_calls"] == 3
+    assert summary["total"]["input_tokens"] == 1300
+
+
+def test_export_to_jsonl_and_otlp_collector(tmp_path):
+    with Tracer().activate() as tracer:
+        with span("writer", NODE):
+            with span("call_llm", LLM, **{"cache.hit": False, "gen_ai.usage.input_tokens": 7}):
+                pass
+    spans = tracer.export()
+
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Collector)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        path = tmp_path / "traces" / "run.jsonl"
+        tracing.export_trace(spans, jsonl_path=str(path), otlp_endpoint=f"http://127.0.0.1:{httpd.server_address[1]}")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["writer", "call_llm"]
+
+    (url, payload), = received
+    assert url == "/v1/traces"
+    resource = payload["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["key"] == "service.name"
+    writer, call = resource["scopeSpans"][0]["spans"]
+    assert len(writer["traceId"]) == 32 and len(writer["spanId"]) == 16
+    assert call["parentSpanId"] == writer["spanId"]
+    assert call["kind"] == 3
+    assert int(call["endTimeUnixNano"]) >= int(call["startTimeUnixNano"])
+    attrs = {a["key"]: a["value"] for a in call["attributes"]}
+    assert attrs["cache.hit"] == {"boolValue": False}
+    assert attrs["gen_ai.usage.input_tokens"] == {"intValue": "7"}
+
+
+def test_export_failures_do_not_raise(capsys):
+    spans = [{"name": "x", "kind": NODE, "trace_id": "0" * 32, "span_id": "1" * 16, "parent_id": None,
+              "start_s": 0.0, "duration_s": 0.0, "status": "ok", "error": None, "attributes": {}}]
+    tracing.export_trace(spans, jsonl_path="", otlp_endpoint="http://127.0.0.1:9")
+    assert "could not export" in capsys.readouterr().out
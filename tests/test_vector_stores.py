@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.simple import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from src.vector_stores import NumpyVectorStore
+
+
+def _nodes(n: int, dim: int = 16, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        node = TextNode(text=f"chunk {i}", id_=f"n{i}", embedding=rng.normal(size=dim).tolist())
+        node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=f"doc{i % 3}")
+        out.append(node)
+    return out
+
+
+def _query(dim: int = 16, k: int = 5, seed: int = 1, **kwargs):
+    q = np.random.default_rng(seed).normal(size=dim).tolist()
+    return VectorStoreQuery(query_embedding=q, similarity_top_k=k, **kwargs)
+
+
+def test_matches_simple_vector_store_ranking():
+    nodes = _nodes(50)
+    simple = SimpleVectorStore()
+    simple.add(nodes)
+    fast = NumpyVectorStore()
+    fast.add(nodes)
+
+    expected = simple.query(_query(k=7))
+    got = fast.query(_query(k=7))
+    assert got.ids == expected.ids
+    np.testing.assert_allclose(got.similarities, expected.similarities, rtol=1e-5)
+
+
+def test_persist_and_memory_map(tmp_path: Path):
+    store = NumpyVectorStore()
+    store.add(_nodes(20))
+    path = str(tmp_path / "default__vector_store.json")
+    store.persist(path)
+
+    loaded = NumpyVectorStore.from_persist_dir(str(tmp_path))
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.matrix.dtype == np.float32
+    assert loaded.query(_query()).ids == store.query(_query()).ids
+
+
+def test_delete_by_ref_doc_after_load(tmp_path: Path):
+    store = NumpyVectorStore()
+    store.add(_nodes(9))
+    store.persist(str(tmp_path / "default__vector_store.json"))
+
+    loaded = NumpyVectorStore.from_persist_dir(str(tmp_path))
+    loaded.delete("doc0")
+    assert loaded.count == 6
+    assert not any(i in {"n0", "n3", "n6"} for i in loaded.query(_query(k=9)).ids)
+
+
+def test_node_id_restriction():
+    store = NumpyVectorStore()
+    store.add(_nodes(30))
+    res = store.query(_query(k=10, node_ids=["n1", "n2", "n29"]))
+    assert sorted(res.ids) == ["n1", "n2", "n29"]
+
+
+def test_node_id_restriction_tracks_adds_deletes_and_loads(tmp_path: Path):
+    nodes = _nodes(30)
+    store = NumpyVectorStore()
+    store.add(nodes[:20])
+    store.delete("doc0")  # n0, n3, ..., n18
+    store.add(nodes[20:])
+    store.persist(str(tmp_path / "default__vector_store.json"))
+
+    wanted = ["n1", "n3", "n29", "n29", "missing"]
+    for s in (store, NumpyVectorStore.from_persist_dir(str(tmp_path))):
+        res = s.query(_query(k=10, node_ids=wanted))
+        assert sorted(res.ids) == ["n1", "n29"]
+        exact = s.query(_query(k=30))
+        assert res.similarities == pytest.approx([exact.similarities[exact.ids.index(i)] for i in res.ids])
+
+
+def test_rejects_metadata_filters():
+    from llama_index.core.vector_stores.types import MetadataFilters, ExactMatchFilter
+
+    store = NumpyVectorStore()
+    store.add(_nodes(3))
+    with pytest.raises(ValueError):
+        store.query(_query(filters=MetadataFilters(filters=[ExactMatchFilter(key="album", value="Help")])))
+
+
+def test_hnsw_recall_against_exact_search(tmp_path: Path):
+    pytest.importorskip("hnswlib")
+    from src.vector_stores import HNSWVectorStore
+
+    nodes = _nodes(300, dim=32)
+    exact = NumpyVectorStore()
+    exact.add(nodes)
+    ann = HNSWVectorStore(ef_search=100)
+    ann.add(nodes)
+    ann.persist(str(tmp_path / "default__vector_store.json"))
+    loaded = HNSWVectorStore.from_persist_dir(str(tmp_path), ef_search=100)
+
+    hits = total = 0
+    for seed in range(20):
+        q = _query(dim=32, k=10, seed=seed + 100)
+        truth = set(exact.query(q).ids)
+        got = loaded.query(q)
+        hits += len(truth & set(got.ids))
+        total += len(truth)
+        assert got.similarities == sorted(got.similarities, reverse=True)
+    assert hits / total >= 0.95
+
+
+def test_hnsw_rebuilds_graph_after_delete():
+    pytest.importorskip("hnswlib")
+    from src.vector_stores import HNSWVectorStore
+
+    store = HNSWVectorStore()
+    store.add(_nodes(9))
+    store.query(_query(k=3))
+    store.delete("doc1")
+    ids = store.query(_query(k=9)).ids
+    assert len(ids) == 6
+    assert not {"n1", "n4", "n7"} & set(ids)